@@ -578,6 +578,110 @@ def test(ignore_venv: bool):
         run_proc(["uv", "run", "miniagent", "test", "--ignore-venv"])
 
 
+@cli.command()
+@click.option("--rounds", "-n", default=3, help="每个预设的测试轮数")
+@click.option("--concurrency", "-c", default=4, help="最大并发请求数")
+@click.option("--warmup", "-w", is_flag=True, help="正式测试前为每个预设预热一次")
+@click.option(
+    "--mock", "-m", is_flag=True, help="对本地模拟服务进行测试，用于检查基准测试本身"
+)
+@click.option("--ignore-venv", "-i", is_flag=True, help="忽略Venv环境")
+def bench_presets(
+    rounds: int, concurrency: int, warmup: bool, mock: bool, ignore_venv: bool
+):
+    """并发测试所有模型预设，输出延迟分位数、输出速度与错误率。"""
+    if not check_optional_dependency():
+        return click.echo(error("缺少可选依赖 'full'"))
+    if ignore_venv or IS_IN_VENV:
+        click.echo(info("正在测试模型预设..."))
+        from amrita import preset_bench
+
+        preset_bench.main(rounds, concurrency, warmup, mock)
+    else:
+        run_proc(
+            [
+                "uv",
+                "run",
+                "miniagent",
+                "bench-presets",
+                "--ignore-venv",
+                "-n",
+                str(rounds),
+                "-c",
+                str(concurrency),
+                *(["--warmup"] if warmup else []),
+                *(["--mock"] if mock else []),
+            ]
+        )
+
+
+@cli.command()
+@click.option("--iterations", "-n", default=1000, help="每组处理器的测试事件数")
+@click.option("--ignore-venv", "-i", is_flag=True, help="忽略Venv环境")
+def bench_dispatch(iterations: int, ignore_venv: bool):
+    """测试聊天事件处理器的调度开销随处理器数量的变化。"""
+    if not check_optional_dependency():
+        return click.echo(error("缺少可选依赖 'full'"))
+    if ignore_venv or IS_IN_VENV:
+        click.echo(info("正在测试事件调度..."))
+        from amrita import dispatch_bench
+
+        dispatch_bench.main(iterations)
+    else:
+        run_proc(
+            [
+                "uv",
+                "run",
+                "miniagent",
+                "bench-dispatch",
+                "--ignore-venv",
+                "-n",
+                str(iterations),
+            ]
+        )
+
+
+@cli.command()
+@click.option("--iterations", "-n", default=100, help="每组匹配器的测试事件数")
+@click.option("--ignore-venv", "-i", is_flag=True, help="忽略Venv环境")
+def bench_preprocess(iterations: int, ignore_venv: bool):
+    """测试每个事件的预处理开销随匹配器数量的变化。"""
+    if not check_optional_dependency():
+        return click.echo(error("缺少可选依赖 'full'"))
+    if ignore_venv or IS_IN_VENV:
+        click.echo(info("正在测试事件预处理..."))
+        from amrita import preprocess_bench
+
+        preprocess_bench.main(iterations)
+    else:
+        run_proc(
+            [
+                "uv",
+                "run",
+                "miniagent",
+                "bench-preprocess",
+                "--ignore-venv",
+                "-n",
+                str(iterations),
+            ]
+        )
+
+
+@cli.command()
+@click.option("--ignore-venv", "-i", is_flag=True, help="忽略Venv环境")
+def check_images(ignore_venv: bool):
+    """使用本地图片检查多模态图片的缓存、缩放与淘汰。"""
+    if not check_optional_dependency():
+        return click.echo(error("缺少可选依赖 'full'"))
+    if ignore_venv or IS_IN_VENV:
+        click.echo(info("正在检查图片管线..."))
+        from amrita import image_check
+
+        image_check.main()
+    else:
+        run_proc(["uv", "run", "miniagent", "check-images", "--ignore-venv"])
+
+
 @cli.command()
 def update():
     """更新 MiniAgent"""
@@ -37,6 +37,12 @@ class AmritaConfig(BaseModel):
     # 请求速率限制（间隔秒）
     rate_limit: int = 5
 
+    # 重复事件去重的时间窗口（秒），0为不去重
+    event_dedup_window: int = 300
+
+    # 重复事件去重索引的最大条目数
+    event_dedup_size: int = 10000
+
     # 是否禁用内置菜单
     disable_builtin_menu: bool = False
 
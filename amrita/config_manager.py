@@ -1,8 +1,12 @@
 import asyncio
+import hashlib
+import os
+import time
 from abc import ABC
 from asyncio import Lock, Task
 from collections import defaultdict
 from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
 from io import StringIO
 from pathlib import Path
 from typing import Generic, TypeVar, get_type_hints
@@ -20,6 +24,31 @@ T = TypeVar("T", bound=BaseModel)
 CALLBACK_TYPE = Callable[[str, Path], Awaitable]
 FILTER_TYPE = Callable[[watchfiles.main.FileChange], bool]
 
+WATCH_DEBOUNCE_MS = 500  # 文件变更的防抖时间（毫秒）
+
+
+@dataclass
+class _WatchEntry:
+    """一条文件监听注册"""
+
+    owner_name: str
+    path: Path  # 监听的文件或目录（绝对路径）
+    filter: FILTER_TYPE
+    callbacks: tuple[CALLBACK_TYPE, ...]
+
+
+@dataclass
+class WatchStats:
+    batches: int = 0  # 收到的变更批次数
+    changes: int = 0  # 收到的文件变更数
+    unchanged: int = 0  # 内容未变化而被忽略的变更数
+    reloads: int = 0  # 执行的回调次数
+    errors: int = 0  # 回调出错次数
+    restarts: int = 0  # 监听器因监听根目录变化而重启的次数
+    latency_total: float = 0.0  # 累计重载耗时（秒）
+    latency_max: float = 0.0  # 最长重载耗时（秒）
+    _owners: dict[str, int] = field(default_factory=dict)  # 各拥有者的重载次数
+
 
 class BaseDataManager(ABC, Generic[T]):
     """
@@ -153,6 +182,11 @@ class UniConfigManager(Generic[T]):
     _config_file_cache: dict[str, StringIO]  # Path -> StringIO
     _config_instances: dict[str, T]
     _tasks: list[Task]
+    _watch_table: dict[Path, list[_WatchEntry]]  # 监听路径 -> 注册项
+    _watch_roots: tuple[Path, ...]
+    _watcher_task: Task | None
+    _file_hashes: dict[Path, bytes]
+    _watch_stats: WatchStats
 
     def __new__(cls, *args, **kwargs):
         """
@@ -172,6 +206,11 @@ class UniConfigManager(Generic[T]):
             cls._config_file_cache = {}
             cls._config_classes_id_to_config = {}
             cls._tasks = []
+            cls._watch_table = {}
+            cls._watch_roots = ()
+            cls._watcher_task = None
+            cls._file_hashes = {}
+            cls._watch_stats = WatchStats()
         return cls._instance
 
     def __del__(self):
@@ -256,7 +295,7 @@ class UniConfigManager(Generic[T]):
         if watch:
             await self._add_watch_path(
                 owner_name,
-                config_dir,
+                file_path,
                 lambda change: Path(change[1]).name == name,
                 self._file_reload_callback,
             )
@@ -394,12 +433,15 @@ class UniConfigManager(Generic[T]):
         owner_name = owner_name or _try_get_caller_plugin().name
         config_dir = get_config_dir(owner_name)
         async with self._lock[owner_name]:
+            data = tomli_w.dumps(self._config_instances[owner_name].model_dump())
             async with aiofiles.open(
                 config_dir / "config.toml", mode="w", encoding="utf-8"
             ) as f:
-                await f.write(
-                    tomli_w.dumps(self._config_instances[owner_name].model_dump())
-                )
+                await f.write(data)
+            # 记录写入内容的哈希，自身保存的配置不会再触发一次重载
+            self._file_hashes[(config_dir / "config.toml").absolute()] = (
+                self._hash_bytes(data.encode("utf-8"))
+            )
 
     def get_config_classes(self) -> dict[str, type[T]]:
         """
@@ -520,6 +562,28 @@ class UniConfigManager(Generic[T]):
             async with aiofiles.open(config_file, mode="w", encoding="utf-8") as f:
                 await f.write(tomli_w.dumps(config_instance.model_dump()))
 
+    def get_watch_stats(self) -> dict[str, int | float | dict[str, int]]:
+        """获取文件监听器统计信息"""
+        stats = self._watch_stats
+        return {
+            "watchers": int(
+                self._watcher_task is not None and not self._watcher_task.done()
+            ),
+            "watched_paths": sum(len(entries) for entries in self._watch_table.values()),
+            "roots": len(self._watch_roots),
+            "batches": stats.batches,
+            "changes": stats.changes,
+            "unchanged_skipped": stats.unchanged,
+            "reloads": stats.reloads,
+            "errors": stats.errors,
+            "restarts": stats.restarts,
+            "reload_latency_avg": stats.latency_total / stats.reloads
+            if stats.reloads
+            else 0.0,
+            "reload_latency_max": stats.latency_max,
+            "owners": dict(stats._owners),
+        }
+
     async def _add_watch_path(
         self,
         plugin_name: str,
@@ -529,34 +593,160 @@ class UniConfigManager(Generic[T]):
     ):
         """添加文件监听
 
+        所有监听共用同一个监听器，变更按路径前缀分发给对应的注册项。
+
         Args:
             plugin_name (str): 插件名称
-            path (Path): 路径（相对路径）
+            path (Path): 监听的文件或目录
             filter (FILTER_TYPE): 过滤函数
             *callbacks (CALLBACK_TYPE): 回调函数列表
         """
+        path = await asyncio.to_thread(path.absolute)
+        self._watch_table.setdefault(path, []).append(
+            _WatchEntry(plugin_name, path, filter, callbacks)
+        )
+        await asyncio.to_thread(self._prime_hash, path)
+        roots = self._compute_roots()
+        if roots != self._watch_roots or self._watcher_task is None:
+            self._restart_watcher(roots)
+
+    def _compute_roots(self) -> tuple[Path, ...]:
+        """计算覆盖所有监听路径的最小根目录集合"""
+        candidates = sorted(
+            {path if path.is_dir() else path.parent for path in self._watch_table},
+            key=lambda p: len(p.parts),
+        )
+        roots: list[Path] = []
+        for candidate in candidates:
+            if not any(candidate.is_relative_to(root) for root in roots):
+                roots.append(candidate)
+        return tuple(sorted(roots))
+
+    def _restart_watcher(self, roots: tuple[Path, ...]):
+        """使用新的根目录集合重启共享监听器"""
+        if self._watcher_task is not None:
+            self._watcher_task.cancel()
+            self._watch_stats.restarts += 1
+        self._watch_roots = roots
+        logger.debug(f"File watcher roots: {', '.join(map(str, roots))}")
+        self._watcher_task = asyncio.create_task(self._watch(roots))
+        self._tasks.append(self._watcher_task)
+        self._watcher_task.add_done_callback(self._tasks.remove)
+
+    async def _watch(self, roots: tuple[Path, ...]):
+        """共享监听器主循环"""
+        try:
+            async for changes in watchfiles.awatch(*roots, debounce=WATCH_DEBOUNCE_MS):
+                # 回调在独立任务中执行，监听器重启不会打断正在进行的重载
+                task = asyncio.create_task(self._dispatch(changes))
+                self._tasks.append(task)
+                task.add_done_callback(self._tasks.remove)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.opt(exception=e, colors=True).error(
+                f"Error in watcher for {', '.join(map(str, roots))}"
+            )
 
-        async def excutor():
-            """
-            执行文件监控任务
-            """
-            try:
-                async for changes in watchfiles.awatch(path):
-                    if any(filter(change) for change in changes):
-                        try:
-                            async with self._callback_lock[plugin_name]:
-                                for callback in callbacks:
-                                    await callback(plugin_name, path)
-                        except Exception as e:
-                            logger.opt(exception=e, colors=True).error(
-                                "Error while calling callback function"
-                            )
-            except Exception as e:
-                logger.opt(exception=e, colors=True).error(
-                    f"Error in watcher for {path}"
-                )
-
-        self._tasks.append(asyncio.create_task(excutor()))
+    def _match_entries(self, file: Path) -> list[_WatchEntry]:
+        """按路径前缀查找变更文件对应的注册项"""
+        entries: list[_WatchEntry] = []
+        for prefix in (file, *file.parents):
+            entries.extend(self._watch_table.get(prefix, ()))
+        return entries
+
+    async def _dispatch(self, changes: set[watchfiles.main.FileChange]):
+        """过滤内容未变化的文件，并将变更分发给各拥有者"""
+        stats = self._watch_stats
+        stats.batches += 1
+        stats.changes += len(changes)
+        try:
+            changed = await asyncio.to_thread(self._filter_unchanged, changes)
+        except Exception as e:
+            logger.opt(exception=e, colors=True).error(
+                "Error while dispatching file changes"
+            )
+            return
+        stats.unchanged += len(changes) - len(changed)
+
+        # 同一批次内，每个注册项只触发一次
+        triggered: dict[int, _WatchEntry] = {}
+        for change in changed:
+            for entry in self._match_entries(Path(change[1])):
+                if id(entry) not in triggered and entry.filter(change):
+                    triggered[id(entry)] = entry
+        by_owner: defaultdict[str, list[_WatchEntry]] = defaultdict(list)
+        for entry in triggered.values():
+            by_owner[entry.owner_name].append(entry)
+        await asyncio.gather(
+            *(self._run_owner_callbacks(owner, entries) for owner, entries in by_owner.items())
+        )
+
+    async def _run_owner_callbacks(self, owner_name: str, entries: list[_WatchEntry]):
+        """串行执行同一拥有者的回调，不同拥有者之间并发执行"""
+        stats = self._watch_stats
+        async with self._callback_lock[owner_name]:
+            for entry in entries:
+                start = time.perf_counter()
+                try:
+                    for callback in entry.callbacks:
+                        await callback(owner_name, entry.path)
+                except Exception as e:
+                    stats.errors += 1
+                    logger.opt(exception=e, colors=True).error(
+                        "Error while calling callback function"
+                    )
+                latency = time.perf_counter() - start
+                stats.reloads += 1
+                stats.latency_total += latency
+                stats.latency_max = max(stats.latency_max, latency)
+                stats._owners[owner_name] = stats._owners.get(owner_name, 0) + 1
+
+    @staticmethod
+    def _hash_bytes(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def _hash_file(self, path: Path) -> bytes | None:
+        try:
+            return self._hash_bytes(path.read_bytes())
+        except OSError:
+            return None
+
+    def _prime_hash(self, path: Path):
+        """记录已注册文件的内容哈希，作为变更比较的基准
+
+        监听的目录不做预先扫描，其中的文件在首次变更时记录哈希。
+        """
+        if (
+            path not in self._file_hashes
+            and path.is_file()
+            and (digest := self._hash_file(path))
+        ):
+            self._file_hashes[path] = digest
+
+    def _filter_unchanged(
+        self, changes: set[watchfiles.main.FileChange]
+    ) -> list[watchfiles.main.FileChange]:
+        """过滤掉内容哈希没有变化的修改事件"""
+        result: list[watchfiles.main.FileChange] = []
+        for change in changes:
+            file = Path(change[1])
+            if change[0] == watchfiles.Change.deleted:
+                self._file_hashes.pop(file, None)
+                result.append(change)
+                continue
+            if os.path.isdir(file):
+                result.append(change)
+                continue
+            digest = self._hash_file(file)
+            if digest is not None and self._file_hashes.get(file) == digest:
+                continue
+            if digest is None:
+                self._file_hashes.pop(file, None)
+            else:
+                self._file_hashes[file] = digest
+            result.append(change)
+        return result
 
     async def _config_reload_callback(self, plugin_name: str, _):
         """
@@ -591,3 +781,4 @@ class UniConfigManager(Generic[T]):
         """
         for task in self._tasks:
             task.cancel()
+        self._watcher_task = None
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import time
+
+import nonebot
+
+import amrita
+
+logger = nonebot.logger
+
+SIZES = (1, 10, 50, 200)
+
+
+def main(iterations: int = 1000):
+    """加载项目并测试SuggarMatcher的事件调度开销随处理器数量的变化，完成后退出。
+
+    每组处理器中一部分的参数无法满足（应被跳过），其余处理器在每个事件中应恰好运行一次；
+    另外检查处理器取消事件后同一优先级的其他处理器照常运行完毕、更低优先级的处理器不再运行。
+    结果不符合预期时以非零状态退出。
+    """
+    os.environ["ALEMBIC_STARTUP_CHECK"] = "false"
+    amrita.init()
+    driver = nonebot.get_driver()
+    amrita.load_plugins()
+
+    async def bench():
+        from amrita.plugins.chat.event import SuggarEvent
+        from amrita.plugins.chat.matcher import Matcher, MatcherManager
+
+        class BenchEvent(SuggarEvent):
+            def __init__(self, event_type: str):
+                super().__init__("", None, 0, [])  # type: ignore[arg-type]
+                self._bench_type = event_type
+
+            def get_event_type(self) -> str:
+                return self._bench_type
+
+        calls: dict[str, int] = {}
+
+        def register(event_type: str, size: int):
+            for i in range(size):
+                matcher = Matcher(event_type, priority=i % 5 + 1, block=False)
+                if i % 4 == 3:
+
+                    async def skipped(event: SuggarEvent, value: int):
+                        calls["skipped"] = calls.get("skipped", 0) + 1
+
+                    matcher.handle()(skipped)
+                else:
+
+                    async def handler(event: SuggarEvent, matcher: Matcher):
+                        calls[event.get_event_type()] += 1
+
+                    matcher.handle()(handler)
+
+        # 调度过程中的日志会淹没测试结果，测试期间关闭
+        logger.disable("amrita.plugins.chat.matcher")
+        try:
+            for size in SIZES:
+                event_type = f"bench_dispatch_{size}"
+                register(event_type, size)
+                expected = sum(1 for i in range(size) if i % 4 != 3)
+                event = BenchEvent(event_type)
+                calls[event_type] = 0
+                await MatcherManager.trigger_event(event)  # 预热
+                calls[event_type] = 0
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    await MatcherManager.trigger_event(event)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"处理器数 {size:>4}：每事件 {elapsed / iterations * 1e6:.1f}μs"
+                    + f"（{iterations} 次）"
+                )
+                if calls[event_type] != expected * iterations:
+                    raise RuntimeError(
+                        f"处理器数 {size}：运行了 {calls[event_type]} 次，"
+                        + f"应为 {expected * iterations} 次"
+                    )
+            if calls.get("skipped"):
+                raise RuntimeError("参数无法满足的处理器被运行了")
+
+            cancel_type = "bench_dispatch_cancel"
+
+            async def canceller(event: SuggarEvent, matcher: Matcher):
+                calls[cancel_type] += 1
+                matcher.cancel_matcher()
+
+            async def slow(event: SuggarEvent, matcher: Matcher):
+                await asyncio.sleep(0.05)
+                calls[cancel_type] += 1
+
+            Matcher(cancel_type, priority=1, block=False).handle()(canceller)
+            Matcher(cancel_type, priority=1, block=False).handle()(slow)
+            register(cancel_type, 10)
+            calls[cancel_type] = 0
+            await MatcherManager.trigger_event(BenchEvent(cancel_type))
+            # 优先级1中有取消者、较慢的处理器与另外两个处理器，
+            # 取消后它们应照常运行完毕，更低优先级的处理器不应再运行
+            if calls[cancel_type] != 4:
+                raise RuntimeError(
+                    f"处理器取消事件后运行了 {calls[cancel_type]} 个处理器，应为 4 个"
+                )
+        except Exception as e:
+            logger.opt(exception=e).error(f"调度基准测试失败：{e}")
+            os._exit(1)
+        finally:
+            logger.enable("amrita.plugins.chat.matcher")
+        os._exit(0)
+
+    driver.on_startup(bench)
+    amrita.run()
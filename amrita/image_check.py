@@ -0,0 +1,146 @@
+import asyncio
+import base64
+import io
+import os
+import tempfile
+from pathlib import Path
+
+import nonebot
+from PIL import Image
+
+import amrita
+
+logger = nonebot.logger
+
+
+def _noise_png(side: int) -> bytes:
+    """生成难以压缩的随机噪声图片，用于填满缓存"""
+    image = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def _expect(condition: bool, message: str):
+    if not condition:
+        raise RuntimeError(message)
+
+
+def main():
+    """加载项目并检查多模态图片管线，完成后退出。
+
+    使用本地生成的图片替代下载，在临时目录中检查缓存命中、并发去重、缩放、LRU淘汰、
+    原图被淘汰后的重新下载、下载失败的回退与下载被取消时的等待者，
+    结果不符合预期时以非零状态退出。
+    """
+    os.environ["ALEMBIC_STARTUP_CHECK"] = "false"
+    amrita.init()
+    driver = nonebot.get_driver()
+    amrita.load_plugins()
+
+    async def check():
+        from amrita.plugins.chat.config import config_manager
+        from amrita.plugins.chat.utils.images import IMAGE_SCHEME, ImagePipeline
+
+        images = {
+            "local://a": _noise_png(512),
+            "local://b": _noise_png(512),
+            "local://c": _noise_png(64),
+        }
+        fetched: list[str] = []
+
+        async def fetcher(url: str) -> bytes:
+            fetched.append(url)
+            await asyncio.sleep(0.01)
+            if url not in images:
+                raise FileNotFoundError(url)
+            return images[url]
+
+        conf = config_manager.config.llm_config.image
+        conf.enable = True
+        conf.transport = "base64"
+        conf.cache_size_mb = 1
+        pipeline = ImagePipeline()
+        pipeline.set_fetcher(fetcher)
+        with tempfile.TemporaryDirectory() as tmp:
+            # 使用临时目录，避免淘汰真实的图片缓存
+            pipeline._cache_dir = Path(tmp)
+            try:
+                ref_a = await pipeline.localize("local://a")
+                _expect(ref_a.startswith(IMAGE_SCHEME), f"未返回本地引用：{ref_a}")
+                _expect(
+                    await pipeline.localize("local://a") == ref_a
+                    and fetched == ["local://a"],
+                    "重复的图片没有命中缓存",
+                )
+                ref_c, ref_c2 = await asyncio.gather(
+                    pipeline.localize("local://c"), pipeline.localize("local://c")
+                )
+                _expect(
+                    ref_c == ref_c2 and fetched.count("local://c") == 1,
+                    "并发的相同图片被重复下载",
+                )
+
+                url = await pipeline.resolve(ref_a, 256)
+                _expect(
+                    url is not None and url.startswith("data:image/jpeg;base64,"),
+                    f"缩放后的图片地址不正确：{url}",
+                )
+                assert url is not None
+                data = base64.b64decode(url.partition(",")[2])
+                with Image.open(io.BytesIO(data)) as image:
+                    _expect(
+                        image.format == "JPEG" and max(image.size) == 256,
+                        f"图片没有被缩放为JPEG：{image.format} {image.size}",
+                    )
+                encoded = pipeline.stats.encoded
+                _expect(
+                    await pipeline.resolve(ref_a, 256) == url
+                    and pipeline.stats.encoded == encoded,
+                    "缩放后的图片没有命中缓存",
+                )
+
+                # 两张原图超出1MB的容量，最久未使用的原图a被淘汰
+                await pipeline.localize("local://b")
+                digest_a = ref_a.removeprefix(IMAGE_SCHEME).partition("#")[0]
+                _expect(
+                    pipeline.stats.evicted > 0
+                    and not (Path(tmp) / f"{digest_a}.src").exists(),
+                    "缓存超出容量后没有淘汰最久未使用的原图",
+                )
+                _expect(
+                    pipeline.get_stats()["size"] <= 1024 * 1024,
+                    "淘汰后缓存仍超出容量",
+                )
+                _expect(
+                    await pipeline.resolve(ref_a, 128) is not None
+                    and fetched.count("local://a") == 2,
+                    "原图被淘汰后没有重新下载",
+                )
+
+                failed = pipeline.stats.failed
+                _expect(
+                    await pipeline.localize("local://missing") == "local://missing"
+                    and pipeline.stats.failed == failed + 1,
+                    "下载失败时没有回退到原链接",
+                )
+                # 发起下载的请求被取消时，等待同一图片的请求回退到原链接而不是一直等待
+                owner = asyncio.create_task(pipeline.localize("local://c?slow"))
+                await asyncio.sleep(0)
+                waiter = asyncio.create_task(pipeline.localize("local://c?slow"))
+                await asyncio.sleep(0)
+                owner.cancel()
+                _expect(
+                    await asyncio.wait_for(waiter, 5) == "local://c?slow",
+                    "下载请求被取消后，等待同一图片的请求没有结束",
+                )
+                print(pipeline.get_stats())
+            except Exception as e:
+                logger.opt(exception=e).error(f"图片管线检查失败：{e}")
+                os._exit(1)
+            finally:
+                pipeline.set_fetcher(None)
+        os._exit(0)
+
+    driver.on_startup(check)
+    amrita.run()
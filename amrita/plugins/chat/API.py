@@ -23,6 +23,7 @@ from .utils.llm_tools.models import (
     FunctionDefinitionSchema,
     FunctionParametersSchema,
     FunctionPropertySchema,
+    ToolCachePolicy,
     ToolChoice,
     ToolContext,
     ToolData,
@@ -79,7 +80,7 @@ class Admin:
         返回:
         - bool: 用户是否是管理员。
         """
-        return int(user_id) in self.config.admin.admins
+        return config_manager.snapshot.is_admin(user_id)
 
 
 class Chat:
@@ -153,6 +154,7 @@ __all__ = [
     "MCPClient",
     "ModelAdapter",
     "Tokenizer",
+    "ToolCachePolicy",
     "ToolContext",
     "ToolData",
     "ToolFunctionSchema",
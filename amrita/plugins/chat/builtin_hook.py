@@ -1,8 +1,9 @@
+import asyncio
 import json
 import os
 import random
+import time
 import typing
-from collections.abc import Awaitable, Callable
 from copy import deepcopy
 from typing import Any, TypeAlias
 
@@ -11,7 +12,10 @@ from nonebot.adapters.onebot.v11 import Bot, MessageEvent
 from nonebot.exception import NoneBotException
 from nonebot.log import logger
 
-from amrita.plugins.chat.utils.llm_tools.models import ToolContext
+from amrita.plugins.chat.utils.llm_tools.models import (
+    ToolContext,
+    ToolFunctionSchema,
+)
 from amrita.utils.admin import send_to_admin
 
 from .config import config_manager
@@ -21,6 +25,7 @@ from .exception import (
     CancelException,
     PassException,
 )
+from .matcher import Matcher
 from .on_event import on_before_chat, on_chat
 from .utils.libchat import (
     tools_caller,
@@ -32,15 +37,29 @@ from .utils.llm_tools.builtin_tools import (
     report,
 )
 from .utils.llm_tools.manager import ToolsManager
+from .utils.load_shedder import LoadShedder, ShedStage
 from .utils.memory import (
     Message,
     ToolResult,
     get_memory_data,
 )
+from .utils.models import TextContent, ToolCall
+from .utils.outbox import Outbox
+from .utils.prefilter import ModerationPrefilter
+from .utils.report_batcher import ReportBatcher
 
 prehook = on_before_chat(block=False, priority=2)
 checkhook = on_before_chat(block=False, priority=1)
-posthook = on_chat(block=False, priority=1)
+# 审查结果须在其他回复后处理之前取回
+reportgate = on_chat(block=False, priority=1)
+posthook = on_chat(block=False, priority=2)
+
+REPORT_KEY = tuple[int, int]
+
+# 并发审查模式下尚未取回结果的审查任务（(self_id, message_id) -> 审查任务）
+_pending_reports: dict[REPORT_KEY, asyncio.Task[list[ToolCall]]] = {}
+# 对话结束后仍在处理审查结果的后台任务，保留引用避免被回收
+_settling_reports: set[asyncio.Task[None]] = set()
 
 ChatException: TypeAlias = (
     BlockException | CancelException | PassException | NoneBotException
@@ -58,50 +77,161 @@ AGENT_PROCESS_TOOLS = (
 )
 
 
+async def _report_check(msg: list) -> list[ToolCall]:
+    """调用审查模型，返回其产生的工具调用"""
+    response = await tools_caller(msg, [REPORT_TOOL])
+    return response.tool_calls or []
+
+
+async def _moderate(msg: list, has_media: bool) -> list[ToolCall]:
+    """执行内容审查，启用批处理时合并到批量审查中（包含图片等内容的消息仍逐条审查）"""
+    if (
+        config_manager.config.llm_config.tools.report_batch.enable
+        and msg
+        and not has_media
+    ):
+        return await ReportBatcher().submit(msg, lambda: _report_check(msg))
+    return await _report_check(msg)
+
+
+def _latest_user_text(event: BeforeChatEvent) -> tuple[str, bool]:
+    """获取最新一条消息的文本，以及它是否包含非文本内容"""
+    if not event._send_message:
+        return "", False
+    content = event._send_message[-1].content
+    if not isinstance(content, list):
+        return content or "", False
+    return (
+        "".join(part.text for part in content if isinstance(part, TextContent)),
+        any(not isinstance(part, TextContent) for part in content),
+    )
+
+
+async def _handle_report_calls(
+    tool_calls: list[ToolCall],
+    nonebot_event: MessageEvent,
+    bot: Bot,
+    matcher: Matcher | None,
+) -> None:
+    """处理审查模型的工具调用，matcher为None时（对话已结束）不再中断处理流程"""
+    for tool_call in tool_calls:
+        function_name = tool_call.function.name
+        function_args: dict[str, Any] = json.loads(tool_call.function.arguments)
+        if function_name == REPORT_TOOL.function.name:
+            await report(
+                nonebot_event,
+                function_args.get("content", ""),
+                bot,
+            )
+            if config_manager.config.llm_config.tools.report_then_block:
+                data = await get_memory_data(nonebot_event)
+                data.memory.messages = []
+                await data.save(nonebot_event)
+                Outbox().enqueue(
+                    bot,
+                    nonebot_event,
+                    random.choice(config_manager.config.llm_config.block_msg),
+                    coalesce=False,
+                )
+                if matcher is not None:
+                    matcher.cancel_nonebot_process()
+        else:
+            await send_to_admin(
+                f"[LLM-Report] 检测到非传入工具调用：{function_name}，请向模型提供商反馈此问题。"
+            )
+
+
+def _report_key(nonebot_event: MessageEvent) -> REPORT_KEY:
+    return nonebot_event.self_id, nonebot_event.message_id
+
+
+async def _await_pending_report(
+    nonebot_event: MessageEvent, bot: Bot, matcher: Matcher
+) -> None:
+    """并发审查模式下等待审查结果并处理，没有进行中的审查时立即返回"""
+    key = _report_key(nonebot_event)
+    if (task := _pending_reports.get(key)) is None:
+        return
+    try:
+        # 等待被取消时审查任务继续运行，由settle_pending_report处理结果
+        tool_calls = await asyncio.shield(task)
+    except Exception as e:
+        _pending_reports.pop(key, None)
+        logger.opt(exception=e, colors=True).error(f"内容审查失败：{e!s}")
+        return
+    # 结果只处理一次，同时等待的其他调用方直接返回
+    if _pending_reports.pop(key, None) is None:
+        return
+    await _handle_report_calls(tool_calls, nonebot_event, bot, matcher)
+
+
+def settle_pending_report(nonebot_event: MessageEvent, bot: Bot) -> None:
+    """对话结束时处理未被report_gate取回的审查任务
+
+    对话可能在触发ChatEvent之前结束（未生成回复、被降级或被过滤），此时审查任务仍会运行完毕，
+    并在后台处理审查结果，避免违规内容被漏报。
+    """
+    if (task := _pending_reports.pop(_report_key(nonebot_event), None)) is None:
+        return
+
+    async def settle() -> None:
+        try:
+            tool_calls = await task
+            await _handle_report_calls(tool_calls, nonebot_event, bot, None)
+        except Exception as e:
+            logger.opt(exception=e, colors=True).error(f"内容审查失败：{e!s}")
+
+    settling = asyncio.create_task(settle())
+    _settling_reports.add(settling)
+    settling.add_done_callback(_settling_reports.discard)
+
+
 @checkhook.handle()
 async def text_check(event: BeforeChatEvent) -> None:
     config = config_manager.config
     if not config.llm_config.tools.enable_report:
         checkhook.pass_event()
+    text, has_media = _latest_user_text(event)
+    if config.llm_config.tools.report_prefilter.enable and not (
+        ModerationPrefilter().should_escalate(text, has_media)
+    ):
+        return
     logger.info("正在进行内容审查......")
-    bot = get_bot()
-    tool_list = [REPORT_TOOL]
-    msg = event._send_message
+    bot = typing.cast(Bot, get_bot())
+    msg = list(event._send_message)
     if config.llm_config.tools.report_exclude_system_prompt:
         msg = msg[1:]
     if config.llm_config.tools.report_exclude_context:
         msg = msg[:-1]
-    response = await tools_caller(msg, tool_list)
     nonebot_event = typing.cast(MessageEvent, event.get_nonebot_event())
-    if tool_calls := response.tool_calls:
-        for tool_call in tool_calls:
-            function_name = tool_call.function.name
-            function_args: dict[str, Any] = json.loads(tool_call.function.arguments)
-            if function_name == REPORT_TOOL.function.name:
-                await report(
-                    nonebot_event,
-                    function_args.get("content", ""),
-                    typing.cast(Bot, bot),
-                )
-                if config_manager.config.llm_config.tools.report_then_block:
-                    data = await get_memory_data(nonebot_event)
-                    data.memory.messages = []
-                    await data.save(nonebot_event)
-                    await bot.send(
-                        nonebot_event,
-                        random.choice(config_manager.config.llm_config.block_msg),
-                    )
-                    prehook.cancel_nonebot_process()
-            else:
-                await send_to_admin(
-                    f"[LLM-Report] 检测到非传入工具调用：{function_name}，请向模型提供商反馈此问题。"
-                )
+    if config.llm_config.tools.report_concurrent:
+        # 审查与后续的工具调用、回复生成并发进行，发送回复前由report_gate等待结果
+        _pending_reports[_report_key(nonebot_event)] = asyncio.create_task(
+            _moderate(msg, has_media)
+        )
+        return
+    await _handle_report_calls(
+        await _moderate(msg, has_media), nonebot_event, bot, prehook
+    )
+
+
+@reportgate.handle()
+async def report_gate(event: ChatEvent, bot: Bot) -> None:
+    """并发审查模式下，在回复发送前等待审查结果"""
+    nonebot_event = typing.cast(MessageEvent, event.get_nonebot_event())
+    await _await_pending_report(nonebot_event, bot, reportgate)
 
 
 @prehook.handle()
 async def agent_core(event: BeforeChatEvent) -> None:
     agent_last_step = [""]
 
+    async def send_agent_msg(message: str):
+        """发送Agent过程消息，并发审查模式下先等待审查结果"""
+        message_event = typing.cast(MessageEvent, nonebot_event)
+        await _await_pending_report(message_event, bot, prehook)
+        Outbox().enqueue(bot, message_event, message, coalesce=False)
+
     async def append_reasoning_msg(
         msg: list,
         original_msg: str = "",
@@ -126,7 +256,7 @@ async def agent_core(event: BeforeChatEvent) -> None:
             tool = tool_calls[0]
             if reasoning := json.loads(tool.function.arguments).get("reasoning"):
                 agent_last_step[0] = reasoning
-                await bot.send(nonebot_event, f"[Agent] {reasoning}")
+                await send_agent_msg(f"[Agent] {reasoning}")
                 msg.append(Message.model_validate(response, from_attributes=True))
                 msg.append(
                     ToolResult(
@@ -137,150 +267,191 @@ async def agent_core(event: BeforeChatEvent) -> None:
                     )
                 )
 
+    async def call_tool(
+        tool_call: ToolCall, deadline: float | None
+    ) -> ToolResult | None:
+        """执行单个工具调用，返回None表示该调用没有结果"""
+        tools_config = config_manager.config.llm_config.tools
+        function_name = tool_call.function.name
+        logger.debug(f"函数参数为{tool_call.function.arguments}")
+        logger.debug(f"正在调用函数{function_name}")
+        try:
+            function_args: dict[str, Any] = json.loads(tool_call.function.arguments)
+            if (tool_data := ToolsManager().get_tool(function_name)) is None:
+                logger.error(f"ChatHook中遇到了未定义的函数：{function_name}")
+                return None
+            timeout = (
+                tool_data.timeout
+                if tool_data.timeout is not None
+                else tools_config.tool_timeout
+            ) or None
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0.0)
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            func_response = await ToolsManager().run_tool(
+                tool_data,
+                ToolContext(data=function_args, event=event, matcher=prehook, bot=bot),
+                timeout,
+            )
+            if func_response is None:
+                return None
+        except Exception as e:
+            if isinstance(e, ChatException):
+                raise
+            logger.warning(f"函数{function_name}执行失败：{e}")
+            if (
+                tools_config.agent_mode_enable
+                and function_name not in BUILTIN_TOOLS_NAME
+            ):
+                await send_agent_msg(f"ERR: Tool {function_name} 执行失败")
+            return ToolResult(
+                name=function_name,
+                content=f"ERR: Tool {function_name} 执行失败\n{e!s}",
+                tool_call_id=tool_call.id,
+            )
+        logger.debug(f"函数{function_name}返回：{func_response}")
+        return ToolResult(
+            content=func_response,
+            name=function_name,
+            tool_call_id=tool_call.id,
+        )
+
+    async def dispatch_tools(
+        tool_calls: list[ToolCall], deadline: float | None
+    ) -> list[ToolResult]:
+        """执行同一轮中的工具调用
+
+        允许并发的工具同时执行，不允许并发的工具随后依次执行，
+        结果按模型给出的工具调用顺序返回。
+        """
+        results: dict[str, ToolResult | None] = {}
+        parallel: list[ToolCall] = []
+        serial: list[ToolCall] = []
+        for tool_call in tool_calls:
+            tool_data = ToolsManager().get_tool(tool_call.function.name)
+            (serial if tool_data and not tool_data.concurrent else parallel).append(
+                tool_call
+            )
+        tasks = [
+            asyncio.create_task(call_tool(tool_call, deadline))
+            for tool_call in parallel
+        ]
+        try:
+            for tool_call, result in zip(parallel, await asyncio.gather(*tasks)):
+                results[tool_call.id] = result
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        for tool_call in serial:
+            results[tool_call.id] = await call_tool(tool_call, deadline)
+        return [
+            result
+            for tool_call in tool_calls
+            if (result := results.get(tool_call.id)) is not None
+        ]
+
     async def run_tools(
         msg_list: list,
         nonebot_event: MessageEvent,
-        call_count: int = 0,
         original_msg: str = "",
     ):
-        logger.debug(f"开始第{call_count + 1}轮工具调用，当前消息数: {len(msg_list)}")
-        if config_manager.config.llm_config.tools.agent_mode_enable and (
-            (
-                call_count == 0
-                and config_manager.config.llm_config.tools.agent_thought_mode
-                == "reasoning"
-            )
-            or config_manager.config.llm_config.tools.agent_thought_mode
-            == "reasoning-required"
-        ):
-            await append_reasoning_msg(msg_list, original_msg)
-
-        if call_count > config_manager.config.llm_config.tools.agent_tool_call_limit:
-            await bot.send(nonebot_event, "调用工具次数过多，Agent工作已终止。")
-            return
-        response_msg = await tools_caller(
-            msg_list,
-            tools,
+        tools_config = config_manager.config.llm_config.tools
+        deadline = (
+            time.monotonic() + tools_config.agent_time_budget
+            if tools_config.agent_time_budget > 0
+            else None
         )
-        if tool_calls := response_msg.tool_calls:
-            result_msg_list: list[ToolResult] = []
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                function_args: dict[str, Any] = json.loads(tool_call.function.arguments)
-                logger.debug(f"函数参数为{tool_call.function.arguments}")
-                logger.debug(f"正在调用函数{function_name}")
-                try:
-                    match function_name:
-                        case REASONING_TOOL.function.name:
-                            logger.debug("正在生成任务摘要与原因。")
-                            await append_reasoning_msg(
-                                msg_list,
-                                original_msg,
-                                agent_last_step[0],
-                            )
-                            continue
-                        case STOP_TOOL.function.name:
-                            logger.debug("Agent工作已终止。")
-                            msg_list.append(
-                                Message(
-                                    role="user",
-                                    content="你已经完成了聊天前任务，请继续完成对话补全。"
-                                    + (
-                                        f"\n<INPUT>{original_msg}</INPUT>"
-                                        if original_msg
-                                        else ""
-                                    ),
-                                )
-                            )
-                            return
-                        case _:
-                            if (
-                                tool_data := ToolsManager().get_tool(function_name)
-                            ) is not None:
-                                if not tool_data.custom_run:
-                                    msg_list.append(
-                                        Message.model_validate(
-                                            response_msg, from_attributes=True
-                                        )
-                                    )
-                                    func_response: str = await typing.cast(
-                                        Callable[[dict[str, Any]], Awaitable[str]],
-                                        tool_data.func,
-                                    )(function_args)
-                                elif (
-                                    tool_response := await typing.cast(
-                                        Callable[[ToolContext], Awaitable[str | None]],
-                                        tool_data.func,
-                                    )(
-                                        ToolContext(
-                                            data=function_args,
-                                            event=event,
-                                            matcher=prehook,
-                                            bot=bot,
-                                        )
-                                    )
-                                ) is None:
-                                    continue
-                                else:
-                                    msg_list.append(
-                                        Message.model_validate(
-                                            response_msg, from_attributes=True
-                                        )
-                                    )
-                                    func_response = tool_response
-                            else:
-                                logger.opt(exception=True, colors=True).error(
-                                    f"ChatHook中遇到了未定义的函数：{function_name}"
-                                )
-                                continue
-                except Exception as e:
-                    if isinstance(e, ChatException):
-                        raise
-                    logger.warning(f"函数{function_name}执行失败：{e}")
-                    if (
-                        config_manager.config.llm_config.tools.agent_mode_enable
-                        and function_name not in BUILTIN_TOOLS_NAME
-                    ):
-                        await bot.send(
-                            nonebot_event, f"ERR: Tool {function_name} 执行失败"
-                        )
-                    msg_list.append(
-                        ToolResult(
-                            name=function_name,
-                            content=f"ERR: Tool {function_name} 执行失败\n{e!s}",
-                            tool_call_id=tool_call.id,
-                        )
-                    )
-                    continue
-                else:
-                    logger.debug(f"函数{function_name}返回：{func_response}")
-
-                    msg: ToolResult = ToolResult(
-                        content=func_response,
-                        name=function_name,
-                        tool_call_id=tool_call.id,
+        call_count = 0
+        round_count = 0
+        while True:
+            logger.debug(
+                f"开始第{round_count + 1}轮工具调用，当前消息数: {len(msg_list)}"
+            )
+            # 过载时跳过可选的推理调用
+            skip_reasoning = LoadShedder().stage >= ShedStage.SKIP_REASONING
+            if (
+                tools_config.agent_mode_enable
+                and not skip_reasoning
+                and (
+                    (
+                        round_count == 0
+                        and tools_config.agent_thought_mode == "reasoning"
                     )
-                    msg_list.append(msg)
-                    result_msg_list.append(msg)
-                finally:
-                    call_count += 1
-            if config_manager.config.llm_config.tools.agent_mode_enable:
-                # 发送工具调用信息给用户
-                await bot.send(
-                    nonebot_event,
-                    f"调用了函数{''.join([f'`{i.function.name}`,' for i in tool_calls])}",
+                    or tools_config.agent_thought_mode == "reasoning-required"
                 )
-                observation_msg = "\n".join(
-                    [f"{result.name}: {result.content}\n" for result in result_msg_list]
+            ):
+                await append_reasoning_msg(msg_list, original_msg)
+
+            if call_count > tools_config.agent_tool_call_limit:
+                await send_agent_msg("调用工具次数过多，Agent工作已终止。")
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                await send_agent_msg("工具调用耗时过长，Agent工作已终止。")
+                return
+            response_msg = await tools_caller(
+                msg_list,
+                tools,
+            )
+            if not (tool_calls := response_msg.tool_calls):
+                return
+            function_names = {tool_call.function.name for tool_call in tool_calls}
+            regular_calls = [
+                tool_call
+                for tool_call in tool_calls
+                if tool_call.function.name
+                not in (REASONING_TOOL.function.name, STOP_TOOL.function.name)
+            ]
+            if regular_calls:
+                # 外部工具可能产生副作用，并发审查模式下须在审查通过后再执行
+                await _await_pending_report(nonebot_event, bot, prehook)
+            result_msg_list = await dispatch_tools(regular_calls, deadline)
+            call_count += len(tool_calls)
+            if result_msg_list:
+                # 只保留有返回结果的工具调用，保证每个工具调用都有对应的结果
+                answered = {result.tool_call_id for result in result_msg_list}
+                assistant_msg = Message.model_validate(
+                    response_msg, from_attributes=True
+                )
+                assistant_msg.tool_calls = [
+                    tool_call for tool_call in tool_calls if tool_call.id in answered
+                ]
+                msg_list.append(assistant_msg)
+                msg_list.extend(result_msg_list)
+            if REASONING_TOOL.function.name in function_names and not skip_reasoning:
+                logger.debug("正在生成任务摘要与原因。")
+                await append_reasoning_msg(
+                    msg_list,
+                    original_msg,
+                    agent_last_step[0],
                 )
+            if STOP_TOOL.function.name in function_names:
+                logger.debug("Agent工作已终止。")
                 msg_list.append(
                     Message(
                         role="user",
-                        content=f"观察结果:\n```text\n{observation_msg}\n```"
-                        + f"\n请基于以上工具执行结果继续完成任务，如果任务已完成请使用工具 '{STOP_TOOL.function.name}' 结束。",
+                        content="你已经完成了聊天前任务，请继续完成对话补全。"
+                        + (f"\n<INPUT>{original_msg}</INPUT>" if original_msg else ""),
                     )
                 )
-                await run_tools(msg_list, nonebot_event, call_count, original_msg)
+                return
+            if not tools_config.agent_mode_enable:
+                return
+            # 发送工具调用信息给用户
+            await send_agent_msg(
+                f"调用了函数{''.join([f'`{i.function.name}`,' for i in tool_calls])}"
+            )
+            observation_msg = "\n".join(
+                [f"{result.name}: {result.content}\n" for result in result_msg_list]
+            )
+            msg_list.append(
+                Message(
+                    role="user",
+                    content=f"观察结果:\n```text\n{observation_msg}\n```"
+                    + f"\n请基于以上工具执行结果继续完成任务，如果任务已完成请使用工具 '{STOP_TOOL.function.name}' 结束。",
+                )
+            )
+            round_count += 1
 
     config = config_manager.config
     if not config.llm_config.tools.enable_tools:
@@ -294,13 +465,15 @@ async def agent_core(event: BeforeChatEvent) -> None:
         deepcopy(event.message)[-1],
     ]
     chat_list_backup = deepcopy(event.message.copy())
-    tools: list[dict[str, Any]] = []
+    agent_tools: tuple[ToolFunctionSchema, ...] = ()
     if config.llm_config.tools.agent_mode_enable:
-        tools.append(STOP_TOOL.model_dump())
-        if config.llm_config.tools.agent_thought_mode.startswith("reasoning"):
-            tools.append(REASONING_TOOL.model_dump(exclude_none=True))
-    tools.extend(ToolsManager().tools_meta_dict(exclude_none=True).values())
-    logger.debug(f"工具列表：{tools}")
+        agent_tools = (
+            (STOP_TOOL, REASONING_TOOL)
+            if config.llm_config.tools.agent_thought_mode.startswith("reasoning")
+            else (STOP_TOOL,)
+        )
+    tools = ToolsManager().tools_payload(agent_tools)
+    logger.debug("工具列表：{}", tools)
     if not tools:
         logger.warning("未定义任何有效工具！Tools Workflow已跳过。")
         return
@@ -350,8 +523,10 @@ async def cookie(event: ChatEvent, bot: Bot):
                 data = await get_memory_data(nonebot_event)
                 data.memory.messages = []
                 await data.save(nonebot_event)
-                await bot.send(
-                    nonebot_event,
+                Outbox().enqueue(
+                    bot,
+                    typing.cast(MessageEvent, nonebot_event),
                     random.choice(config_manager.config.llm_config.block_msg),
+                    coalesce=False,
                 )
                 posthook.cancel_nonebot_process()
@@ -3,13 +3,14 @@ import random
 import time
 
 import nonebot
-from nonebot import get_driver, logger
+from nonebot import logger
 from nonebot.adapters.onebot.v11 import Bot
 from nonebot.adapters.onebot.v11.event import (
     Event,
     GroupMessageEvent,
     MessageEvent,
 )
+from nonebot.typing import T_State
 from typing_extensions import override
 
 from amrita.plugins.chat.utils.libchat import usage_enough
@@ -19,9 +20,12 @@ from .utils.functions import (
     get_current_datetime_timestamp,
     synthesize_message,
 )
+from .utils.load_shedder import LoadShedder, ShedStage
+from .utils.member_cache import MemberInfoCache
 from .utils.memory import Message, get_memory_data
 
-nb_config = get_driver().config
+# 状态中标记本次对话由自动回复随机触发的键
+AUTOREPLY_STATE_KEY = "_chat_autoreply"
 
 
 class FakeEvent(Event):
@@ -50,14 +54,10 @@ async def is_bot_enabled(event: Event) -> bool:
 async def is_group_admin(event: GroupMessageEvent, bot: Bot) -> bool:
     try:
         role: str = (
-            (
-                await bot.get_group_member_info(
-                    group_id=event.group_id, user_id=event.user_id
-                )
-            )["role"]
-            if not event.sender.role
-            else event.sender.role
-        )
+            await MemberInfoCache().get(
+                bot, event.group_id, event.user_id, event.sender
+            )
+        )["role"]
         if role != "member":
             return True
         if await is_bot_admin(event):
@@ -68,9 +68,7 @@ async def is_group_admin(event: GroupMessageEvent, bot: Bot) -> bool:
 
 
 async def is_bot_admin(event: Event) -> bool:
-    return (int(event.get_user_id())) in config_manager.config.admin.admins + [
-        int(user) for user in nb_config.superusers if user.isdigit()
-    ]
+    return config_manager.snapshot.is_admin(event.get_user_id())
 
 
 async def is_group_admin_if_is_in_group(event: MessageEvent, bot: Bot) -> bool:
@@ -79,45 +77,47 @@ async def is_group_admin_if_is_in_group(event: MessageEvent, bot: Bot) -> bool:
     return True
 
 
-async def should_respond_to_message(event: MessageEvent, bot: Bot) -> bool:
-    """根据配置和消息事件判断是否需要回复"""
+async def should_respond_to_message(
+    event: MessageEvent, bot: Bot, state: T_State
+) -> bool:
+    """根据配置和消息事件判断是否需要回复，由自动回复触发时在状态中标记"""
 
     message = event.get_message()
     message_text = message.extract_plain_text().strip()
     if not isinstance(event, GroupMessageEvent):
         return True
 
+    snapshot = config_manager.snapshot
+    config = snapshot.config
+
     # 判断是否以关键字触发回复
-    if "at" in config_manager.config.autoreply.keywords:  # 如果配置为 at 开头
+    if snapshot.reply_on_at:  # 如果配置为 at 开头
         if event.is_tome():  # 判断是否 @ 了机器人
             return True
-    if config_manager.config.autoreply.keywords_mode == "starts_with":
-        if message_text.startswith(
-            tuple(i for i in config_manager.config.autoreply.keywords if i != "at")
-        ):
+    if config.autoreply.keywords_mode == "starts_with":
+        if message_text.startswith(snapshot.reply_keywords):
             return True
-    elif config_manager.config.autoreply.keywords_mode == "contains":
-        if any(
-            keyword in message_text
-            for keyword in config_manager.config.autoreply.keywords
-            if keyword != "at"
-        ):
+    elif config.autoreply.keywords_mode == "contains":
+        if any(keyword in message_text for keyword in snapshot.reply_keywords):
             return True
 
     # 判断是否启用了AutoReply模式
-    if config_manager.config.autoreply.enable:
+    if config.autoreply.enable:
         # 根据概率决定是否回复
         rand = random.random()
-        rate = config_manager.config.autoreply.probability
+        rate = config.autoreply.probability
 
         # 获取记忆数据
         memory_data = await get_memory_data(event)
-        if rand <= rate and (
-            config_manager.config.autoreply.global_enable or memory_data.fake_people
-        ):
-            memory_data.timestamp = time.time()
-            await memory_data.save(event)
-            return True
+        if rand <= rate and (config.autoreply.global_enable or memory_data.fake_people):
+            shedder = LoadShedder()
+            if shedder.evaluate() < ShedStage.DROP_AUTOREPLY:
+                memory_data.timestamp = time.time()
+                await memory_data.save(event)
+                state[AUTOREPLY_STATE_KEY] = True
+                return True
+            # 过载时不再由自动回复触发对话，仅记录消息
+            shedder.stats.shed_autoreply += 1
         # 合成消息内容
         content = await synthesize_message(message, bot)
 
@@ -125,15 +125,10 @@ async def should_respond_to_message(event: MessageEvent, bot: Bot) -> bool:
         Date = get_current_datetime_timestamp()
 
         # 获取用户角色信息
-        role = (
-            (
-                await bot.get_group_member_info(
-                    group_id=event.group_id, user_id=event.user_id
-                )
-            )
-            if not event.sender.role
-            else event.sender.role
+        member_info = await MemberInfoCache().get(
+            bot, event.group_id, event.user_id, event.sender
         )
+        role = member_info["role"]
         if role == "admin":
             role = "群管理员"
         elif role == "owner":
@@ -144,10 +139,8 @@ async def should_respond_to_message(event: MessageEvent, bot: Bot) -> bool:
         # 获取用户 ID 和昵称
         user_id = event.user_id
         user_name = (
-            (await bot.get_group_member_info(group_id=event.group_id, user_id=user_id))[
-                "nickname"
-            ]
-            if not config_manager.config.function.use_user_nickname
+            member_info["nickname"]
+            if not config.function.use_user_nickname
             else event.sender.nickname
         )
 
@@ -165,7 +158,7 @@ async def should_respond_to_message(event: MessageEvent, bot: Bot) -> bool:
             message_l[-1].content += "\n" + content_message
         if len(
             message_l[-1].content
-        ) > config_manager.config.llm_config.memory_lenth_limit * 10 and isinstance(
+        ) > config.llm_config.memory_lenth_limit * 10 and isinstance(
             message_l[-1].content, str
         ):
             lines = message_l[-1].content.splitlines(keepends=True)
@@ -182,8 +175,10 @@ async def should_respond_to_message(event: MessageEvent, bot: Bot) -> bool:
     return False
 
 
-async def should_respond_with_usage_check(event: MessageEvent, bot: Bot) -> bool:
-    if await should_respond_to_message(event, bot):
+async def should_respond_with_usage_check(
+    event: MessageEvent, bot: Bot, state: T_State
+) -> bool:
+    if await should_respond_to_message(event, bot, state):
         if not await usage_enough(event) or not (
             await usage_enough(
                 FakeEvent(time=0, self_id=0, post_type="", user_id=event.user_id)
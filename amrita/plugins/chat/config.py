@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import json
 import os
@@ -78,6 +79,11 @@ class ModelPreset(BaseModel):
     multimodal: bool = Field(
         default=False, description="是否支持多模态输入（如图片识别）"
     )
+    rpm_limit: int = Field(default=0, description="每分钟最大请求数（0为不限制）")
+    tpm_limit: int = Field(default=0, description="每分钟最大Token数（0为不限制）")
+    image_max_side: int = Field(
+        default=0, description="发送给该预设的图片最长边像素数（0为使用全局配置）"
+    )
     extra: dict[str, Any] = Field(default_factory=dict)
 
     @classmethod
@@ -96,6 +102,52 @@ class ModelPreset(BaseModel):
             json.dump(self.model_dump(), f, indent=4, ensure_ascii=False)
 
 
+class ReportPrefilterConfig(BaseModel):
+    enable: bool = Field(
+        default=False,
+        description="是否在LLM内容审查前启用本地预过滤（仅命中规则或无法确定的消息会提交给LLM审查）",
+    )
+    keywords: list[str] = Field(
+        default=[], description="预过滤关键词列表（大小写不敏感）"
+    )
+    regex_rules: list[str] = Field(default=[], description="预过滤正则规则列表")
+    uncertain_length: int = Field(
+        default=200, description="消息长度达到该值时视为无法确定"
+    )
+    escalate_on: Literal["flagged", "uncertain", "always"] = Field(
+        default="uncertain",
+        description="提交LLM审查的策略。flagged: 仅命中规则的消息；"
+        "uncertain: 命中规则或无法确定的消息；always: 所有消息（仅统计）",
+    )
+    cache_size: int = Field(default=4096, description="预过滤结果缓存的最大条数")
+
+
+class ReportBatchConfig(BaseModel):
+    enable: bool = Field(
+        default=False,
+        description="是否批量进行内容审查（在短时间窗口内合并多个会话的消息，每条消息附带其会话最近的几条上下文）",
+    )
+    window_ms: int = Field(default=50, description="批量审查的收集窗口（毫秒）")
+    max_size: int = Field(default=16, description="单次批量审查的最大消息数")
+    context_messages: int = Field(
+        default=4, description="每条待审查消息附带的最近上下文条数"
+    )
+    context_chars: int = Field(
+        default=200, description="附带的每条上下文的最大字符数，超出部分会被截断"
+    )
+
+
+class ToolCachePolicy(BaseModel):
+    ttl: float = Field(default=60, description="缓存有效期（秒）")
+    key_fields: list[str] | None = Field(
+        default=None, description="参与缓存键计算的参数名列表（为空则使用全部参数）"
+    )
+    scope: Literal["global", "group", "user"] = Field(
+        default="global",
+        description="缓存共享范围。global: 全局共享；group: 同一群组共享（私聊按用户）；user: 同一用户共享",
+    )
+
+
 class ToolsConfig(BaseModel):
     enable_tools: bool = Field(
         default=True,
@@ -113,13 +165,36 @@ class ToolsConfig(BaseModel):
     report_then_block: bool = Field(
         default=True, description="检测到违规内容后是否熔断会话"
     )
+    report_concurrent: bool = Field(
+        default=False,
+        description="是否将内容审查与工具调用、回复生成并发执行（回复在发送前等待审查结果）",
+    )
+    report_prefilter: ReportPrefilterConfig = Field(
+        default=ReportPrefilterConfig(), description="内容审查本地预过滤配置"
+    )
+    report_batch: ReportBatchConfig = Field(
+        default=ReportBatchConfig(), description="内容审查批处理配置"
+    )
     require_tools: bool = Field(
         default=False, description="是否强制要求每次调用至少使用一个工具"
     )
+    tool_timeout: float = Field(
+        default=60, description="单个工具调用的默认超时时间（秒，0为不限制）"
+    )
+    tool_cache_size: int = Field(
+        default=1024, description="工具结果缓存的最大条数（0为禁用缓存）"
+    )
+    tool_cache_policies: dict[str, ToolCachePolicy] = Field(
+        default={},
+        description="按工具名称配置的结果缓存策略（可用于MCP导入的工具，会覆盖工具注册时声明的策略）",
+    )
     agent_mode_enable: bool = Field(default=False, description="使用实验性的智能体模式")
     agent_tool_call_limit: int = Field(
         default=10, description="智能体模式下的工具调用限制"
     )
+    agent_time_budget: float = Field(
+        default=300, description="单次工具调用流程的总时间预算（秒，0为不限制）"
+    )
     agent_thought_mode: Literal[
         "reasoning", "chat", "reasoning-required", "reasoning-optional"
     ] = Field(
@@ -135,6 +210,18 @@ class ToolsConfig(BaseModel):
     agent_mcp_server_scripts: list[str] = Field(
         default=[], description="MCP服务端脚本列表"
     )
+    mcp_init_timeout: float = Field(
+        default=30, description="启动时每个MCP服务端的初始化超时时间（秒，0为不限制）"
+    )
+    mcp_max_inflight: int = Field(
+        default=8, description="每个MCP服务端同时进行中的最大工具调用数"
+    )
+    mcp_keepalive_interval: float = Field(
+        default=30, description="MCP连接心跳间隔（秒）"
+    )
+    mcp_reconnect_max_delay: float = Field(
+        default=60, description="MCP断线重连的最大退避时间（秒）"
+    )
 
 
 class SessionConfig(BaseModel):
@@ -170,15 +257,57 @@ class FunctionConfig(BaseModel):
         + "queue: 等待上一条消息处理完再处理；\n"
         + "single_with_report: 忽略这条消息并提示用户正在等待。",
     )
+    chat_queue_size: int = Field(
+        default=10, description="queue模式下每个会话排队等待处理的最大消息数"
+    )
+    chat_queue_overflow: Literal["drop_oldest", "merge", "reject"] = Field(
+        default="reject",
+        description="会话消息队列已满时的处理策略。\n"
+        + "drop_oldest: 丢弃最早排队的消息；\n"
+        + "merge: 合并到同一用户排队中的消息，作为下一轮对话一起处理（没有可合并的消息时丢弃最早的消息）；\n"
+        + "reject: 拒绝这条消息并提示用户。",
+    )
+    chat_actor_idle_timeout: int = Field(
+        default=300, description="会话执行器空闲多久后被回收（秒）"
+    )
+    chat_coalesce_window_ms: int = Field(
+        default=0,
+        description="queue模式下的消息合并窗口（毫秒），窗口内或等待处理期间到达的消息合并为一轮对话，0为不合并",
+    )
+    chat_coalesce_max: int = Field(
+        default=10, description="一轮对话最多合并的消息数"
+    )
     synthesize_forward_message: bool = Field(
         default=True, description="是否解析合并转发消息"
     )
+    forward_cache_size: int = Field(
+        default=256, description="合并转发消息合成结果的缓存条目数"
+    )
+    forward_max_depth: int = Field(
+        default=3, description="合并转发消息的最大嵌套展开层数"
+    )
+    forward_max_nodes: int = Field(
+        default=200, description="单个合并转发消息最多解析的节点数，0为不限制"
+    )
+    forward_token_budget: int = Field(
+        default=4000, description="单个合并转发消息合成文本的Token预算，0为不限制"
+    )
     nature_chat_style: bool = Field(
         default=True, description="是否启用自然对话风格优化(自动分句)"
     )
     nature_chat_cut_pattern: str = Field(
         default=r'([。！？!?;；\n]+)[""\'\'"\s]*', description="分句功能的正则表达式"
     )
+    send_target_interval: float = Field(
+        default=1.0, description="向同一群聊或私聊连续发送消息的最小间隔（秒）"
+    )
+    send_bot_interval: float = Field(
+        default=0.2, description="同一Bot连续发送消息的最小间隔（秒）"
+    )
+    send_coalesce_threshold: int = Field(
+        default=5,
+        description="同一发送目标积压的消息数达到该值时合并相邻的纯文本消息，0为不合并",
+    )
     poke_reply: bool = Field(default=True, description="是否响应戳一戳事件")
     enable_group_chat: bool = Field(default=True, description="是否启用群聊功能")
     enable_private_chat: bool = Field(default=True, description="是否启用私聊功能")
@@ -188,6 +317,12 @@ class FunctionConfig(BaseModel):
     use_user_nickname: bool = Field(
         default=False, description="在群聊中使用QQ昵称而非群名片"
     )
+    member_info_cache_ttl: int = Field(
+        default=300, description="群成员信息缓存有效期（秒），0为不缓存"
+    )
+    member_info_cache_size: int = Field(
+        default=4096, description="群成员信息缓存的最大条目数"
+    )
 
     @property
     def pattern(self) -> re.Pattern:
@@ -284,6 +419,91 @@ class UsageLimitConfig(BaseModel):
     global_insights_expire_days: int = Field(default=7, description="全局统计过期天数")
 
 
+class SchedulerConfig(BaseModel):
+    enable: bool = Field(
+        default=False,
+        description="是否启用LLM请求的加权公平调度（按会话公平分配模型调用，并发数受max_concurrency限制）",
+    )
+    max_concurrency: int = Field(
+        default=8, description="全局同时进行的LLM请求数上限，0为不限制"
+    )
+    group_weight: float = Field(default=1.0, description="群聊中主动触发对话的权重")
+    autoreply_weight: float = Field(
+        default=0.5, description="群聊中由自动回复随机触发的对话的权重"
+    )
+    private_weight: float = Field(default=2.0, description="私聊对话的权重")
+    admin_weight: float = Field(default=4.0, description="Bot管理员发起的对话的权重")
+    priority_permission: str = Field(
+        default="chat.scheduler.priority",
+        description="拥有该权限节点的用户或群组使用优先权重",
+    )
+    priority_weight: float = Field(
+        default=3.0, description="拥有优先权限节点的用户或群组的权重"
+    )
+    session_weights: dict[str, float] = Field(
+        default={},
+        description='为指定会话设置权重，键为"group:群号"或"private:QQ号"，优先于其他规则',
+    )
+
+
+class LoadSheddingConfig(BaseModel):
+    enable: bool = Field(
+        default=False,
+        description="是否启用过载降级（根据LLM排队深度与近期P95延迟逐级减少处理工作）",
+    )
+    queue_thresholds: list[int] = Field(
+        default=[4, 8, 16, 24, 32],
+        description="进入各降级阶段的排队深度阈值，依次为：跳过推理调用、裁剪上下文、切换低成本预设、停止自动回复、直接回复繁忙提示",
+    )
+    latency_thresholds: list[float] = Field(
+        default=[15, 25, 35, 45, 55],
+        description="进入各降级阶段的P95延迟阈值（秒），阶段顺序同上",
+    )
+    recover_ratio: float = Field(
+        default=0.7,
+        description="恢复系数，排队深度与延迟均低于当前阶段阈值乘以该系数时才会降低一级",
+    )
+    hold_time: float = Field(
+        default=30, description="每个降级阶段至少保持的时间（秒）"
+    )
+    latency_window: int = Field(
+        default=100, description="计算P95延迟使用的最近请求数"
+    )
+    latency_max_age: float = Field(
+        default=120, description="计算P95延迟时样本的最长保留时间（秒）"
+    )
+    trim_ratio: float = Field(
+        default=0.5, description="裁剪上下文阶段保留的记忆比例"
+    )
+    cheap_preset: str = Field(
+        default="", description="切换低成本预设阶段使用的模型预设名称，为空则该阶段不切换预设"
+    )
+    busy_message: str = Field(
+        default="现在找我聊天的人太多啦，请稍后再试～",
+        description="繁忙阶段回复的提示消息",
+    )
+
+
+class ImagePipelineConfig(BaseModel):
+    enable: bool = Field(
+        default=True,
+        description="是否在收到图片时预先下载并缓存（避免图片链接过期与重复传输原图）",
+    )
+    max_side: int = Field(
+        default=1280, description="发送给模型的图片最长边像素数，超过时等比缩小"
+    )
+    jpeg_quality: int = Field(default=85, description="重新编码图片时的JPEG质量")
+    transport: Literal["base64", "file"] = Field(
+        default="base64",
+        description="图片传给模型的方式：base64(内嵌数据)/file(本地文件路径，仅适用于本地部署的模型服务)",
+    )
+    cache_size_mb: int = Field(
+        default=256, description="图片磁盘缓存的容量上限（MB），超出时淘汰最久未使用的图片"
+    )
+    max_download_mb: int = Field(default=20, description="单张图片的最大下载大小（MB）")
+    fetch_timeout: float = Field(default=15, description="下载图片的超时时间（秒）")
+
+
 class LLM_Config(BaseModel):
     tools: ToolsConfig = Field(default=ToolsConfig(), description="工具调用配置")
     stream: bool = Field(default=False, description="是否启用流式响应（逐字输出）")
@@ -299,6 +519,18 @@ class LLM_Config(BaseModel):
     llm_timeout: int = Field(default=60, description="API请求超时时间（秒）")
     auto_retry: bool = Field(default=True, description="请求失败时自动重试")
     max_retries: int = Field(default=3, description="最大重试次数")
+    rate_limit_timeout: float = Field(
+        default=30, description="所有预设均达到速率限制时，排队等待的最长时间（秒）"
+    )
+    scheduler: SchedulerConfig = Field(
+        default=SchedulerConfig(), description="LLM请求调度配置"
+    )
+    load_shedding: LoadSheddingConfig = Field(
+        default=LoadSheddingConfig(), description="过载降级配置"
+    )
+    image: ImagePipelineConfig = Field(
+        default=ImagePipelineConfig(), description="多模态图片处理配置"
+    )
     block_msg: list[str] = Field(
         default=[
             "喵呜～这个问题有点超出Suggar的理解范围啦(歪头)",
@@ -458,6 +690,51 @@ class Prompts:
                 f.write(prompt.text)
 
 
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """配置快照
+
+    每次配置重载后构建一次，并预先计算热路径中使用的派生值。
+    处理单个事件时应只获取一次快照，并在整个处理过程中使用它。
+    """
+
+    config: Config  # 已替换环境变量的配置（只读）
+    admins: frozenset[int]
+    split_pattern: re.Pattern[str]
+    preset_order: tuple[str, ...]  # 主预设+备用预设
+    reply_on_at: bool  # 自动回复关键字是否包含 at
+    reply_keywords: tuple[str, ...]  # 自动回复关键字（不含 at）
+    version: int
+
+    @classmethod
+    def build(cls, config: Config, version: int) -> "ConfigSnapshot":
+        keywords = config.autoreply.keywords
+        return cls(
+            config=config,
+            admins=frozenset(config.admin.admins).union(
+                int(user) for user in nb_config.superusers if user.isdigit()
+            ),
+            split_pattern=re.compile(config.function.nature_chat_cut_pattern),
+            preset_order=(
+                config.preset,
+                *config.preset_extension.backup_preset_list,
+            ),
+            reply_on_at="at" in keywords,
+            reply_keywords=tuple(keyword for keyword in keywords if keyword != "at"),
+            version=version,
+        )
+
+    def is_admin(self, user_id: int | str) -> bool:
+        return int(user_id) in self.admins
+
+
+@dataclass(frozen=True)
+class PresetLists:
+    fallback: tuple[str, ...]  # 主预设+备用预设
+    multimodal: tuple[str, ...]  # 处理多模态消息时使用的预设
+    multimodal_available: bool  # 是否存在可处理多模态消息的预设
+
+
 @dataclass
 class ConfigManager:
     config_dir: Path = CONFIG_DIR
@@ -468,24 +745,40 @@ class ConfigManager:
     _private_train: dict[str, Any] = field(default_factory=dict)
     _group_train: dict[str, Any] = field(default_factory=dict)
     _model_name2file: dict[str, Path] = field(default_factory=dict)
+    _presets: dict[str, ModelPreset] = field(default_factory=dict)  # 名称 -> 预设
+    _preset_files: dict[Path, ModelPreset] = field(default_factory=dict)
+    _preset_file_states: dict[Path, tuple[int, int]] = field(
+        default_factory=dict
+    )  # 文件 -> (mtime_ns, size)
+    _preset_version: int = 0
+    _preset_lists: PresetLists | None = None
+    _preset_lists_key: tuple[int, int] | None = None
     ins_config: Config = field(default_factory=Config)
     models: list[tuple[ModelPreset, str]] = field(default_factory=list)
     prompts: Prompts = field(default_factory=Prompts)
     _config_id: int | None = None
-    _cached_env_config: Config | None = None
+    _snapshot: ConfigSnapshot | None = None
+    _snapshot_version: int = 0
     _owner_name = store._try_get_caller_plugin().name
 
     @property
     def config(self) -> Config:
+        return self.snapshot.config
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """获取当前配置快照，配置重载或保存后重建"""
         conf_id = id(self.ins_config)
-        if conf_id == self._config_id:
-            assert self._cached_env_config
-            return self._cached_env_config
+        if self._snapshot is not None and conf_id == self._config_id:
+            return self._snapshot
         self._config_id = conf_id
         conf_data: dict[str, Any] = self.ins_config.model_dump()
         result = replace_env_vars(conf_data)
-        self._cached_env_config = Config.model_validate(result)
-        return self._cached_env_config
+        self._snapshot_version += 1
+        self._snapshot = ConfigSnapshot.build(
+            Config.model_validate(result), self._snapshot_version
+        )
+        return self._snapshot
 
     async def load(self):
         """_初始化配置目录_"""
@@ -498,8 +791,10 @@ class ConfigManager:
 
         async def models_callback():
             logger.info("正在重载模型目录...")
-            await self.get_all_presets(False)
-            logger.success("完成")
+            if await self.refresh_presets_async():
+                logger.success("完成")
+            else:
+                logger.info("模型预设没有变化")
 
         async def on_load(*args):
             self.ins_config = typing.cast(Config, await UniConfigManager().get_config())
@@ -531,35 +826,114 @@ class ConfigManager:
         )
 
     def validate_presets(self):
-        def validate_preset(path: Path):
-            try:
-                model_data = ModelPreset.load(path)
-                model_data.save(path)
-                self._model_name2file[model_data.name] = path
-            except Exception as e:
-                logger.opt(colors=True).error(
-                    f"Failed to validate preset '{file!s}' because '{e!s}'"
-                )
-
+        """校验模型预设文件，仅在内容需要修正时才写回文件"""
         for file in self.custom_models_dir.glob("*.json"):
-            validate_preset(file)
+            self._load_preset_file(file, fix=True)
+        self._rebuild_preset_index()
 
-    async def get_all_presets(self, cache: bool = False) -> list[ModelPreset]:
-        """获取模型列表"""
-        if cache and self.models:
-            return [model for model, _ in self.models]
-        self.models.clear()  # 清空模型列表
+    def _load_preset_file(self, path: Path, fix: bool = False) -> bool:
+        """加载单个预设文件到索引
 
-        for file in self.custom_models_dir.glob("*.json"):
-            model_data = ModelPreset.load(file).model_dump()
-            preset_data = replace_env_vars(model_data)
+        Args:
+            path (Path): 预设文件路径
+            fix (bool, optional): 是否将校验后的内容写回文件. Defaults to False.
+
+        Returns:
+            bool: 是否加载成功
+        """
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                raw_data = json.load(f)
+            model_data = ModelPreset.model_validate(raw_data)
+            if fix and model_data.model_dump() != raw_data:
+                model_data.save(path)
+            preset_data = replace_env_vars(model_data.model_dump())
             if not isinstance(preset_data, dict):
                 raise TypeError("Expected replace_env_vars to return a dict")
-            model_preset = ModelPreset.model_validate(preset_data)
+            self._preset_files[path] = ModelPreset.model_validate(preset_data)
+            stat = path.stat()
+            self._preset_file_states[path] = (stat.st_mtime_ns, stat.st_size)
+            return True
+        except Exception as e:
+            self._preset_files.pop(path, None)
+            self._preset_file_states.pop(path, None)
+            logger.opt(colors=True).error(
+                f"Failed to load preset '{path!s}' because '{e!s}'"
+            )
+            return False
+
+    def _rebuild_preset_index(self):
+        """根据已加载的预设文件重建名称索引"""
+        self._presets.clear()
+        self._model_name2file.clear()
+        self.models.clear()
+        for file in sorted(self._preset_files):
+            model_preset = self._preset_files[file]
+            if model_preset.name in self._presets:
+                logger.warning(
+                    f"预设名称 `{model_preset.name}` 重复，已忽略文件 {file.name}"
+                )
+                continue
+            self._presets[model_preset.name] = model_preset
             self._model_name2file[model_preset.name] = file
             self.models.append((model_preset, file.stem))
+        self._preset_version += 1
+
+    def _scan_preset_dir(self) -> dict[Path, tuple[int, int]]:
+        """获取模型目录中各预设文件的修改时间与大小"""
+        current: dict[Path, tuple[int, int]] = {}
+        for file in self.custom_models_dir.glob("*.json"):
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            current[file] = (stat.st_mtime_ns, stat.st_size)
+        return current
+
+    def refresh_presets(self) -> bool:
+        """同步模型目录的变更，只重新解析新增或修改过的预设文件
+
+        Returns:
+            bool: 预设索引是否发生变化
+        """
+        return self._apply_preset_scan(self._scan_preset_dir())
+
+    async def refresh_presets_async(self) -> bool:
+        """与refresh_presets相同，但目录扫描在线程中进行，不阻塞事件循环
+
+        Returns:
+            bool: 预设索引是否发生变化
+        """
+        return self._apply_preset_scan(await asyncio.to_thread(self._scan_preset_dir))
+
+    def _apply_preset_scan(self, current: dict[Path, tuple[int, int]]) -> bool:
+        """根据目录扫描结果更新预设索引，只重新解析新增或修改过的预设文件"""
+        removed = self._preset_file_states.keys() - current.keys()
+        changed = [
+            file
+            for file, state in current.items()
+            if self._preset_file_states.get(file) != state
+        ]
+        if not removed and not changed:
+            return False
+        for file in removed:
+            self._preset_files.pop(file, None)
+            self._preset_file_states.pop(file, None)
+        for file in changed:
+            self._load_preset_file(file)
+        self._rebuild_preset_index()
+        logger.debug(f"模型预设索引已更新：{len(changed)} 个变更，{len(removed)} 个移除")
+        return True
 
-        return [model for model, _ in self.models]
+    async def get_all_presets(self, cache: bool = False) -> list[ModelPreset]:
+        """获取模型列表
+
+        Args:
+            cache (bool, optional): 是否直接使用内存索引（不检查目录变更）. Defaults to False.
+        """
+        if not (cache and self._presets):
+            await self.refresh_presets_async()
+        return list(self._presets.values())
 
     async def get_preset(
         self, preset: str, fix: bool = False, cache: bool = False
@@ -569,20 +943,65 @@ class ConfigManager:
         Args:
             preset (str): _预设的字符串名称_
             fix (bool, optional): _是否修正不存在的预设_. Defaults to False.
-            cache (bool, optional): _是否使用缓存_. Defaults to False.
+            cache (bool, optional): _未命中索引时是否跳过目录检查_. Defaults to False.
 
         Returns:
             ModelPreset: _模型预设对象_
         """
         if preset == "default":
             return config_manager.config.default_preset
-        for model in await self.get_all_presets(cache=cache):
-            if model.name == preset:
+        if (model := self._presets.get(preset)) is not None:
+            return model
+        if not cache and await self.refresh_presets_async():
+            if (model := self._presets.get(preset)) is not None:
                 return model
         if fix:
             config_manager.ins_config.preset = "default"
             await config_manager.save_config()
-        return await self.get_preset("default", fix, cache)
+        return config_manager.config.default_preset
+
+    def _get_preset_lists(self) -> PresetLists:
+        """获取预计算的预设列表，预设索引或配置变化时重新计算"""
+        snapshot = self.snapshot
+        config = snapshot.config
+        key = (self._preset_version, snapshot.version)
+        if self._preset_lists is not None and self._preset_lists_key == key:
+            return self._preset_lists
+
+        def get(name: str) -> ModelPreset:
+            if name == "default":
+                return config.default_preset
+            return self._presets.get(name, config.default_preset)
+
+        fallback = snapshot.preset_order
+        multimodal = tuple(config.preset_extension.multi_modal_preset_list) or (
+            config.preset,
+            *(
+                name
+                for name in config.preset_extension.backup_preset_list
+                if get(name).multimodal
+            ),
+        )
+        self._preset_lists = PresetLists(
+            fallback=fallback,
+            multimodal=multimodal,
+            multimodal_available=any(get(name).multimodal for name in fallback)
+            or bool(config.preset_extension.multi_modal_preset_list),
+        )
+        self._preset_lists_key = key
+        return self._preset_lists
+
+    def get_fallback_presets(self) -> list[str]:
+        """获取按顺序尝试的预设名称列表（主预设+备用预设）"""
+        return list(self._get_preset_lists().fallback)
+
+    def get_multimodal_presets(self) -> list[str]:
+        """获取处理多模态消息时按顺序尝试的预设名称列表"""
+        return list(self._get_preset_lists().multimodal)
+
+    def has_multimodal_preset(self) -> bool:
+        """是否存在可处理多模态消息的预设"""
+        return self._get_preset_lists().multimodal_available
 
     async def get_prompts(
         self, cache: bool = False, load_only: bool = False
@@ -663,6 +1082,7 @@ class ConfigManager:
 
     async def save_config(self):
         """保存配置"""
+        self._snapshot = None  # 配置可能被原地修改，需要重建快照
         await UniConfigManager().save_config(self._owner_name)
 
     async def set_config(self, key: str, value: str):
@@ -18,17 +18,20 @@ from nonebot.adapters.onebot.v11 import (
     Bot,
     MessageSegment,
 )
+from nonebot.adapters.onebot.v11 import Message as OneBotMessage
 from nonebot.adapters.onebot.v11.event import (
     GroupMessageEvent,
     MessageEvent,
     PrivateMessageEvent,
     Reply,
+    Sender,
 )
-from nonebot.exception import NoneBotException
+from nonebot.exception import FinishedException, SkippedException, StopPropagation
 from nonebot.matcher import Matcher
 
+from ..builtin_hook import settle_pending_report
 from ..chatmanager import SessionTemp, chat_manager
-from ..check_rule import FakeEvent
+from ..check_rule import AUTOREPLY_STATE_KEY, FakeEvent
 from ..config import config_manager
 from ..event import BeforeChatEvent, ChatEvent
 from ..exception import CancelException
@@ -39,8 +42,11 @@ from ..utils.functions import (
     split_message_into_chats,
     synthesize_message,
 )
+from ..utils.images import ImagePipeline
 from ..utils.libchat import get_chat, get_tokens
+from ..utils.load_shedder import LoadShedder, ShedStage
 from ..utils.lock import get_group_lock, get_private_lock
+from ..utils.member_cache import MemberInfoCache
 from ..utils.memory import (
     Memory,
     MemoryModel,
@@ -55,7 +61,10 @@ from ..utils.models import (
     TextContent,
     UniResponseUsage,
 )
+from ..utils.outbox import Outbox
 from ..utils.protocol import UniResponse
+from ..utils.scheduler import DEFAULT_SESSION, LLMScheduler, resolve_session_weight
+from ..utils.session_actor import SESSION_KEY, SessionActors
 from ..utils.tokenizer import hybrid_token_count
 
 command_prefix = get_driver().config.command_start or "/"
@@ -133,18 +142,7 @@ async def synthesize_message_to_msg(
     content: str,
 ):
     """将消息转换为Message"""
-    is_multimodal: bool = (
-        any(
-            [
-                (await config_manager.get_preset(preset=preset)).multimodal
-                for preset in [
-                    config_manager.config.preset,
-                    *config_manager.config.preset_extension.backup_preset_list,
-                ]
-            ]
-        )
-        or len(config_manager.config.preset_extension.multi_modal_preset_list) > 0
-    )
+    is_multimodal: bool = config_manager.has_multimodal_preset()
 
     if config_manager.config.parse_segments:
         text = (
@@ -154,9 +152,12 @@ async def synthesize_message_to_msg(
                 )
             ]
             + [
-                ImageContent(image_url=ImageUrl(url=seg.data["url"]))
-                for seg in event.message
-                if seg.type == "image" and seg.data.get("url")
+                ImageContent(image_url=ImageUrl(url=url))
+                for url in await ImagePipeline().localize_all(
+                    seg.data["url"]
+                    for seg in event.message
+                    if seg.type == "image" and seg.data.get("url")
+                )
             ]
             if is_multimodal
             else f"[{role}][{Date}][{user_name}（{user_id}）]说:{content}"
@@ -166,6 +167,25 @@ async def synthesize_message_to_msg(
     return text
 
 
+def merge_user_turn(
+    contents: list[str | list[TextContent | ImageContent]],
+) -> Message:
+    """将多条消息的内容合并为一轮用户输入"""
+    if len(contents) == 1:
+        return Message(role="user", content=contents[0])
+    if all(isinstance(content, str) for content in contents):
+        return Message(
+            role="user", content="\n".join(typing.cast(list[str], contents))
+        )
+    merged: list[TextContent | ImageContent] = []
+    for content in contents:
+        if isinstance(content, str):
+            merged.append(TextContent(text=content))
+        else:
+            merged.extend(content)
+    return Message(role="user", content=merged)
+
+
 # =============================================================================
 # 主聊天处理函数
 # =============================================================================
@@ -190,11 +210,12 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
         if not reply:
             return
         msg = reply.message
-        for seg in msg:
-            if seg.type == "image":
-                url = seg.data.get("url")
-                if url:
-                    yield ImageContent(image_url=ImageUrl(url=url))
+        for url in await ImagePipeline().localize_all(
+            seg.data["url"]
+            for seg in msg
+            if seg.type == "image" and seg.data.get("url")
+        ):
+            yield ImageContent(image_url=ImageUrl(url=url))
         return
 
     # -------------------------------------------------------------------------
@@ -208,6 +229,7 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
         data: MemoryModel,
         memory_length_limit: int,
         Date: str,
+        extra_events: list[GroupMessageEvent] | None = None,
     ):
         """处理群聊消息：
         - 检查是否启用群聊功能。
@@ -223,20 +245,45 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
             data: 内存模型数据
             memory_length_limit: 记忆长度限制
             Date: 当前时间戳
+            extra_events: 合并到本轮对话中的其他消息
         """
-        if not config_manager.config.function.enable_group_chat:
-            matcher.skip()
-
         # 管理会话上下文
         await manage_sessions(event, data, chat_manager.session_clear_group)
 
+        # 合并的消息作为同一轮用户输入记录
+        data.memory.messages.append(
+            merge_user_turn(
+                [
+                    await build_group_message(ev, bot, Date)
+                    for ev in (event, *(extra_events or ()))
+                ]
+            )
+        )
+        if chat_manager.debug:
+            logger.debug(f"当前群组提示词：\n{config_manager.group_train}")
+        # 控制记忆长度和 token 限制
+        await enforce_memory_limit(data, memory_length_limit)
+
+        # 准备发送给模型的消息
+        send_messages = prepare_send_messages(
+            data, copy.deepcopy(Message.model_validate(config_manager.group_train))
+        )
+        response = await process_chat(event, data, send_messages)
+
+        await send_response(event, response.content, extra_events)
+
+    async def build_group_message(
+        event: GroupMessageEvent, bot: Bot, Date: str
+    ) -> str | list[TextContent | ImageContent]:
+        """将一条群聊消息转换为用户输入内容"""
         group_id = event.group_id
         user_id = event.user_id
+        member_info = await MemberInfoCache().get(
+            bot, group_id, user_id, event.sender
+        )
         user_name = (
-            (await bot.get_group_member_info(group_id=group_id, user_id=user_id))[
-                "nickname"
-            ]
-            if not config_manager.config.function.use_user_nickname
+            member_info["nickname"]
+            if not config.function.use_user_nickname
             else event.sender.nickname
         )
         content = await synthesize_message(event.get_message(), bot)
@@ -245,7 +292,7 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
             content = ""
 
         # 获取用户角色
-        role = await get_user_role(bot, group_id, user_id)
+        role = await get_user_role(bot, group_id, user_id, event.sender)
         if chat_manager.debug:
             logger.debug(f"{Date}{user_name}（{user_id}）说:{content}")
 
@@ -259,19 +306,7 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
         )
         if isinstance(text, list):
             text += reply_pics
-        data.memory.messages.append(Message(role="user", content=text))
-        if chat_manager.debug:
-            logger.debug(f"当前群组提示词：\n{config_manager.group_train}")
-        # 控制记忆长度和 token 限制
-        await enforce_memory_limit(data, memory_length_limit)
-
-        # 准备发送给模型的消息
-        send_messages = prepare_send_messages(
-            data, copy.deepcopy(Message.model_validate(config_manager.group_train))
-        )
-        response = await process_chat(event, send_messages)
-
-        await send_response(event, response.content)
+        return text
 
     # -------------------------------------------------------------------------
     # 内部辅助函数 - 私聊消息处理
@@ -284,6 +319,7 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
         data: MemoryModel,
         memory_length_limit: int,
         Date: str,
+        extra_events: list[PrivateMessageEvent] | None = None,
     ):
         """处理私聊消息：
         - 检查是否启用私聊功能。
@@ -299,13 +335,36 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
             data: 内存模型数据
             memory_length_limit: 记忆长度限制
             Date: 当前时间戳
+            extra_events: 合并到本轮对话中的其他消息
         """
-        if not config_manager.config.function.enable_private_chat:
-            matcher.skip()
-
         # 管理会话上下文
         await manage_sessions(event, data, chat_manager.session_clear_user)
 
+        # 合并的消息作为同一轮用户输入记录
+        data.memory.messages.append(
+            merge_user_turn(
+                [
+                    await build_private_message(ev, bot, Date)
+                    for ev in (event, *(extra_events or ()))
+                ]
+            )
+        )
+        if chat_manager.debug:
+            logger.debug(f"当前私聊提示词：\n{config_manager.private_train}")
+        # 控制记忆长度和 token 限制
+        await enforce_memory_limit(data, memory_length_limit)
+
+        # 准备发送给模型的消息
+        send_messages = prepare_send_messages(
+            data, copy.deepcopy(Message.model_validate(config_manager.private_train))
+        )
+        response = await process_chat(event, data, send_messages)
+        await send_response(event, response.content)
+
+    async def build_private_message(
+        event: PrivateMessageEvent, bot: Bot, Date: str
+    ) -> str | list[TextContent | ImageContent]:
+        """将一条私聊消息转换为用户输入内容"""
         content = await synthesize_message(event.get_message(), bot)
 
         if content.strip() == "":
@@ -321,19 +380,7 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
         reply_pics = [pic async for pic in handle_reply_pics(event.reply)]
         if isinstance(text, list):
             text += reply_pics
-        # 记录用户消息
-        data.memory.messages.append(Message(role="user", content=text))
-        if chat_manager.debug:
-            logger.debug(f"当前私聊提示词：\n{config_manager.private_train}")
-        # 控制记忆长度和 token 限制
-        await enforce_memory_limit(data, memory_length_limit)
-
-        # 准备发送给模型的消息
-        send_messages = prepare_send_messages(
-            data, copy.deepcopy(Message.model_validate(config_manager.private_train))
-        )
-        response = await process_chat(event, send_messages)
-        await send_response(event, response.content)
+        return text
 
     # -------------------------------------------------------------------------
     # 内部辅助函数 - 会话管理
@@ -353,7 +400,7 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
             data: 内存模型数据
             session_clear_map: 会话清理映射
         """
-        if config_manager.config.session.session_control:
+        if config.session.session_control:
             session_id = str(
                 event.group_id
                 if isinstance(event, GroupMessageEvent)
@@ -368,14 +415,14 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
                 # 检查会话超时
                 time_now = time.time()
                 if (time_now - data.timestamp) >= (
-                    float(config_manager.config.session.session_control_time * 60)
+                    float(config.session.session_control_time * 60)
                 ):
                     data.sessions.append(
                         Memory(messages=data.memory.messages, time=time_now)
                     )
                     while (
                         len(data.sessions)
-                        > config_manager.config.session.session_control_history
+                        > config.session.session_control_history
                     ):
                         data.sessions.remove(data.sessions[0])
                     data.memory.messages = []
@@ -385,15 +432,21 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
                     if not (
                         (time_now - timestamp)
                         > float(
-                            config_manager.config.session.session_control_time * 60 * 2
+                            config.session.session_control_time * 60 * 2
                         )
                     ):
-                        chated = await matcher.send(
-                            f'如果想和我继续用之前的上下文聊天，快at我回复✨"继续"✨吧！\n（超过{config_manager.config.session.session_control_time}分钟没理我我就会被系统抱走存档哦！）'
-                        )
-                        session_clear_map[session_id] = SessionTemp(
-                            message_id=chated["message_id"], timestamp=datetime.now()
+                        # 与回复经同一发送队列发出，需要消息ID时等待发送完成
+                        chated = await Outbox().enqueue(
+                            bot,
+                            event,
+                            f'如果想和我继续用之前的上下文聊天，快at我回复✨"继续"✨吧！\n（超过{config.session.session_control_time}分钟没理我我就会被系统抱走存档哦！）',
+                            coalesce=False,
                         )
+                        if chated is not None:
+                            session_clear_map[session_id] = SessionTemp(
+                                message_id=chated["message_id"],
+                                timestamp=datetime.now(),
+                            )
 
                         raise CancelException()
                 elif (
@@ -407,7 +460,7 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
 
                     data.memory.messages = data.sessions[-1].messages
                     data.sessions.pop()
-                    await matcher.send("让我们继续聊天吧～")
+                    Outbox().enqueue(bot, event, "让我们继续聊天吧～", coalesce=False)
                     await data.save(event, raise_err=True)
                     raise CancelException()
 
@@ -440,7 +493,9 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
         weekday = dt_object.strftime("%A")
         formatted_time = dt_object.strftime("%Y-%m-%d %I:%M:%S %p")
         role = (
-            await get_user_role(bot, group_id, reply.sender.user_id) if group_id else ""
+            await get_user_role(bot, group_id, reply.sender.user_id, reply.sender)
+            if group_id
+            else ""
         )
 
         reply_content = await synthesize_message(reply.message, bot)
@@ -450,20 +505,21 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
     # 内部辅助函数 - 用户角色获取
     # -------------------------------------------------------------------------
 
-    async def get_user_role(bot: Bot, group_id: int, user_id: int) -> str:
+    async def get_user_role(
+        bot: Bot, group_id: int, user_id: int, sender: Sender | None = None
+    ) -> str:
         """获取用户在群聊中的身份（群主、管理员或普通成员）。
 
         Args:
             bot: Bot实例
             group_id: 群组ID
             user_id: 用户ID
+            sender: 事件中携带的发送者信息
 
         Returns:
             用户角色字符串
         """
-        role = (await bot.get_group_member_info(group_id=group_id, user_id=user_id))[
-            "role"
-        ]
+        role = (await MemberInfoCache().get(bot, group_id, user_id, sender))["role"]
         return {"admin": "群管理员", "owner": "群主", "member": "普通成员"}.get(
             role, "[获取身份失败]"
         )
@@ -480,7 +536,7 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
             memory_length_limit: 记忆长度限制
         """
         is_multimodal = (
-            await config_manager.get_preset(config_manager.config.preset)
+            await config_manager.get_preset(config.preset)
         ).multimodal
         # Process multimodal messages when needed
         for message in data.memory.messages:
@@ -521,12 +577,12 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
         """
         train = copy.deepcopy(train)
         train.content = typing.cast(str, train.content)
-        if config_manager.config.llm_config.use_base_prompt:
+        if config.llm_config.use_base_prompt:
             train.content = (
                 "你在纯文本环境工作，不允许使用MarkDown回复，我会提供聊天记录，你可以从这里面获取一些关键信息，比如时间与用户身份（e.g.: [管理员/群主/自己/群员][YYYY-MM-DD weekday hh:mm:ss AM/PM][昵称（QQ号）]说:<内容>），但是请不要以这个格式回复。对于消息上报我给你的有几个类型，除了文本还有,\\（戳一戳消息）\\：就是QQ的戳一戳消息是戳一戳了你，而不是我，请参与讨论。交流时不同话题尽量不使用相似句式回复，用户与你交谈的信息在<内容>。\n"
                 + (
                     train.content.replace(
-                        "{cookie}", config_manager.config.cookies.cookie
+                        "{cookie}", config.cookies.cookie
                     )
                     .replace("{self_id}", str(event.self_id))
                     .replace("{user_id}", str(event.user_id))
@@ -534,7 +590,14 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
                 )
             )
         train.content += f"\n以下是一些补充内容，如果与上面任何一条有冲突请忽略。\n{data.prompt if data.prompt != '' else '无'}"
-        send_messages = copy.deepcopy(data.memory.messages)
+        messages = data.memory.messages
+        keep = LoadShedder().trim_limit(memory_length_limit)
+        if keep < len(messages):
+            # 过载时只发送最近的上下文，并保证从用户消息开始
+            messages = messages[-keep:]
+            while len(messages) > 1 and messages[0].role != "user":
+                messages = messages[1:]
+        send_messages = copy.deepcopy(messages)
         send_messages.insert(0, Message.model_validate(train))
         return send_messages
 
@@ -543,18 +606,21 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
     # -------------------------------------------------------------------------
 
     async def process_chat(
-        event: MessageEvent, send_messages: list[Message | ToolResult]
+        event: MessageEvent,
+        data: MemoryModel,
+        send_messages: list[Message | ToolResult],
     ) -> UniResponse[str, None]:
         """调用聊天模型生成回复，并触发相关事件。
 
         Args:
             event: 消息事件
+            data: 内存模型数据
             send_messages: 发送消息列表
 
         Returns:
             模型响应
         """
-        if config_manager.config.matcher_function:
+        if config.matcher_function:
             chat_event = BeforeChatEvent(
                 nbevent=event,
                 send_message=send_messages,
@@ -566,7 +632,7 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
 
         response = await get_chat(send_messages)
 
-        if config_manager.config.matcher_function:
+        if config.matcher_function:
             chat_event = ChatEvent(
                 nbevent=event,
                 send_message=send_messages,
@@ -622,22 +688,43 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
     # 内部辅助函数 - 发送响应
     # -------------------------------------------------------------------------
 
-    async def send_response(event: MessageEvent, response: str):
-        """发送聊天模型的回复，根据配置选择不同的发送方式。
+    async def send_response(
+        event: MessageEvent,
+        response: str,
+        extra_events: list[GroupMessageEvent] | None = None,
+    ):
+        """将聊天模型的回复加入发送队列，根据配置选择不同的发送方式。
+
+        发送与分句停顿由发送队列完成，本函数立即返回，会话锁随之释放。
 
         Args:
             event: 消息事件
             response: 模型响应内容
+            extra_events: 合并到本轮对话中的其他群聊消息，回复时会提及这些消息的发送者
         """
-        if not config_manager.config.function.nature_chat_style:
-            await matcher.send(
-                MessageSegment.reply(event.message_id) + MessageSegment.text(response)
+        mentions = OneBotMessage()
+        if extra_events:
+            for user_id in dict.fromkeys(ev.user_id for ev in (event, *extra_events)):
+                mentions += MessageSegment.at(user_id)
+        outbox = Outbox()
+        if not config.function.nature_chat_style:
+            outbox.enqueue(
+                bot,
+                event,
+                MessageSegment.reply(event.message_id)
+                + mentions
+                + MessageSegment.text(response),
+                coalesce=False,
             )
         elif response_list := split_message_into_chats(response):
-            for message in response_list:
-                await matcher.send(MessageSegment.text(message))
-                await asyncio.sleep(
-                    random.randint(1, 3) + (len(message) // random.randint(80, 100))
+            for index, message in enumerate(response_list):
+                outbox.enqueue(
+                    bot,
+                    event,
+                    (mentions if index == 0 else OneBotMessage())
+                    + MessageSegment.text(message),
+                    delay_after=random.randint(1, 3)
+                    + (len(message) // random.randint(80, 100)),
                 )
 
     # -------------------------------------------------------------------------
@@ -652,12 +739,14 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
         Args:
             e: 异常对象
         """
-        await matcher.send("出错了稍后试试吧（错误已反馈）")
+        Outbox().enqueue(bot, event, "出错了稍后试试吧（错误已反馈）", coalesce=False)
         logger.opt(exception=e, colors=True).exception("程序发生了未捕获的异常")
 
     # 函数进入运行点
 
-    memory_length_limit = config_manager.config.llm_config.memory_lenth_limit
+    # 整个事件处理过程使用同一份配置快照
+    config = config_manager.snapshot.config
+    memory_length_limit = config.llm_config.memory_lenth_limit
     Date = get_current_datetime_timestamp()
 
     if any(
@@ -667,46 +756,80 @@ async def chat(event: MessageEvent, matcher: Matcher, bot: Bot):
     ):
         matcher.skip()
 
-    try:
-        data = await get_memory_data(event)
-        lock = (
-            get_group_lock(event.group_id)
-            if isinstance(event, GroupMessageEvent)
-            else get_private_lock(event.user_id)
-        )
-        match config_manager.config.function.chat_pending_mode:
-            case "queue":
-                pass
-            case "single":
-                if lock.locked():
-                    matcher.stop_propagation()
-            case "single_with_report":
-                if lock.locked():
-                    await matcher.finish("聊天任务正在处理中，请稍后再试")
-        if isinstance(event, GroupMessageEvent):
-            async with lock:
-                await handle_group_message(
-                    event,
-                    matcher,
-                    bot,
-                    data,
-                    memory_length_limit,
-                    Date,
+    async def run_chat(extra_events: list[MessageEvent]):
+        """在会话执行器中处理本条消息，extra_events为合并到本轮对话中的其他消息"""
+        try:
+            data = await get_memory_data(event)
+            # 本轮对话中的LLM请求按会话权重参与调度，未启用调度时无需检查权限节点
+            weight = (
+                await resolve_session_weight(
+                    event, matcher.state.get(AUTOREPLY_STATE_KEY, False)
                 )
+                if config.llm_config.scheduler.enable
+                else (DEFAULT_SESSION, 1.0)
+            )
+            with LLMScheduler.session(*weight):
+                if isinstance(event, GroupMessageEvent):
+                    await handle_group_message(
+                        event,
+                        matcher,
+                        bot,
+                        data,
+                        memory_length_limit,
+                        Date,
+                        typing.cast(list[GroupMessageEvent], extra_events),
+                    )
 
-        elif isinstance(event, PrivateMessageEvent):
-            async with lock:
-                await handle_private_message(
-                    event,
-                    matcher,
-                    bot,
-                    data,
-                    memory_length_limit,
-                    Date,
-                )
-    except NoneBotException as e:
-        raise e
-    except CancelException:
-        return
-    except Exception as e:
-        await handle_exception(e)
+                elif isinstance(event, PrivateMessageEvent):
+                    await handle_private_message(
+                        event,
+                        matcher,
+                        bot,
+                        data,
+                        memory_length_limit,
+                        Date,
+                        typing.cast(list[PrivateMessageEvent], extra_events),
+                    )
+        except CancelException:
+            return
+        except (FinishedException, SkippedException, StopPropagation) as e:
+            # 对话在会话执行器中进行时NoneBot的事件处理已经结束，钩子中的finish、skip
+            # 与cancel_nonebot_process（如审查后拦截）均表示结束本轮对话且不再回复
+            logger.debug(f"本轮对话已被 {type(e).__name__} 结束")
+        except Exception as e:
+            await handle_exception(e)
+        finally:
+            # 并发审查模式下，未在回复前取回的审查结果在对话结束后处理
+            settle_pending_report(event, bot)
+
+    # 需要影响NoneBot处理流程的检查在入队前完成
+    if isinstance(event, GroupMessageEvent):
+        if not config.function.enable_group_chat:
+            matcher.skip()
+        key: SESSION_KEY = ("group", event.group_id)
+        lock = get_group_lock(event.group_id)
+    else:
+        if not config.function.enable_private_chat:
+            matcher.skip()
+        key = ("private", event.user_id)
+        lock = get_private_lock(event.user_id)
+    shedder = LoadShedder()
+    if shedder.evaluate() >= ShedStage.BUSY:
+        shedder.stats.shed_busy += 1
+        await matcher.finish(config.llm_config.load_shedding.busy_message)
+    actors = SessionActors()
+    busy = lock.locked() or actors.is_busy(key)
+    match config.function.chat_pending_mode:
+        case "queue":
+            pass
+        case "single":
+            if busy:
+                # stop_propagation只阻止事件继续传播，不会结束处理，需要直接返回
+                matcher.stop_propagation()
+                return
+        case "single_with_report":
+            if busy:
+                await matcher.finish("聊天任务正在处理中，请稍后再试")
+    # 消息入队后即返回，聊天处理由会话执行器按顺序完成
+    if actors.submit(key, lock, event, run_chat) == "rejected":
+        await matcher.finish("排队中的消息过多，请稍后再试")
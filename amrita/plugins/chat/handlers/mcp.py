@@ -44,6 +44,12 @@ async def mcp_status(bot: Bot, matcher: Matcher, event: MessageEvent, arg: list[
     mcp_server_counts = len(ClientManager().clients)
     tools_mapping_count = len(ClientManager().tools_remapping)
     std_txt = f"MCP状态统计\nMCP Servers: {mcp_server_counts}\nMCP Tools: {tools_count}\nMCP Tools(Mapped): {tools_mapping_count}"
+    server_stats = ClientManager().get_stats()
+    if server_stats:
+        std_txt += "\n" + "\n".join(
+            f" - {script}: {stats['state']}（进行中 {stats['inflight']}，重连 {stats['reconnects']} 次）"
+            for script, stats in server_stats.items()
+        )
     if arg_text in ("-d", "--detail", "--details"):
         if not isinstance(event, PrivateMessageEvent):
             await matcher.finish("-d只允许在私聊执行来避免安全问题")
@@ -60,6 +66,18 @@ async def mcp_status(bot: Bot, matcher: Matcher, event: MessageEvent, arg: list[
                 )
                 for client in ClientManager().clients
             ],
+            *[
+                MessageSegment.text(
+                    f"Server@{script} 工具调用耗时：\n"
+                    + "\n".join(
+                        f" - {name}: {tool['calls']}次，失败{tool['errors']}次，"
+                        f"平均{tool['avg'] * 1000:.0f}ms，最长{tool['max'] * 1000:.0f}ms"
+                        for name, tool in stats["tools"].items()
+                    )
+                )
+                for script, stats in server_stats.items()
+                if stats["tools"]
+            ],
         ]
 
         await send_forward_msg(
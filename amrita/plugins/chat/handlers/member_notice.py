@@ -0,0 +1,26 @@
+from nonebot.adapters.onebot.v11.event import (
+    GroupAdminNoticeEvent,
+    GroupDecreaseNoticeEvent,
+    NoticeEvent,
+)
+
+from ..utils.member_cache import MemberInfoCache
+
+
+async def member_notice(event: NoticeEvent):
+    """处理群成员变动通知，使对应的群成员信息缓存失效"""
+    cache = MemberInfoCache()
+    if isinstance(event, GroupAdminNoticeEvent | GroupDecreaseNoticeEvent):
+        if event.user_id == event.self_id and isinstance(
+            event, GroupDecreaseNoticeEvent
+        ):
+            # 机器人自身退群或被踢出时，整个群的缓存都不再有效
+            cache.invalidate(event.self_id, event.group_id)
+        else:
+            cache.invalidate(event.self_id, event.group_id, event.user_id)
+    elif event.notice_type == "group_card":
+        # 群名片变更通知（go-cqhttp扩展），适配器未提供对应的事件模型
+        group_id = getattr(event, "group_id", None)
+        user_id = getattr(event, "user_id", None)
+        if group_id is not None and user_id is not None:
+            cache.invalidate(event.self_id, int(group_id), int(user_id))
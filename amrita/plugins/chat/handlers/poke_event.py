@@ -20,6 +20,7 @@ from ..utils.functions import (
 )
 from ..utils.libchat import get_chat, get_tokens, usage_enough
 from ..utils.lock import get_group_lock, get_private_lock
+from ..utils.member_cache import MemberInfoCache
 from ..utils.memory import Message, get_memory_data
 from ..utils.models import InsightsModel
 from .chat import FakeEvent
@@ -53,9 +54,7 @@ async def poke_event(event: PokeNotifyEvent, bot: Bot, matcher: Matcher):
 
         # 获取用户昵称
         user_name = (
-            await bot.get_group_member_info(
-                group_id=event.group_id, user_id=event.user_id
-            )
+            await MemberInfoCache().get(bot, event.group_id, event.user_id)
         )["nickname"]
 
         # 构造发送的消息
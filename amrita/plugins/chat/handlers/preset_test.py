@@ -8,12 +8,37 @@ from nonebot.params import CommandArg
 
 from amrita.plugins.chat.check_rule import is_bot_admin
 from amrita.plugins.chat.config import config_manager
-from amrita.plugins.chat.utils.libchat import PresetReport, test_presets
+from amrita.plugins.chat.utils.libchat import (
+    PresetBenchmark,
+    PresetReport,
+    benchmark_presets,
+    run_preset_tests,
+)
 from amrita.utils.send import send_forward_msg
 
 TEST_LOCK = Lock()
 
 
+def _get_int_option(arg_list: list[str], names: tuple[str, ...], default: int) -> int:
+    for name in names:
+        if name in arg_list:
+            index = arg_list.index(name)
+            if index + 1 < len(arg_list) and arg_list[index + 1].isdigit():
+                return max(1, int(arg_list[index + 1]))
+    return default
+
+
+def format_benchmark(results: list[PresetBenchmark]) -> str:
+    return "\n".join(
+        f"预设：{result.preset_name}\n"
+        f"  成功/总数：{result.success}/{result.rounds}（错误率 {result.error_rate:.0%}）\n"
+        f"  延迟 p50/p95/max：{result.latency_p50:.3f}s/{result.latency_p95:.3f}s/{result.latency_max:.3f}s\n"
+        f"  输出速度：{result.tokens_per_second:.1f} tokens/s"
+        + (f"\n  最后错误：{result.last_error}" if result.last_error else "")
+        for result in results
+    )
+
+
 async def t_preset(
     event: MessageEvent, matcher: Matcher, bot: Bot, args: Message = CommandArg()
 ):
@@ -26,9 +51,21 @@ async def t_preset(
         await matcher.send(
             MessageSegment.text(f"开始测试所有(共计{len(presets)}个)预设...")
         )
-        results: list[PresetReport] = []
         arg_list = args.extract_plain_text().strip().split()
-        async for result in test_presets():
+        concurrency = _get_int_option(arg_list, ("-c", "--concurrency"), 4)
+        if any(i in arg_list for i in ("-n", "--rounds")):
+            bench_results = await benchmark_presets(
+                rounds=_get_int_option(arg_list, ("-n", "--rounds"), 3),
+                concurrency=concurrency,
+                warmup="-w" in arg_list or "--warmup" in arg_list,
+            )
+            await matcher.finish(
+                MessageSegment.text(
+                    f"基准测试完成：\n{format_benchmark(bench_results)}"
+                )
+            )
+        results: list[PresetReport] = []
+        async for result in run_preset_tests(concurrency):
             results.append(result)
             await asyncio.sleep(0)
         if "--detail" in arg_list or "-d" in arg_list:
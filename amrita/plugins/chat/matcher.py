@@ -1,8 +1,10 @@
+import asyncio
 import inspect
+import typing
+from bisect import insort_right
 from collections.abc import Awaitable, Callable
-from copy import deepcopy
 from types import FrameType
-from typing import Any, ClassVar
+from typing import Any, ClassVar, Literal
 
 from nonebot import logger
 from nonebot.dependencies import Dependent
@@ -23,6 +25,57 @@ suggar matcher
 """
 
 
+class DispatchPlan:
+    """处理器的调度计划
+
+    在注册时解析处理器的参数类型注解，调用时只需按参数类型查表得到注入顺序。
+    """
+
+    __slots__ = ("_injectors", "annotations", "missing", "names")
+
+    def __init__(self, function: Callable[..., Awaitable[Any]]):
+        signature = inspect.signature(function)
+        try:
+            hints = typing.get_type_hints(function)
+        except Exception:
+            hints = {}
+        self.names: tuple[str, ...] = tuple(signature.parameters)
+        self.annotations: tuple[Any, ...] = tuple(
+            hints.get(name, param.annotation)
+            for name, param in signature.parameters.items()
+        )
+        # 没有类型注解的参数，存在时处理器将被跳过
+        self.missing: tuple[str, ...] = tuple(
+            name
+            for name, annotation in zip(self.names, self.annotations)
+            if annotation is inspect.Parameter.empty
+        )
+        # 参数类型组合 -> 注入的参数下标（None表示无法满足）
+        self._injectors: dict[tuple[type, ...], tuple[int, ...] | None] = {}
+
+    def _resolve(self, session_args: tuple[Any, ...]) -> tuple[int, ...] | None:
+        indices: list[int] = []
+        used: set[int] = set()
+        for annotation in self.annotations:
+            for i, arg in enumerate(session_args):
+                if i not in used and isinstance(arg, annotation):
+                    indices.append(i)
+                    used.add(i)
+                    break
+            else:
+                return None
+        return tuple(indices)
+
+    def bind(self, session_args: tuple[Any, ...]) -> tuple[Any, ...] | None:
+        """按注解为处理器选出位置参数，无法满足所有参数时返回None"""
+        key = tuple(type(arg) for arg in session_args)
+        if key not in self._injectors:
+            self._injectors[key] = self._resolve(session_args)
+        if (indices := self._injectors[key]) is None:
+            return None
+        return tuple(session_args[i] for i in indices)
+
+
 class FunctionData(BaseModel, arbitrary_types_allowed=True):
     function: Callable[..., Awaitable[Any]] = Field(...)
     signature: inspect.Signature = Field(...)
@@ -30,6 +83,8 @@ class FunctionData(BaseModel, arbitrary_types_allowed=True):
     priority: int = Field(...)
     block: bool = Field(...)
     matcher: Any = Field(...)
+    plan: DispatchPlan | None = Field(default=None)
+    timeout: float | None = Field(default=None)
 
 
 class EventRegistry:
@@ -42,28 +97,46 @@ class EventRegistry:
         return cls._instance
 
     def register_handler(self, event_type: str, data: FunctionData):
-        self.__event_handlers.setdefault(event_type, []).append(data)
+        """注册处理器，同时编译调度计划，处理器列表始终按优先级有序"""
+        if data.plan is None:
+            data.plan = DispatchPlan(data.function)
+        if data.plan.missing:
+            logger.warning(
+                f"匹配器 {data.function.__name__} (File: {data.frame.f_code.co_filename}: Line {data.frame.f_lineno!s}) 有没有类型注解的参数！"
+                + f"(Args:{''.join(i + ',' for i in data.plan.missing)}).将被跳过......"
+            )
+        insort_right(
+            self.__event_handlers.setdefault(event_type, []),
+            data,
+            key=lambda x: x.priority,
+        )
 
     def get_handlers(self, event_type: str) -> list[FunctionData]:
-        self.__event_handlers.setdefault(event_type, [])
-        self.__event_handlers[event_type].sort(key=lambda x: x.priority, reverse=False)
-        return self.__event_handlers[event_type]
+        return self.__event_handlers.setdefault(event_type, [])
 
     def _all(self) -> dict[str, list[FunctionData]]:
         return self.__event_handlers
 
 
 class Matcher:
-    def __init__(self, event_type: str, priority: int = 10, block: bool = True):
+    def __init__(
+        self,
+        event_type: str,
+        priority: int = 10,
+        block: bool = True,
+        timeout: float | None = None,
+    ):
         """构造函数，初始化Matcher对象。
         Args:
             event_type (str): 事件类型
             priority (int, optional): 优先级。 Defaults to 10.
             block (bool, optional): 是否阻止后续事件。 Defaults to True.
+            timeout (float | None, optional): 处理器的时间预算（秒），超时后取消该处理器。 Defaults to None.
         """
         self.event_type = event_type
         self.priority = priority
         self.block = block
+        self.timeout = timeout
 
     def handle(self):
         """
@@ -84,6 +157,7 @@ class Matcher:
                 priority=self.priority,
                 block=self.block,
                 matcher=self,
+                timeout=self.timeout,
             )
             EventRegistry().register_handler(self.event_type, func_data)
             return func
@@ -121,12 +195,159 @@ class Matcher:
         raise PassException()
 
 
+HandlerResult = Literal["done", "pass", "cancel", "block"]
+
+
 class MatcherManager:
     @staticmethod
-    async def trigger_event(*args, **kwargs):
+    async def _prepare_call(
+        matcher: FunctionData, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> tuple[tuple[Any, ...], dict[str, Any]] | None:
+        """按调度计划为处理器准备参数，无法满足时返回None"""
+        plan = matcher.plan
+        assert plan is not None
+        if plan.missing:
+            return None
+        call_args = plan.bind((matcher.matcher, *args))
+        if call_args is None:
+            return None
+        # 获取关键词参数类型注解
+        call_kwargs: dict[str, Any] = {}
+        if kwargs:
+            call_kwargs = {
+                name: kwargs[annotation]
+                for name, annotation in zip(plan.names, plan.annotations)
+                if annotation in kwargs
+            }
+            call_kwargs.update(
+                {k: await v() for k, v in call_kwargs.items() if type(v) is Dependent}
+            )
+        return call_args, call_kwargs
+
+    @staticmethod
+    async def _call_with_budget(
+        handler: Callable[..., Awaitable[Any]],
+        call_args: tuple[Any, ...],
+        call_kwargs: dict[str, Any],
+        timeout: float,
+    ) -> bool:
+        """在时间预算内运行处理器，超出预算时取消处理器并返回False
+
+        处理器自身抛出的asyncio.TimeoutError会被原样抛出，不视为超出预算。
+        """
+        raised = False
+
+        async def call():
+            nonlocal raised
+            try:
+                await handler(*call_args, **call_kwargs)
+            except asyncio.TimeoutError:
+                raised = True
+                raise
+
+        try:
+            await asyncio.wait_for(call(), timeout)
+        except asyncio.TimeoutError:
+            if raised:
+                raise
+            return False
+        return True
+
+    @staticmethod
+    async def _run_handler(
+        matcher: FunctionData,
+        call_args: tuple[Any, ...],
+        call_kwargs: dict[str, Any],
+    ) -> HandlerResult:
+        """运行单个处理器，ProcessException与NoneBotException会被继续抛出"""
+        frame = matcher.frame
+        line_number = frame.f_lineno
+        file_name = frame.f_code.co_filename
+        handler = matcher.function
+        try:
+            logger.info(f"开始运行Matcher: '{handler.__name__}'")
+            if matcher.timeout is None:
+                await handler(*call_args, **call_kwargs)
+            elif not await MatcherManager._call_with_budget(
+                handler, call_args, call_kwargs, matcher.timeout
+            ):
+                logger.warning(
+                    f"Matcher '{handler.__name__}'({file_name}:{line_number}) 超出时间预算（{matcher.timeout}s），已取消"
+                )
+        except ProcessException as e:
+            logger.info("停止Nonebot处理")
+            raise e
+        except PassException:
+            logger.info(
+                f"Matcher '{handler.__name__}'(~{file_name}:{line_number}) 已跳过"
+            )
+            return "pass"
+        except CancelException:
+            logger.info("取消了Matcher处理")
+            return "cancel"
+        except BlockException:
+            return "block"
+        except NoneBotException:
+            raise
+        except Exception as e:
+            logger.error(
+                f"运行时发生了错误 '{handler.__name__}'({file_name}:{line_number}) "
+            )
+            logger.opt(exception=e, colors=True).exception(str(e))
+        finally:
+            logger.info(f"处理器 {handler.__name__} 已结束")
+        return "done"
+
+    @classmethod
+    async def _run_concurrently(
+        cls,
+        calls: list[tuple[FunctionData, tuple[Any, ...], dict[str, Any]]],
+    ) -> HandlerResult:
+        """并发运行同一优先级中的非阻断处理器
+
+        处理器取消或阻断事件处理时，同一优先级中仍在运行的其他处理器照常运行完毕，
+        只跳过更低优先级的处理器；
+        任一处理器抛出ProcessException等异常后，仍在运行的其他处理器会被取消。
+        结果按注册顺序合并：异常优先抛出，其次为取消，再次为阻断。
+        """
+        tasks = [
+            asyncio.create_task(cls._run_handler(matcher, call_args, call_kwargs))
+            for matcher, call_args, call_kwargs in calls
+        ]
+        try:
+            _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            if pending:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        results: list[HandlerResult] = []
+        error: BaseException | None = None
+        for task in tasks:
+            # 自行取消的任务调用exception()会抛出CancelledError，需要先行排除
+            if task.cancelled():
+                continue
+            if (exc := task.exception()) is not None:
+                error = error or exc
+                continue
+            results.append(task.result())
+        if error is not None:
+            raise error
+        for result in ("cancel", "block"):
+            if result in results:
+                return result
+        return "done"
+
+    @classmethod
+    async def trigger_event(cls, *args, **kwargs):
         """
         触发特定类型的事件，并调用该类型的所有注册事件处理程序。
 
+        同一优先级中连续注册的非阻断处理器会并发运行。
+
         参数:
         - event: SuggarEvent 对象，包含事件相关数据。
         - **kwargs: 关键字参数，传递给依赖注入系统的参数。
@@ -141,90 +362,38 @@ class MatcherManager:
             logger.error("事件必须被传入，但是是没有找到！")
             return
         event_type = event.get_event_type()  # 获取事件类型
-        priority_tmp = 0
         logger.info(f"正在为事件: {event_type} 运行matcher!")
         # 检查是否有处理该事件类型的处理程序
-        if matcher_list := EventRegistry().get_handlers(event_type):
-            for matcher in matcher_list:
-                if matcher.priority != priority_tmp:
-                    priority_tmp = matcher.priority
-                    logger.info(f"为优先级 {priority_tmp} 运行Matcher......")
-
-                signature = matcher.signature
-                frame = matcher.frame
-                line_number = frame.f_lineno
-                file_name = frame.f_code.co_filename
-                handler = matcher.function
-                session_args = [matcher.matcher, *args]
-                session_kwargs = {**deepcopy(kwargs)}
-
-                args_types = {k: v.annotation for k, v in signature.parameters.items()}
-                filtered_args_types = {
-                    k: v for k, v in args_types.items() if v is not inspect._empty
-                }
-                if args_types != filtered_args_types:
-                    failed_args = list(args_types.keys() - filtered_args_types.keys())
-                    logger.warning(
-                        f"匹配器 {matcher.function.__name__} (File: {file_name}: Line {frame.f_lineno!s}) 有没有类型注解的参数！"
-                        + f"(Args:{''.join(i + ',' for i in failed_args)}).跳过......"
-                    )
-                    continue
-                new_args = []
-                used_indices = set()
-                for param_type in filtered_args_types.values():
-                    for i, arg in enumerate(session_args):
-                        if i in used_indices:
-                            continue
-                        if isinstance(arg, param_type):
-                            new_args.append(arg)
-                            used_indices.add(i)
-                            break
-                new_args_tuple = tuple(new_args)
-
-                # 获取关键词参数类型注解
-                kwparams = signature.parameters
-                f_kwargs = {
-                    param_name: session_kwargs[param.annotation]
-                    for param_name, param in kwparams.items()
-                    if param.annotation in session_kwargs
-                }
-                f_kwargs.update(
-                    {k: await v() for k, v in f_kwargs.items() if type(v) is Dependent}
-                )
-                if len(new_args_tuple) != len(list(filtered_args_types)):
+        if not (matcher_list := EventRegistry().get_handlers(event_type)):
+            logger.info(f"没有为 {event_type} 事件注册的Matcher，跳过处理。")
+            return
+        index = 0
+        while index < len(matcher_list):
+            priority = matcher_list[index].priority
+            logger.info(f"为优先级 {priority} 运行Matcher......")
+            batch: list[tuple[FunctionData, tuple[Any, ...], dict[str, Any]]] = []
+            while index < len(matcher_list) and matcher_list[index].priority == priority:
+                matcher = matcher_list[index]
+                index += 1
+                if (prepared := await cls._prepare_call(matcher, args, kwargs)) is None:
                     continue
-
-                # 调用处理程序
-
-                try:
-                    logger.info(f"开始运行Matcher: '{handler.__name__}'")
-
-                    await handler(*new_args_tuple, **f_kwargs)
-
-                except ProcessException as e:
-                    logger.info("停止Nonebot处理")
-                    raise e
-                except PassException:
-                    logger.info(
-                        f"Matcher '{handler.__name__}'(~{file_name}:{line_number}) 已跳过"
-                    )
+                if not matcher.block:
+                    batch.append((matcher, *prepared))
                     continue
-                except CancelException:
-                    logger.info("取消了Matcher处理")
+                # 阻断处理器之前的非阻断处理器先运行完毕，再运行阻断处理器
+                if batch and await cls._run_batch(batch) in ("cancel", "block"):
                     return
-                except BlockException:
-                    break
-                except NoneBotException:
-                    raise
-                except Exception as e:
-                    logger.error(
-                        f"运行时发生了错误 '{handler.__name__}'({file_name}:{line_number}) "
-                    )
-                    logger.opt(exception=e, colors=True).exception(str(e))
-                    continue
-                finally:
-                    logger.info(f"处理器 {handler.__name__} 已结束")
-                    if matcher.block:
-                        break
-        else:
-            logger.info(f"没有为 {event_type} 事件注册的Matcher，跳过处理。")
+                await cls._run_handler(matcher, *prepared)
+                return
+            # 取消与阻断均终止本次事件处理
+            if batch and await cls._run_batch(batch) in ("cancel", "block"):
+                return
+
+    @classmethod
+    async def _run_batch(
+        cls, batch: list[tuple[FunctionData, tuple[Any, ...], dict[str, Any]]]
+    ) -> HandlerResult:
+        """运行一组非阻断处理器，仅有一个时直接运行"""
+        if len(batch) == 1:
+            return await cls._run_handler(*batch[0])
+        return await cls._run_concurrently(batch)
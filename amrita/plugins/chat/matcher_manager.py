@@ -3,7 +3,7 @@
 该模块负责管理聊天插件中的所有事件匹配器，包括消息、命令和通知事件的处理。
 """
 
-from nonebot import MatcherGroup, on_command
+from nonebot import MatcherGroup, on_command, on_notice
 from nonebot.rule import Rule
 
 from ..menu.models import MatcherData
@@ -26,6 +26,7 @@ from .handlers.insights import insights
 from .handlers.mcp import (
     mcp_command,
 )
+from .handlers.member_notice import member_notice
 from .handlers.poke_event import poke_event
 from .handlers.preset_test import t_preset
 from .handlers.presets import presets
@@ -53,6 +54,12 @@ base_matcher.on_notice(
     block=False,
 ).append_handler(recall)
 
+# 群成员变动时使成员信息缓存失效，不受插件启用状态影响
+on_notice(
+    priority=1,
+    block=False,
+).append_handler(member_notice)
+
 # 添加消息事件处理器，处理聊天消息
 base_matcher.on_message(
     block=False,
@@ -205,8 +212,8 @@ base_matcher.on_command(
     priority=10,
     state=MatcherData(
         name="测试预设",
-        description="测试所有预设,--details查看详细结果",
-        usage="/test_preset [-d|--details]",
+        description="测试所有预设,--details查看详细结果,-n进行多轮基准测试",
+        usage="/test_preset [-d|--details] [-c <并发数>] [-n <轮数> [-w|--warmup]]",
     ).model_dump(),
     permission=is_bot_admin,
 ).append_handler(t_preset)
@@ -3,8 +3,20 @@ from typing import Any
 
 from nonebot import logger
 
+from amrita.config_manager import UniConfigManager
 from amrita.plugins.chat.config import config_manager
+from amrita.plugins.chat.utils.forward import ForwardSynthesizer
+from amrita.plugins.chat.utils.images import ImagePipeline
+from amrita.plugins.chat.utils.llm_tools.manager import ToolsManager
+from amrita.plugins.chat.utils.load_shedder import LoadShedder
+from amrita.plugins.chat.utils.member_cache import MemberInfoCache
 from amrita.plugins.chat.utils.models import InsightsModel
+from amrita.plugins.chat.utils.outbox import Outbox
+from amrita.plugins.chat.utils.prefilter import ModerationPrefilter
+from amrita.plugins.chat.utils.rate_limiter import RateLimiter
+from amrita.plugins.chat.utils.report_batcher import ReportBatcher
+from amrita.plugins.chat.utils.scheduler import LLMScheduler
+from amrita.plugins.chat.utils.session_actor import SessionActors
 from amrita.plugins.webui.API import (
     JSONResponse,
     PageContext,
@@ -202,6 +214,30 @@ async def get_models():
         )
 
 
+@router.get("/api/chat/metrics")
+async def get_metrics():
+    return JSONResponse(
+        {
+            "success": True,
+            "metrics": {
+                "report_prefilter": ModerationPrefilter().get_stats(),
+                "report_batch": ReportBatcher().get_stats(),
+                "rate_limit": RateLimiter().get_stats(),
+                "config_watcher": UniConfigManager().get_watch_stats(),
+                "tool_cache": ToolsManager().get_cache_stats(),
+                "member_cache": MemberInfoCache().get_stats(),
+                "forward_cache": ForwardSynthesizer().get_stats(),
+                "chat_actors": SessionActors().get_stats(),
+                "llm_scheduler": LLMScheduler().get_stats(),
+                "load_shedding": LoadShedder().get_stats(),
+                "outbox": Outbox().get_stats(),
+                "image_cache": ImagePipeline().get_stats(),
+            },
+        },
+        status_code=200,
+    )
+
+
 @on_page("/manage/chat/function", page_name="信息统计", category="聊天管理")
 async def _(ctx: PageContext):
     insight = await InsightsModel.get()
@@ -1,3 +1,6 @@
+import asyncio
+import time
+
 from nonebot import get_driver, logger
 
 from amrita.plugins.chat.utils.llm_tools.mcp_client import ClientManager
@@ -7,9 +10,30 @@ from .config import config_manager
 from .hook_manager import run_hooks
 
 driver = get_driver()
+_mcp_init_task: asyncio.Task | None = None
 __LOGO = "\033[34mLoading SuggarChat \033[33m {version}-MiniAgent......\033[0m"
 
 
+async def init_mcp_servers(servers: list[str], timeout: float):
+    logger.info(f"正在初始化MCP Client（共{len(servers)}个）......")
+    start = time.perf_counter()
+    results = await ClientManager().initialize_servers(servers, timeout or None)
+    report = "\n".join(
+        f" - {result.server_script}: "
+        + (
+            f"成功，{result.tools}个工具，{result.elapsed:.2f}s"
+            if result.success
+            else f"失败（{result.error}），{result.elapsed:.2f}s"
+        )
+        for result in sorted(results, key=lambda r: r.elapsed, reverse=True)
+    )
+    logger.info(
+        f"MCP Client初始化完成！成功 {sum(r.success for r in results)}/{len(results)}，"
+        f"总耗时 {time.perf_counter() - start:.2f}s"
+        + (f"\n{report}" if report else "")
+    )
+
+
 @driver.on_startup
 async def onEnable():
     kernel_version = "V3"
@@ -20,13 +44,12 @@ async def onEnable():
     await run_hooks()
     await config_manager.save_config()
     if (conf := config.config_manager.config).llm_config.tools.agent_mcp_client_enable:
-        logger.info("正在初始化MCP Client......")
-        mcp_servers = conf.llm_config.tools.agent_mcp_server_scripts
-        for server in mcp_servers:
-            try:
-                await ClientManager().initialize_this(server)
-            except Exception as e:  # noqa: PERF203
-                logger.error(f"初始化MCP Client@{server}失败: {e}")
-                logger.opt(exception=e, colors=True).exception(e)
-        logger.info("MCP Client初始化完成！")
+        # MCP Server在后台并发初始化，不阻塞启动，工具在各自就绪后注册
+        global _mcp_init_task
+        _mcp_init_task = asyncio.create_task(
+            init_mcp_servers(
+                conf.llm_config.tools.agent_mcp_server_scripts,
+                conf.llm_config.tools.mcp_init_timeout,
+            )
+        )
     logger.debug("成功启动！")
@@ -0,0 +1,211 @@
+"""合并转发消息合成模块
+
+按转发ID缓存合成后的文本（LRU），同一层级的嵌套合并转发会被并发获取，并受嵌套深度与节点数限制。
+合成结果会按Token预算截断，避免超长的合并转发撑爆提示词。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from nonebot import logger
+from nonebot.adapters.onebot.v11 import Bot
+from typing_extensions import Self
+
+from ..config import config_manager
+from .tokenizer import hybrid_token_count
+
+FORWARD_KEY = tuple[str, int]
+
+
+@dataclass
+class ForwardCacheStats:
+    hits: int = 0  # 命中缓存的次数
+    fetches: int = 0  # 调用 get_forward_msg 的次数
+    truncated: int = 0  # 因Token预算被截断的次数
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.fetches
+        return self.hits / total if total else 0.0
+
+
+def _normalize_nodes(forward_msg: Any) -> list[dict[str, Any]]:
+    """兼容直接返回节点列表与返回 {"messages": [...]} 的协议端"""
+    if isinstance(forward_msg, dict):
+        forward_msg = forward_msg.get("messages") or []
+    return list(forward_msg)
+
+
+class ForwardSynthesizer:
+    """合并转发消息合成器"""
+
+    _instance = None
+    _cache: OrderedDict[FORWARD_KEY, str]
+    _inflight: dict[FORWARD_KEY, asyncio.Future[str]]
+    stats: ForwardCacheStats
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._cache = OrderedDict()
+            cls._inflight = {}
+            cls.stats = ForwardCacheStats()
+        return cls._instance
+
+    async def synthesize_id(self, forward_id: str, bot: Bot) -> str:
+        """按转发ID获取并合成合并转发消息，结果按Token预算截断"""
+        conf = config_manager.config.function
+        text = await self._synthesize_id(forward_id, bot, conf.forward_max_depth)
+        return self.truncate(text)
+
+    async def synthesize(self, forward_msg: Any, bot: Bot) -> str:
+        """合成已获取的合并转发消息"""
+        conf = config_manager.config.function
+        return await self._render(
+            _normalize_nodes(forward_msg), bot, conf.forward_max_depth
+        )
+
+    async def _synthesize_id(self, forward_id: str, bot: Bot, depth: int) -> str:
+        key: FORWARD_KEY = (forward_id, depth)
+        if (text := self._cache.get(key)) is not None:
+            self._cache.move_to_end(key)
+            self.stats.hits += 1
+            return text
+        # 同一合并转发被并发引用时只获取一次
+        if (future := self._inflight.get(key)) is not None:
+            self.stats.hits += 1
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.stats.fetches += 1
+            forward = await bot.get_forward_msg(id=forward_id)
+            text = await self._render(_normalize_nodes(forward), bot, depth)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(text)
+            self._cache[key] = text
+            while len(self._cache) > config_manager.config.function.forward_cache_size:
+                self._cache.popitem(last=False)
+            return text
+        finally:
+            self._inflight.pop(key, None)
+            # 发起请求的任务被取消时，等待同一结果的其他请求也需要结束
+            if not future.done():
+                future.set_exception(RuntimeError("获取合并转发的请求已被取消"))
+                future.exception()
+
+    async def _render(self, nodes: list[dict[str, Any]], bot: Bot, depth: int) -> str:
+        """合成节点列表，depth为仍允许展开的嵌套层数"""
+        max_nodes = config_manager.config.function.forward_max_nodes
+        omitted = max(0, len(nodes) - max_nodes) if max_nodes > 0 else 0
+        if omitted:
+            nodes = nodes[:max_nodes]
+        for node in nodes:
+            if isinstance(node.get("data"), str):
+                try:
+                    node["data"] = json.loads(node["data"])
+                except Exception:
+                    pass
+        nested_ids = list(
+            dict.fromkeys(
+                str(seg["data"]["id"])
+                for node in nodes
+                if isinstance(node.get("data"), dict)
+                and isinstance(node["data"].get("content"), list)
+                for seg in node["data"]["content"]
+                if isinstance(seg, dict)
+                and seg.get("type") == "forward"
+                and isinstance(seg.get("data"), dict)
+                and "id" in seg["data"]
+            )
+        )
+        nested: dict[str, str] = {}
+        if nested_ids and depth > 0:
+            # 同一层级的嵌套合并转发并发获取
+            results = await asyncio.gather(
+                *(self._synthesize_id(i, bot, depth - 1) for i in nested_ids),
+                return_exceptions=True,
+            )
+            for forward_id, result in zip(nested_ids, results):
+                if isinstance(result, BaseException):
+                    logger.opt(colors=True, exception=result).warning(
+                        f"获取嵌套合并转发 {forward_id} 时出错：{result!s}"
+                    )
+                    nested[forward_id] = "<!--该合并转发无法被获取-->"
+                else:
+                    nested[forward_id] = result
+
+        result = ""
+        for node in nodes:
+            try:
+                if isinstance(node["data"], str):
+                    result += node["data"] + "<!--该消息段无法被解析-->\n"
+                    continue
+                data: dict[str, Any] = node["data"]
+                nickname: str = data["nickname"]
+                qq: str = data["user_id"]
+                result += f"[{nickname}({qq})]说："
+                if isinstance(data["content"], str):
+                    result += f"{data['content']}"
+                elif isinstance(data["content"], list):
+                    for segments in data["content"]:
+                        match segments["type"]:
+                            case "text":
+                                result += f"{segments['data']['text']}"
+                            case "at":
+                                result += f" [@{segments['data']['qq']}]"
+                            case "forward":
+                                inner = nested.get(
+                                    str(segments["data"]["id"]),
+                                    "<!--嵌套层数过多，已省略-->",
+                                )
+                                result += f"\\（合并转发:{inner}）\\"
+            except Exception as e:
+                logger.opt(colors=True, exception=e).warning(
+                    f"解析消息时出错：{e!s}'"
+                )
+                result += f"\n<!--该消息段无法被解析--><origin>{node!s}</origin>"
+            result += "\n"
+        if omitted:
+            result += f"<!--消息过多，已省略 {omitted} 条-->\n"
+        return result
+
+    def truncate(self, text: str) -> str:
+        """按Token预算截断合成文本，保留开头的完整行"""
+        budget = config_manager.config.function.forward_token_budget
+        if budget <= 0 or hybrid_token_count(text) <= budget:
+            return text
+        lines = text.splitlines(keepends=True)
+        kept: list[str] = []
+        used = 0
+        for line in lines:
+            used += hybrid_token_count(line)
+            if used > budget:
+                break
+            kept.append(line)
+        self.stats.truncated += 1
+        return (
+            "".join(kept)
+            + f"<!--合并转发内容过长，已截断 {len(lines) - len(kept)} 行-->\n"
+        )
+
+    def clear(self):
+        self._cache.clear()
+
+    def get_stats(self) -> dict[str, int | float]:
+        return {
+            "size": len(self._cache),
+            "hits": self.stats.hits,
+            "fetches": self.stats.fetches,
+            "truncated": self.stats.truncated,
+            "hit_rate": self.stats.hit_rate,
+        }
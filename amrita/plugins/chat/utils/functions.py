@@ -1,4 +1,4 @@
-import json
+import math
 from datetime import datetime
 from typing import Any
 
@@ -12,6 +12,8 @@ from nonebot.adapters.onebot.v11 import (
 
 from ..chatmanager import chat_manager
 from ..config import config_manager
+from .forward import ForwardSynthesizer
+from .member_cache import MemberInfoCache
 
 
 def remove_think_tag(text: str) -> str:
@@ -51,14 +53,8 @@ async def is_member(event: GroupMessageEvent, bot: Bot) -> bool:
     """判断用户是否为群组普通成员"""
     # 获取群成员信息
     user_role = (
-        (
-            await bot.get_group_member_info(
-                group_id=event.group_id, user_id=event.user_id
-            )
-        )["role"]
-        if not event.sender.role
-        else event.sender.role
-    )
+        await MemberInfoCache().get(bot, event.group_id, event.user_id, event.sender)
+    )["role"]
     return user_role == "member"
 
 
@@ -87,7 +83,7 @@ def split_message_into_chats(text: str, max_length: int = 100) -> list[str]:
 
     sentences = []
     start = 0
-    for match in config_manager.config.function.pattern.finditer(text):
+    for match in config_manager.snapshot.split_pattern.finditer(text):
         end = match.end()
         if sentence := text[start:end].strip():
             sentences.append(sentence)
@@ -138,34 +134,10 @@ async def synthesize_forward_message(forward_msg: dict, bot: Bot) -> str:
             }
         }
     ]
+
+    嵌套的合并转发会被并发获取，并受配置中的嵌套深度与节点数限制。
     """
-    result = ""
-    for segment in forward_msg:
-        try:
-            if isinstance(segment["data"], str):
-                try:
-                    segment["data"] = json.loads(segment["data"])
-                except Exception:
-                    result += segment["data"] + "<!--该消息段无法被解析-->"
-            nickname: str = segment["data"]["nickname"]
-            qq: str = segment["data"]["user_id"]
-            result += f"[{nickname}({qq})]说："
-            if isinstance(segment["data"]["content"], str):
-                result += f"{segment['data']['content']}"
-            elif isinstance(segment["data"]["content"], list):
-                for segments in segment["data"]["content"]:
-                    match segments["type"]:
-                        case "text":
-                            result += f"{segments['data']['text']}"
-                        case "at":
-                            result += f" [@{segments['data']['qq']}]"
-                        case "forward":
-                            result += f"\\（合并转发:{await synthesize_forward_message(await bot.get_forward_msg(id=segments['data']['id']), bot)}）\\"
-        except Exception as e:
-            logger.opt(colors=True, exception=e).warning(f"解析消息时出错：{e!s}'")
-            result += f"\n<!--该消息段无法被解析--><origin>{segment!s}</origin>"
-        result += "\n"
-    return result
+    return await ForwardSynthesizer().synthesize(forward_msg, bot)
 
 
 async def synthesize_message(message: Message, bot: Bot) -> str:
@@ -180,14 +152,12 @@ async def synthesize_message(message: Message, bot: Bot) -> str:
             segment.type == "forward"
             and config_manager.config.function.synthesize_forward_message
         ):
-            forward = await bot.get_forward_msg(id=segment.data["id"])
+            forward = await ForwardSynthesizer().synthesize_id(
+                str(segment.data["id"]), bot
+            )
             if chat_manager.debug:
                 logger.debug(forward)
-            content += (
-                " \\（合并转发\n"
-                + await synthesize_forward_message(forward, bot)
-                + "）\\\n"
-            )
+            content += " \\（合并转发\n" + forward + "）\\\n"
     return content
 
 
@@ -198,6 +168,14 @@ def split_list(lst: list, threshold: int) -> list[Any]:
     return [lst[i : i + threshold] for i in range(0, len(lst), threshold)]
 
 
+def percentile(values: list[float], q: float) -> float:
+    """最近秩法计算分位数，没有数据时返回0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
 def get_current_datetime_timestamp():
     """获取当前时间并格式化为日期、星期和时间字符串"""
     utc_time = datetime.now(pytz.utc)
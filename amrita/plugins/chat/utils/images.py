@@ -0,0 +1,320 @@
+"""多模态图片处理模块
+
+收到图片时立即下载一次原图并存入按内容寻址的磁盘缓存，记忆中只保存本地引用，避免QQ图片链接过期，
+也避免每轮对话都向模型重复传输原图。发送请求前按预设的最大分辨率缩小并重新编码为JPEG，
+再以base64或本地文件路径的形式传给模型。缓存超出容量时淘汰最久未使用的文件。
+
+图片的下载方式可通过 `ImagePipeline().set_fetcher` 替换。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+import io
+import os
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+import nonebot_plugin_localstore as store
+from aiohttp import ClientSession, ClientTimeout
+from nonebot import logger
+from PIL import Image, ImageOps
+from typing_extensions import Self
+
+from ..config import ModelPreset, config_manager
+from .models import ImageContent, ImageUrl, Message, TextContent, ToolResult
+
+IMAGE_SCHEME = "amrita-image://"
+ImageFetcher = Callable[[str], Awaitable[bytes]]
+
+
+@dataclass
+class ImageCacheStats:
+    hits: int = 0  # 命中缓存的次数
+    fetches: int = 0  # 下载图片的次数
+    failed: int = 0  # 下载或处理失败的次数
+    encoded: int = 0  # 缩放并重新编码的次数
+    evicted: int = 0  # 被淘汰的缓存文件数
+    bytes_in: int = 0  # 下载的原图总大小
+    bytes_out: int = 0  # 重新编码后的图片总大小
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.fetches + self.encoded
+        return self.hits / total if total else 0.0
+
+
+async def http_fetcher(url: str) -> bytes:
+    """默认的图片下载方式"""
+    conf = config_manager.config.llm_config.image
+    limit = conf.max_download_mb * 1024 * 1024
+    async with ClientSession(timeout=ClientTimeout(total=conf.fetch_timeout)) as session:
+        async with session.get(url) as resp:
+            resp.raise_for_status()
+            if (resp.content_length or 0) > limit:
+                raise ValueError(f"图片大小超过限制：{resp.content_length} bytes")
+            data = bytearray()
+            async for chunk in resp.content.iter_chunked(65536):
+                data += chunk
+                if len(data) > limit:
+                    raise ValueError(f"图片大小超过限制：>{limit} bytes")
+            return bytes(data)
+
+
+def _encode(data: bytes, max_side: int, quality: int) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if max_side > 0 and max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+        return output.getvalue()
+
+
+class ImagePipeline:
+    """图片下载、缩放与磁盘缓存"""
+
+    _instance = None
+    _fetcher: ImageFetcher
+    _cache_dir: Path | None
+    _index: OrderedDict[str, int]  # 文件名 -> 大小，按最近使用排序
+    _total: int
+    _urls: OrderedDict[str, str]  # 图片链接 -> 内容摘要
+    _inflight: dict[str, asyncio.Future[str]]
+    stats: ImageCacheStats
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._fetcher = http_fetcher
+            cls._cache_dir = None
+            cls._index = OrderedDict()
+            cls._total = 0
+            cls._urls = OrderedDict()
+            cls._inflight = {}
+            cls.stats = ImageCacheStats()
+        return cls._instance
+
+    def set_fetcher(self, fetcher: ImageFetcher | None):
+        """替换图片下载方式，传入None恢复默认"""
+        self._fetcher = fetcher or http_fetcher
+
+    @staticmethod
+    def _scan_cache_dir() -> tuple[Path, list[tuple[str, int]]]:
+        """创建缓存目录，并按修改时间返回已有的文件，命中缓存时会更新文件的修改时间"""
+        cache_dir = store.get_plugin_cache_dir() / "images"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        files = sorted(
+            ((f, f.stat()) for f in cache_dir.iterdir() if f.is_file()),
+            key=lambda item: item[1].st_mtime,
+        )
+        return cache_dir, [(f.name, st.st_size) for f, st in files]
+
+    async def get_cache_dir(self) -> Path:
+        """获取缓存目录，首次调用时按修改时间重建LRU顺序"""
+        if self._cache_dir is None:
+            cache_dir, files = await asyncio.to_thread(self._scan_cache_dir)
+            if self._cache_dir is None:
+                for name, size in files:
+                    self._index[name] = size
+                    self._total += size
+                self._cache_dir = cache_dir
+        return self._cache_dir
+
+    @staticmethod
+    def _touch_file(path: Path) -> bool:
+        if not path.exists():
+            return False
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    async def _touch(self, name: str) -> bool:
+        if name not in self._index:
+            return False
+        path = await self.get_cache_dir() / name
+        if not await asyncio.to_thread(self._touch_file, path):
+            if name in self._index:
+                self._total -= self._index.pop(name)
+            return False
+        if name in self._index:
+            self._index.move_to_end(name)
+        return True
+
+    @staticmethod
+    def _unlink_all(paths: list[Path]):
+        for path in paths:
+            with contextlib.suppress(OSError):
+                path.unlink()
+
+    async def _store(self, name: str, data: bytes):
+        cache_dir = await self.get_cache_dir()
+        await asyncio.to_thread((cache_dir / name).write_bytes, data)
+        self._total += len(data) - self._index.pop(name, 0)
+        self._index[name] = len(data)
+        limit = config_manager.config.llm_config.image.cache_size_mb * 1024 * 1024
+        evicted: list[Path] = []
+        # 不淘汰刚写入的文件
+        while self._total > limit and len(self._index) > 1:
+            evicted_name, size = self._index.popitem(last=False)
+            self._total -= size
+            self.stats.evicted += 1
+            evicted.append(cache_dir / evicted_name)
+        if evicted:
+            await asyncio.to_thread(self._unlink_all, evicted)
+
+    async def localize(self, url: str) -> str:
+        """下载图片并存入缓存，返回可写入记忆的本地引用；下载失败时返回原链接"""
+        if (
+            not config_manager.config.llm_config.image.enable
+            or url.startswith((IMAGE_SCHEME, "data:"))
+        ):
+            return url
+        try:
+            digest = await self._fetch(url)
+        except Exception as e:
+            self.stats.failed += 1
+            logger.warning(f"下载图片失败，将直接使用图片链接：{e!s}")
+            return url
+        return f"{IMAGE_SCHEME}{digest}#{url}"
+
+    async def localize_all(self, urls: Iterable[str]) -> list[str]:
+        return list(await asyncio.gather(*(self.localize(url) for url in urls)))
+
+    async def _fetch(self, url: str) -> str:
+        """下载原图，返回内容摘要"""
+        if (digest := self._urls.get(url)) is not None and await self._touch(
+            f"{digest}.src"
+        ):
+            self._urls.move_to_end(url)
+            self.stats.hits += 1
+            return digest
+        if (future := self._inflight.get(url)) is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        try:
+            self.stats.fetches += 1
+            data = await self._fetcher(url)
+            self.stats.bytes_in += len(data)
+            digest = hashlib.sha256(data).hexdigest()
+            if not await self._touch(f"{digest}.src"):
+                await self._store(f"{digest}.src", data)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(digest)
+            self._urls[url] = digest
+            while len(self._urls) > 1024:
+                self._urls.popitem(last=False)
+            return digest
+        finally:
+            self._inflight.pop(url, None)
+            # 发起下载的任务被取消时，等待同一图片的其他请求也需要结束
+            if not future.done():
+                future.set_exception(RuntimeError("下载图片的请求已被取消"))
+                future.exception()
+
+    async def resolve(self, url: str, max_side: int) -> str | None:
+        """将本地引用转换为发送给模型的图片地址，原图已不可用时返回None"""
+        if not url.startswith(IMAGE_SCHEME):
+            return url
+        digest, _, source = url.removeprefix(IMAGE_SCHEME).partition("#")
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            return None
+        conf = config_manager.config.llm_config.image
+        name = f"{digest}.{max_side}.jpg"
+        cache_dir = await self.get_cache_dir()
+        path = cache_dir / name
+        if await self._touch(name):
+            self.stats.hits += 1
+        else:
+            src = cache_dir / f"{digest}.src"
+            try:
+                if not await self._touch(src.name):
+                    # 原图已被淘汰，尝试重新下载（链接可能已经过期）
+                    if not source or await self._fetch(source) != digest:
+                        return None
+                data = await asyncio.to_thread(
+                    _encode,
+                    await asyncio.to_thread(src.read_bytes),
+                    max_side,
+                    conf.jpeg_quality,
+                )
+            except Exception as e:
+                self.stats.failed += 1
+                logger.warning(f"处理图片 {digest} 失败：{e!s}")
+                return None
+            self.stats.encoded += 1
+            self.stats.bytes_out += len(data)
+            await self._store(name, data)
+            if conf.transport == "base64":
+                return f"data:image/jpeg;base64,{base64.b64encode(data).decode()}"
+        if conf.transport == "file":
+            return path.resolve().as_uri()
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+        except OSError as e:
+            # 缓存文件可能在命中后被并发淘汰或被手动删除
+            self.stats.failed += 1
+            logger.warning(f"读取图片缓存 {name} 失败：{e!s}")
+            return None
+        return f"data:image/jpeg;base64,{base64.b64encode(data).decode()}"
+
+    async def prepare(
+        self, messages: Iterable[Message | ToolResult], preset: ModelPreset
+    ) -> list[Message | ToolResult]:
+        """将消息中的本地图片引用替换为按预设分辨率处理后的图片，不修改原消息"""
+        max_side = preset.image_max_side or config_manager.config.llm_config.image.max_side
+        prepared: list[Message | ToolResult] = []
+        for msg in messages:
+            if isinstance(msg, ToolResult) or not isinstance(msg.content, list):
+                prepared.append(msg)
+                continue
+            if not any(
+                isinstance(part, ImageContent)
+                and part.image_url.url.startswith(IMAGE_SCHEME)
+                for part in msg.content
+            ):
+                prepared.append(msg)
+                continue
+            content: list[TextContent | ImageContent] = []
+            for part in msg.content:
+                if not isinstance(part, ImageContent):
+                    content.append(part)
+                elif (url := await self.resolve(part.image_url.url, max_side)) is None:
+                    content.append(TextContent(text="[图片已过期]"))
+                else:
+                    content.append(ImageContent(image_url=ImageUrl(url=url)))
+            prepared.append(msg.model_copy(update={"content": content}))
+        return prepared
+
+    def get_stats(self) -> dict[str, int | float]:
+        return {
+            "files": len(self._index),
+            "size": self._total,
+            "hits": self.stats.hits,
+            "fetches": self.stats.fetches,
+            "failed": self.stats.failed,
+            "encoded": self.stats.encoded,
+            "evicted": self.stats.evicted,
+            "bytes_in": self.stats.bytes_in,
+            "bytes_out": self.stats.bytes_out,
+            "hit_rate": self.stats.hit_rate,
+        }
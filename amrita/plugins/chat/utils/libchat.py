@@ -1,9 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import time
 import typing
 from collections.abc import Iterable
-from copy import deepcopy
 
 import openai
 from nonebot import logger
@@ -30,8 +30,10 @@ from ..config import ModelPreset, config_manager
 from ..utils.llm_tools.models import ToolFunctionSchema
 from ..utils.models import InsightsModel
 from ..utils.protocol import ToolCall
-from .functions import remove_think_tag
+from .functions import percentile, remove_think_tag
+from .images import ImagePipeline
 from .llm_tools.models import ToolChoice
+from .load_shedder import LoadShedder, ShedStage
 from .memory import BaseModel, Message, ToolResult, get_memory_data
 from .models import (
     TextContent,
@@ -42,6 +44,8 @@ from .protocol import (
     AdapterManager,
     ModelAdapter,
 )
+from .rate_limiter import PresetLimiter, RateLimiter, Reservation
+from .scheduler import LLMScheduler
 
 TEST_MSG_PROMPT: Message[list[TextContent]] = Message(
     role="system",
@@ -71,64 +75,163 @@ class PresetReport(BaseModel):
     time_used: float
 
 
-async def test_presets() -> typing.AsyncGenerator[PresetReport, None]:
-    presets = await config_manager.get_all_presets(True)
-    logger.debug(f"开始测试所有(共计{len(presets)}个)预设...")
-    prompt_tokens = hybrid_token_count(
+class PresetBenchmark(BaseModel):
+    preset_name: str  # 预设名称
+    rounds: int  # 测试轮数
+    success: int  # 成功次数
+    errors: int  # 失败次数
+    latency_p50: float  # 延迟中位数（秒）
+    latency_p95: float  # 95分位延迟（秒）
+    latency_max: float  # 最大延迟（秒）
+    tokens_per_second: float  # 平均输出速度（token/s）
+    last_error: str = ""  # 最后一次错误信息
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.rounds if self.rounds else 0.0
+
+
+async def _test_preset(preset: ModelPreset, prompt_tokens: int) -> PresetReport:
+    logger.debug(f"正在测试预设：{preset.name}...")
+    adapter = AdapterManager().safe_get_adapter(preset.protocol)
+    if adapter is None:
+        logger.warning(f"未定义的协议适配器：{preset.protocol}")
+        return PresetReport(
+            preset_name=preset.name,
+            preset_data=preset,
+            test_input=(TEST_MSG_PROMPT, TEST_MSG_USER),
+            test_output=None,
+            token_prompt=prompt_tokens,
+            token_completion=0,
+            status=False,
+            message=f"未定义的协议适配器: {preset.protocol}",
+            time_used=0,
+        )
+    try:
+        time_start = time.perf_counter()
+        logger.debug(f"正在调用预设：{preset.name}...")
+        data = await adapter(preset, config_manager.config).call_api(TEST_MSG_LIST)
+        time_delta = time.perf_counter() - time_start
+        logger.debug(f"调用预设 {preset.name} 成功，耗时 {time_delta:.2f} 秒")
+        return PresetReport(
+            preset_name=preset.name,
+            preset_data=preset,
+            test_input=(TEST_MSG_PROMPT, TEST_MSG_USER),
+            test_output=Message(content=[TextContent(type="text", text=data.content)]),
+            token_prompt=prompt_tokens,
+            token_completion=data.usage.completion_tokens
+            if data.usage is not None and data.usage.completion_tokens is not None
+            else hybrid_token_count(data.content),
+            status=True,
+            message="",
+            time_used=time_delta,
+        )
+    except Exception as e:
+        logger.error(f"测试预设 {preset.name} 时发生错误：{e}")
+        return PresetReport(
+            preset_name=preset.name,
+            preset_data=preset,
+            test_input=(TEST_MSG_PROMPT, TEST_MSG_USER),
+            test_output=None,
+            token_prompt=prompt_tokens,
+            token_completion=0,
+            status=False,
+            message=str(e),
+            time_used=0,
+        )
+
+
+def _test_prompt_tokens() -> int:
+    return hybrid_token_count(
         "".join(
             [typing.cast(TextContent, msg.content[0]).text for msg in TEST_MSG_LIST]
         )
     )
+
+
+async def run_preset_tests(
+    concurrency: int = 4,
+) -> typing.AsyncGenerator[PresetReport, None]:
+    """并发测试所有预设，按完成顺序返回测试结果
+
+    Args:
+        concurrency (int, optional): 最大并发数. Defaults to 4.
+    """
+    presets = await config_manager.get_all_presets(True)
+    logger.debug(f"开始测试所有(共计{len(presets)}个)预设...")
+    prompt_tokens = _test_prompt_tokens()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(preset: ModelPreset) -> PresetReport:
+        async with semaphore:
+            return await _test_preset(preset, prompt_tokens)
+
+    for future in asyncio.as_completed([run(preset) for preset in presets]):
+        yield await future
+
+
+async def test_presets() -> typing.AsyncGenerator[PresetReport, None]:
+    """兼容旧接口，等同于 `run_preset_tests()`"""
+    async for report in run_preset_tests():
+        yield report
+
+
+async def benchmark_presets(
+    rounds: int = 3,
+    concurrency: int = 4,
+    warmup: bool = False,
+    presets: list[ModelPreset] | None = None,
+) -> list[PresetBenchmark]:
+    """对所有预设进行多轮并发基准测试
+
+    Args:
+        rounds (int, optional): 每个预设的测试轮数. Defaults to 3.
+        concurrency (int, optional): 最大并发请求数. Defaults to 4.
+        warmup (bool, optional): 是否在正式测试前为每个预设预热一次（不计入结果）. Defaults to False.
+        presets (list[ModelPreset] | None, optional): 要测试的预设，为空时测试所有预设. Defaults to None.
+
+    Returns:
+        list[PresetBenchmark]: 每个预设的测试统计
+    """
+    if presets is None:
+        presets = await config_manager.get_all_presets(True)
+    prompt_tokens = _test_prompt_tokens()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(preset: ModelPreset) -> PresetReport:
+        async with semaphore:
+            return await _test_preset(preset, prompt_tokens)
+
+    if warmup:
+        logger.debug("正在预热所有预设...")
+        await asyncio.gather(*(run(preset) for preset in presets))
+    reports = await asyncio.gather(
+        *(run(preset) for preset in presets for _ in range(max(1, rounds)))
+    )
+    results: list[PresetBenchmark] = []
     for preset in presets:
-        logger.debug(f"正在测试预设：{preset.name}...")
-        adapter = AdapterManager().safe_get_adapter(preset.protocol)
-        if adapter is None:
-            logger.warning(f"未定义的协议适配器：{preset.protocol}")
-            yield PresetReport(
-                preset_name=preset.name,
-                preset_data=preset,
-                test_input=(TEST_MSG_PROMPT, TEST_MSG_USER),
-                test_output=None,
-                token_prompt=prompt_tokens,
-                token_completion=0,
-                status=False,
-                message=f"未定义的协议适配器: {preset.protocol}",
-                time_used=0,
-            )
-            continue
-        try:
-            time_start = time.time()
-            logger.debug(f"正在调用预设：{preset.name}...")
-            data = await adapter(preset, config_manager.config).call_api(TEST_MSG_LIST)
-            time_end = time.time()
-            time_delta = time_end - time_start
-            logger.debug(f"调用预设 {preset.name} 成功，耗时 {time_delta:.2f} 秒")
-            yield PresetReport(
+        preset_reports = [r for r in reports if r.preset_name == preset.name]
+        succeeded = [r for r in preset_reports if r.status]
+        latencies = [r.time_used for r in succeeded]
+        failed = [r for r in preset_reports if not r.status]
+        total_time = sum(latencies)
+        results.append(
+            PresetBenchmark(
                 preset_name=preset.name,
-                preset_data=preset,
-                test_input=(TEST_MSG_PROMPT, TEST_MSG_USER),
-                test_output=Message(
-                    content=[TextContent(type="text", text=data.content)]
-                ),
-                token_prompt=prompt_tokens,
-                token_completion=hybrid_token_count(data.content),
-                status=True,
-                message="",
-                time_used=time_delta,
-            )
-        except Exception as e:
-            logger.error(f"测试预设 {preset.name} 时发生错误：{e}")
-            yield PresetReport(
-                preset_name=preset.name,
-                preset_data=preset,
-                test_input=(TEST_MSG_PROMPT, TEST_MSG_USER),
-                test_output=None,
-                token_prompt=prompt_tokens,
-                token_completion=0,
-                status=False,
-                message=str(e),
-                time_used=0,
+                rounds=len(preset_reports),
+                success=len(succeeded),
+                errors=len(failed),
+                latency_p50=percentile(latencies, 0.5),
+                latency_p95=percentile(latencies, 0.95),
+                latency_max=max(latencies, default=0.0),
+                tokens_per_second=sum(r.token_completion for r in succeeded)
+                / total_time
+                if total_time
+                else 0.0,
+                last_error=failed[-1].message if failed else "",
             )
+        )
+    return results
 
 
 async def get_tokens(
@@ -273,31 +376,60 @@ async def _determine_presets(
         if has_multimodal_content:
             break
 
-    config = config_manager.config
     if has_multimodal_content:
-        multimodal_presets = config.preset_extension.multi_modal_preset_list or [
-            config.preset,
-        ] + [
-            preset
-            for preset in config.preset_extension.backup_preset_list
-            if (await config_manager.get_preset(preset)).multimodal
-        ]
-        return multimodal_presets
-    else:
-        return [
-            config.preset,
-            *config.preset_extension.backup_preset_list,
-        ]
+        return config_manager.get_multimodal_presets()
+    presets = config_manager.get_fallback_presets()
+    cheap_preset = config_manager.config.llm_config.load_shedding.cheap_preset
+    if cheap_preset and LoadShedder().stage >= ShedStage.CHEAP_PRESET:
+        # 过载时优先使用低成本预设
+        return [cheap_preset, *(name for name in presets if name != cheap_preset)]
+    return presets
+
+
+def estimate_tokens(messages: Iterable[Message | ToolResult]) -> int:
+    """估算消息列表的提示词Token数"""
+    tokens = 0
+    for msg in messages:
+        if not msg.content:
+            continue
+        tokens += hybrid_token_count(
+            msg.content
+            if isinstance(msg.content, str)
+            else "".join(
+                part.text for part in msg.content if isinstance(part, TextContent)
+            )
+        )
+    return tokens
 
 
 async def _call_with_presets(
-    presets: list[str], call_func: typing.Callable, *args, **kwargs
+    presets: list[str],
+    call_func: typing.Callable,
+    *args,
+    estimated_tokens: int = 0,
+    **kwargs,
 ) -> UniResponse:
-    """使用预设列表调用指定函数"""
+    """使用预设列表调用指定函数
+
+    达到速率限制的预设会被跳过；当所有可用预设都达到限制时，在最快恢复额度的预设上排队等待。
+    取得速率限制额度后再占用调度器的并发名额，等待额度期间不占用名额。
+    """
     if not presets:
         raise ValueError("预设列表为空，无法继续处理。")
 
+    async def call(
+        preset: ModelPreset, limiter: PresetLimiter, reservation: Reservation
+    ) -> UniResponse:
+        adapter = adapter_class_map[preset.name](preset, config_manager.config)
+        async with LLMScheduler().slot(estimated_tokens):
+            response: UniResponse = await call_func(adapter, *args, **kwargs)
+        if response.usage is not None and response.usage.total_tokens is not None:
+            limiter.reconcile(reservation, response.usage.total_tokens)
+        return response
+
     err: Exception | None = None
+    adapter_class_map: dict[str, type[ModelAdapter]] = {}
+    limited: list[tuple[ModelPreset, PresetLimiter]] = []
     for pname in presets:
         preset = await config_manager.get_preset(pname)
         adapter_class = AdapterManager().safe_get_adapter(preset.protocol)
@@ -307,6 +439,7 @@ async def _call_with_presets(
             )
         else:
             raise ValueError(f"未定义的协议适配器：{preset.protocol}")
+        adapter_class_map[preset.name] = adapter_class
 
         logger.debug(f"开始获取 {preset.model} 的对话")
         logger.debug(f"预设：{pname}")
@@ -315,17 +448,28 @@ async def _call_with_presets(
         logger.debug(f"API地址：{preset.base_url}")
         logger.debug(f"模型：{preset.model}")
 
+        limiter = RateLimiter().get_limiter(preset)
+        if (reservation := limiter.try_acquire(estimated_tokens)) is None:
+            logger.info(f"预设 {pname} 已达到速率限制，尝试下一个预设")
+            limiter.stats.switched += 1
+            limited.append((preset, limiter))
+            continue
         try:
-            adapter = adapter_class(preset, config_manager.config)
-            return await call_func(adapter, *args, **kwargs)
+            return await call(preset, limiter, reservation)
         except NotImplementedError:
             continue
         except Exception as e:
             logger.warning(f"调用适配器失败{e}，正在尝试下一个Adapter")
             err = e
             continue
-    else:
-        raise err or RuntimeError("所有适配器调用失败")
+    if limited:
+        preset, limiter = min(limited, key=lambda x: x[1].next_release())
+        logger.info(f"所有可用预设均达到速率限制，正在预设 {preset.name} 上排队等待")
+        reservation = await limiter.acquire(
+            estimated_tokens, config_manager.config.llm_config.rate_limit_timeout
+        )
+        return await call(preset, limiter, reservation)
+    raise err or RuntimeError("所有适配器调用失败")
 
 
 async def tools_caller(
@@ -342,9 +486,17 @@ async def tools_caller(
         tools,
         tool_choice,
     ):
+        messages = await ImagePipeline().prepare(messages, adapter.preset)
         return await adapter.call_tools(messages, tools, tool_choice)
 
-    return await _call_with_presets(presets, _call_tools, messages, tools, tool_choice)
+    return await _call_with_presets(
+        presets,
+        _call_tools,
+        messages,
+        tools,
+        tool_choice,
+        estimated_tokens=estimate_tokens(messages),
+    )
 
 
 async def get_chat(
@@ -357,6 +509,7 @@ async def get_chat(
     async def _call_api(
         adapter: ModelAdapter, messages: Iterable[Message | ToolResult]
     ):
+        messages = await ImagePipeline().prepare(messages, adapter.preset)
         response = await adapter.call_api([(i.model_dump()) for i in messages])
         preset = adapter.preset
         if preset.thought_chain_model:
@@ -364,7 +517,14 @@ async def get_chat(
         return response
 
     # 调用适配器获取聊天响应
-    response = await _call_with_presets(presets, _call_api, messages)
+    start = time.monotonic()
+    try:
+        response = await _call_with_presets(
+            presets, _call_api, messages, estimated_tokens=estimate_tokens(messages)
+        )
+    finally:
+        # 失败与超时的请求同样计入延迟，否则过载时P95延迟会被低估
+        LoadShedder().record_latency(time.monotonic() - start)
 
     if chat_manager.debug:
         logger.debug(response)
@@ -466,10 +626,7 @@ class OpenAIAdapter(ModelAdapter):
         else:
             choice = tool_choice
         config = config_manager.config
-        preset_list = [
-            config.preset,
-            *deepcopy(config.preset_extension.backup_preset_list),
-        ]
+        preset_list = config_manager.get_fallback_presets()
         err: None | Exception = None
         if not preset_list:
             preset_list = ["default"]
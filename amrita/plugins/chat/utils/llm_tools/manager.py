@@ -1,13 +1,34 @@
+import asyncio
+import json
+import time
 import typing
+from collections import OrderedDict
 from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
 from typing import Any, ClassVar
 
 from typing_extensions import Self
 
+from ...config import ToolCachePolicy, config_manager
 from .models import FunctionDefinitionSchema, ToolContext, ToolData, ToolFunctionSchema
 
 T = typing.TypeVar("T")
 
+CACHE_KEY = tuple[str, str, str]  # (工具名称, 共享范围, 参数)
+
+
+@dataclass
+class ToolCacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0  # 因过期而失效的条目数
+    evictions: int = 0  # 因容量限制被淘汰的条目数
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
 
 class ToolsManager:
     _instance = None
@@ -15,6 +36,15 @@ class ToolsManager:
     _disabled_tools: ClassVar[set[str]] = (
         set()
     )  # 禁用的工具，使用has_tool与get_tool不会返回禁用工具
+    _semaphores: ClassVar[dict[str, asyncio.Semaphore]] = {}  # 工具并发限制
+    _cache: ClassVar[OrderedDict[CACHE_KEY, tuple[float, str]]] = (
+        OrderedDict()
+    )  # 缓存键 -> (过期时间, 结果)
+    _cache_stats: ClassVar[ToolCacheStats] = ToolCacheStats()
+    _version: ClassVar[int] = 0  # 工具集合版本，注册/移除/启用/禁用工具时递增
+    _payloads: ClassVar[dict[tuple[str, ...], tuple[int, list[dict[str, Any]]]]] = (
+        {}
+    )  # 前置工具名称 -> (版本, 预计算的工具列表)
 
     def __new__(cls) -> Self:
         if cls._instance is None:
@@ -55,43 +85,202 @@ class ToolsManager:
         }
 
     def tools_meta(self) -> dict[str, ToolFunctionSchema]:
-        return {k: v.data for k, v in self._models.items()}
+        return {k: v.data for k, v in self.get_tools().items()}
 
     def tools_meta_dict(self, **kwargs) -> dict[str, dict[str, Any]]:
-        return {k: v.data.model_dump(**kwargs) for k, v in self._models.items()}
+        return {k: v.data.model_dump(**kwargs) for k, v in self.get_tools().items()}
+
+    @property
+    def version(self) -> int:
+        """工具集合版本，注册/移除/启用/禁用工具时递增"""
+        return self._version
+
+    def tools_payload(
+        self, prefix_tools: tuple[ToolFunctionSchema, ...] = ()
+    ) -> list[dict[str, Any]]:
+        """获取预计算的OpenAI格式工具列表（不包含禁用的工具）
+
+        结果按前置工具缓存，只在工具集合发生变化后重新构建。返回的列表被所有调用方共享，不应修改。
+
+        Args:
+            prefix_tools (tuple[ToolFunctionSchema, ...], optional): 放在列表最前面的工具（如智能体过程工具）. Defaults to ().
+        """
+        key = tuple(tool.function.name for tool in prefix_tools)
+        cached = self._payloads.get(key)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        payload = [tool.model_dump(exclude_none=True) for tool in prefix_tools]
+        payload.extend(self.tools_meta_dict(exclude_none=True).values())
+        self._payloads[key] = (self._version, payload)
+        return payload
+
+    @classmethod
+    def _bump_version(cls) -> None:
+        cls._version += 1
 
     def register_tool(self, tool: ToolData) -> None:
         if tool.data.function.name not in self._models:
             self._models[tool.data.function.name] = tool
+            self._bump_version()
         else:
             raise ValueError(f"工具 {tool.data.function.name} 已经存在")
 
     def remove_tool(self, name: str) -> None:
         if name in self._models:
             del self._models[name]
+            self._bump_version()
+        self._semaphores.pop(name, None)
+        self.clear_cache(name)
         if name in self._disabled_tools:
             self._disabled_tools.remove(name)
 
     def enable_tool(self, name: str) -> None:
         if name in self._disabled_tools:
             self._disabled_tools.remove(name)
+            self._bump_version()
         else:
             raise ValueError(f"工具 {name} 并没有被Disabled")
 
     def disable_tool(self, name: str) -> None:
         if self.has_tool(name):
             self._disabled_tools.add(name)
+            self._bump_version()
         else:
             raise ValueError(f"工具 {name} 不存在或已经禁用")
 
     def get_disabled_tools(self) -> list[str]:
         return list(self._disabled_tools)
 
+    async def run_tool(
+        self, tool: ToolData, context: ToolContext, timeout: float | None = None
+    ) -> str | None:
+        """执行工具，并应用该工具的并发限制与超时
+
+        Args:
+            tool (ToolData): 工具数据
+            context (ToolContext): 工具上下文，非自定义运行的工具只会收到其中的参数
+            timeout (float | None, optional): 超时时间（秒），为空则不限制. Defaults to None.
+
+        Raises:
+            TimeoutError: 工具执行超时
+
+        Returns:
+            str | None: 工具返回内容
+        """
+        name = tool.data.function.name
+        policy = self.get_cache_policy(tool)
+        key = self._cache_key(name, policy, context) if policy else None
+        if key is not None and (cached := self._cache_get(key)) is not None:
+            return cached
+
+        async def call() -> str | None:
+            if tool.custom_run:
+                custom_func = typing.cast(
+                    Callable[[ToolContext], Awaitable[str | None]], tool.func
+                )
+                return await asyncio.wait_for(custom_func(context), timeout)
+            func = typing.cast(Callable[[dict[str, Any]], Awaitable[str]], tool.func)
+            return await asyncio.wait_for(func(context.data), timeout)
+
+        try:
+            if tool.max_concurrency <= 0:
+                result = await call()
+            else:
+                semaphore = self._semaphores.setdefault(
+                    name, asyncio.Semaphore(tool.max_concurrency)
+                )
+                async with semaphore:
+                    result = await call()
+        except asyncio.TimeoutError as e:
+            raise TimeoutError(f"工具 {name} 执行超时（{timeout}s）") from e
+        if key is not None and policy is not None and result is not None:
+            self._cache_put(key, result, policy.ttl)
+        return result
+
+    @staticmethod
+    def get_cache_policy(tool: ToolData) -> ToolCachePolicy | None:
+        """获取工具的缓存策略，配置文件中的策略优先于注册时声明的策略"""
+        policies = config_manager.config.llm_config.tools.tool_cache_policies
+        return policies.get(tool.data.function.name, tool.cache)
+
+    @staticmethod
+    def _cache_key(
+        name: str, policy: ToolCachePolicy, context: ToolContext
+    ) -> CACHE_KEY | None:
+        data = context.data
+        if policy.key_fields is not None:
+            data = {field: data.get(field) for field in policy.key_fields}
+        try:
+            args = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return None
+        match policy.scope:
+            case "global":
+                scope = ""
+            case "group" if (
+                group_id := getattr(context.event.get_nonebot_event(), "group_id", None)
+            ) is not None:
+                scope = f"group_{group_id}"
+            case _:
+                scope = f"user_{context.event.get_nonebot_event().get_user_id()}"
+        return name, scope, args
+
+    def _cache_get(self, key: CACHE_KEY) -> str | None:
+        if (entry := self._cache.get(key)) is None:
+            self._cache_stats.misses += 1
+            return None
+        expires, result = entry
+        if expires < time.monotonic():
+            del self._cache[key]
+            self._cache_stats.expired += 1
+            self._cache_stats.misses += 1
+            return None
+        self._cache.move_to_end(key)
+        self._cache_stats.hits += 1
+        return result
+
+    def _cache_put(self, key: CACHE_KEY, result: str, ttl: float):
+        max_size = config_manager.config.llm_config.tools.tool_cache_size
+        if max_size <= 0 or ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > max_size:
+            self._cache.popitem(last=False)
+            self._cache_stats.evictions += 1
+
+    def clear_cache(self, name: str | None = None) -> None:
+        """清除工具结果缓存
+
+        Args:
+            name (str | None, optional): 工具名称，为空则清除全部缓存. Defaults to None.
+        """
+        if name is None:
+            self._cache.clear()
+            return
+        for key in [key for key in self._cache if key[0] == name]:
+            del self._cache[key]
+
+    def get_cache_stats(self) -> dict[str, int | float]:
+        stats = self._cache_stats
+        return {
+            "size": len(self._cache),
+            "hits": stats.hits,
+            "misses": stats.misses,
+            "expired": stats.expired,
+            "evictions": stats.evictions,
+            "hit_rate": stats.hit_rate,
+        }
+
 
 def on_tools(
     data: FunctionDefinitionSchema,
     custom_run: bool = False,
     strict: bool = False,
+    concurrent: bool = True,
+    timeout: float | None = None,
+    max_concurrency: int = 0,
+    cache: ToolCachePolicy | None = None,
 ):
     """Tools注册装饰器
 
@@ -99,6 +288,10 @@ def on_tools(
         data (FunctionDefinitionSchema): 函数元数据
         custom_run (bool, optional): 是否启用自定义运行模式. Defaults to False.
         strict (bool, optional): 是否启用严格模式. Defaults to False.
+        concurrent (bool, optional): 是否允许与同一轮中的其他工具并发执行. Defaults to True.
+        timeout (float | None, optional): 单次调用超时时间（秒），为空则使用全局配置. Defaults to None.
+        max_concurrency (int, optional): 最大并发调用数（0为不限制）. Defaults to 0.
+        cache (ToolCachePolicy | None, optional): 结果缓存策略，为空则不缓存. Defaults to None.
     """
 
     def decorator(
@@ -109,6 +302,10 @@ def on_tools(
             func=func,
             data=ToolFunctionSchema(function=data, type="function", strict=strict),
             custom_run=custom_run,
+            concurrent=concurrent,
+            timeout=timeout,
+            max_concurrency=max_concurrency,
+            cache=cache,
         )
         ToolsManager().register_tool(tool_data)
         return func
@@ -1,15 +1,25 @@
 # mcp_client.py
+import asyncio
+import json
 import random
+import time
 from asyncio import Lock
 from copy import deepcopy
-from typing import Any, overload
+from dataclasses import dataclass
+from typing import Any, Literal, overload
 
+import httpx
+import mcp.types
 from fastmcp import Client
+from fastmcp.client.messages import MessageHandler
 from fastmcp.client.transports import ClientTransportT
+from fastmcp.exceptions import ToolError
+from mcp import McpError
 from nonebot import logger
 from typing_extensions import Self
 from zipp import Path
 
+from amrita.plugins.chat.config import config_manager
 from amrita.plugins.chat.utils.llm_tools.manager import ToolsManager
 from amrita.plugins.chat.utils.llm_tools.models import (
     FunctionDefinitionSchema,
@@ -20,23 +30,81 @@ from amrita.plugins.chat.utils.llm_tools.models import (
 
 MCP_SERVER_SCRIPT_TYPE = ClientTransportT
 
+CONNECTION_STATE = Literal["disconnected", "connecting", "connected", "reconnecting"]
+
+# 视为连接故障的传输层异常
+CONNECTION_ERRORS = (OSError, httpx.TransportError)
+
 
 class NOT_GIVEN:
     pass
 
 
+@dataclass
+class MCPInitResult:
+    server_script: str
+    success: bool
+    elapsed: float  # 耗时（秒）
+    error: str = ""
+    tools: int = 0  # 注册的工具数量
+
+
+@dataclass
+class ToolLatency:
+    calls: int = 0
+    errors: int = 0
+    total: float = 0.0  # 累计耗时（秒）
+    max: float = 0.0  # 最长耗时（秒）
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+class _ToolListChangedHandler(MessageHandler):
+    """收到工具列表变更通知时刷新工具"""
+
+    def __init__(self, client: "MCPClient"):
+        self.client = client
+
+    async def on_tool_list_changed(
+        self, message: mcp.types.ToolListChangedNotification
+    ) -> None:
+        self.client._schedule(self.client._on_tool_list_changed())
+
+
 class MCPClient:
-    """可复用的MCP Client"""
+    """可复用的MCP Client
+
+    连接建立后保持常驻：后台定期发送心跳，连接断开时按指数退避自动重连，
+    并限制同时进行中的工具调用数量。
+    """
 
     def __init__(
         self,
         server_script: MCP_SERVER_SCRIPT_TYPE,
         # headers: dict | None = None,
     ):
-        self.mcp_client = None
+        self.mcp_client: Client | None = None
         self.server_script = server_script
         self.tools = []
         self.openai_tools = []
+        self.registered_tools: list[str] = []  # 在ToolsManager中注册的工具名称
+        self.state: CONNECTION_STATE = "disconnected"
+        self.reconnects = 0
+        self.last_error: str = ""
+        self.latency: dict[str, ToolLatency] = {}
+        self._inflight = 0
+        self._calls: dict[Client, int] = {}  # 各连接上进行中的工具调用数
+        self._retired: set[Client] = set()  # 已被替换、待调用结束后关闭的连接
+        self._semaphore: asyncio.Semaphore | None = None
+        self._connect_lock = Lock()
+        self._keepalive_task: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    def __str__(self) -> str:
+        return f"MCPClient@{self.server_script!s}"
 
     async def __aenter__(self):
         await self._connect()
@@ -45,32 +113,170 @@ class MCPClient:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self._close()
 
+    @property
+    def inflight(self) -> int:
+        """进行中的工具调用数"""
+        return self._inflight
+
+    def _schedule(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
     async def simple_call(self, tool_name: str, data: dict[str, Any]):
         """调用 MCP 工具
         Args:
             tool_name (str): 工具名称
             data (dict[str, Any]): 工具参数
         """
-        if self.mcp_client is None:
-            raise RuntimeError("MCP Server 未连接！")
-        return await self.mcp_client.call_tool(tool_name, data)
+        if self.mcp_client is None or not self.mcp_client.is_connected():
+            await self.ensure_connected()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(
+                max(config_manager.config.llm_config.tools.mcp_max_inflight, 1)
+            )
+        latency = self.latency.setdefault(tool_name, ToolLatency())
+        async with self._semaphore:
+            client = self.mcp_client
+            if client is None:
+                raise RuntimeError("MCP Server 未连接！")
+            self._inflight += 1
+            self._calls[client] = self._calls.get(client, 0) + 1
+            start = time.perf_counter()
+            try:
+                return await client.call_tool(tool_name, data)
+            except ToolError:
+                latency.errors += 1
+                raise
+            except McpError as e:
+                # JSON-RPC错误（参数错误、工具不存在、请求超时等）不影响连接，仅连接关闭时重连
+                latency.errors += 1
+                if e.error.code == mcp.types.CONNECTION_CLOSED:
+                    self._on_connection_lost(e, client)
+                raise
+            except Exception as e:
+                latency.errors += 1
+                # 传输层错误或连接已断开时后台重连，本次调用不重试
+                if isinstance(e, CONNECTION_ERRORS) or not client.is_connected():
+                    self._on_connection_lost(e, client)
+                raise
+            finally:
+                self._inflight -= 1
+                self._release(client)
+                elapsed = time.perf_counter() - start
+                latency.calls += 1
+                latency.total += elapsed
+                latency.max = max(latency.max, elapsed)
+
+    async def ensure_connected(self):
+        """确保已连接，连接失败时抛出异常"""
+        if self.mcp_client is not None and self.mcp_client.is_connected():
+            return
+        await self._connect(update_tools=not self.tools)
 
     async def _connect(self, update_tools: bool = False):
         """连接到 MCP Server
         Args:
             update_tools (bool, optional): 是否更新工具列表。 Defaults to False.
         """
-        if self.mcp_client is not None:
-            raise RuntimeError("MCP Server 已经连接了！")
-
+        async with self._connect_lock:
+            self._closed = False
+            if self.mcp_client is None or not self.mcp_client.is_connected():
+                await self._open()
+            if not self.tools or update_tools:
+                await self._refresh_tools()
+            if self._keepalive_task is None or self._keepalive_task.done():
+                self._keepalive_task = asyncio.create_task(self._keepalive())
+
+    async def _open(self):
+        """建立新连接，成功后替换当前连接，旧连接在其上的调用结束后关闭"""
         server_script = self.server_script
-        self.mcp_client = Client(server_script)
-        await self.mcp_client.__aenter__()
+        self.state = "connecting"
+        client = Client(server_script, message_handler=_ToolListChangedHandler(self))
+        try:
+            await client.__aenter__()
+        except BaseException as e:
+            self.state = "disconnected"
+            self.last_error = str(e) or type(e).__name__
+            # 连接被取消（如初始化超时）时客户端可能已部分建立，需要关闭以免泄漏连接
+            try:
+                await client.__aexit__(None, None, None)
+            except Exception as exit_error:
+                logger.debug(
+                    f"关闭 MCP Server@{server_script} 连接时出错：{exit_error}"
+                )
+            raise
+        old, self.mcp_client = self.mcp_client, client
+        self.state = "connected"
+        if old is not None:
+            await self._retire(old)
         logger.info(f"✅ 成功连接到 MCP Server@{server_script}")
-        if self.tools is None or update_tools:
-            tools = await self.mcp_client.list_tools()
-            self.tools = tools
-            logger.info(f"🛠️  可用工具: {[tool.name for tool in tools]}")
+
+    async def _refresh_tools(self):
+        if self.mcp_client is None:
+            raise RuntimeError("MCP Server 未连接！")
+        tools = await self.mcp_client.list_tools()
+        self.tools = tools
+        self._cast_tool_to_openai()
+        logger.info(f"🛠️  可用工具: {[tool.name for tool in tools]}")
+
+    async def _on_tool_list_changed(self):
+        logger.info(f"MCP Server@{self.server_script} 的工具列表已变更，正在刷新...")
+        try:
+            await ClientManager.update_tools(self)
+        except Exception as e:
+            logger.opt(exception=e, colors=True).error(
+                f"刷新 MCP Server@{self.server_script} 的工具列表失败"
+            )
+
+    def _on_connection_lost(self, error: Exception, client: Client | None = None):
+        if self._closed or self.state == "reconnecting":
+            return
+        # 已被替换的旧连接上的错误不影响当前连接
+        if client is not None and client is not self.mcp_client:
+            return
+        self.last_error = str(error)
+        logger.warning(f"MCP Server@{self.server_script} 连接异常：{error}")
+        self.state = "reconnecting"
+        self._schedule(self._reconnect())
+
+    async def _reconnect(self):
+        """按指数退避重连，直到成功或客户端被关闭"""
+        max_delay = config_manager.config.llm_config.tools.mcp_reconnect_max_delay
+        delay = 1.0
+        while not self._closed:
+            try:
+                async with self._connect_lock:
+                    before = {tool.name for tool in self.tools}
+                    await self._open()
+                    await self._refresh_tools()
+            except Exception as e:  # noqa: PERF203
+                self.state = "reconnecting"
+                self.last_error = str(e)
+                logger.warning(
+                    f"重连 MCP Server@{self.server_script} 失败，{delay:.0f}秒后重试：{e}"
+                )
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+                delay = min(delay * 2, max_delay)
+            else:
+                self.reconnects += 1
+                if {tool.name for tool in self.tools} != before:
+                    await self._on_tool_list_changed()
+                return
+
+    async def _keepalive(self):
+        """定期发送心跳，失败时触发重连"""
+        while not self._closed:
+            await asyncio.sleep(
+                config_manager.config.llm_config.tools.mcp_keepalive_interval
+            )
+            if self.state != "connected" or self.mcp_client is None:
+                continue
+            try:
+                if not await self.mcp_client.ping():
+                    raise RuntimeError("心跳无响应")
+            except Exception as e:
+                self._on_connection_lost(e)
 
     def _format_tools_for_openai(self):
         """将 MCP 工具格式转换为 OpenAI 工具格式"""
@@ -99,11 +305,62 @@ class MCPClient:
         """获取 MCP 工具列表，并转换为 OpenAI 工具列表"""
         return self._format_tools_for_openai()
 
+    async def _close_client(self, client: Client):
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception as e:
+            logger.debug(f"关闭 MCP Server@{self.server_script} 连接时出错：{e}")
+
+    async def _retire(self, client: Client):
+        """关闭被替换的连接，仍有调用进行中时等待调用结束后再关闭"""
+        if self._calls.get(client):
+            self._retired.add(client)
+        else:
+            await self._close_client(client)
+
+    def _release(self, client: Client):
+        """结束连接上的一次调用，已被替换的连接在最后一次调用结束后关闭"""
+        if count := self._calls.pop(client, 1) - 1:
+            self._calls[client] = count
+        elif client in self._retired:
+            self._retired.discard(client)
+            self._schedule(self._close_client(client))
+
+    async def _drop_client(self):
+        client, self.mcp_client = self.mcp_client, None
+        if client is not None:
+            await self._close_client(client)
+
     async def _close(self):
         """关闭连接"""
-        if self.mcp_client:
-            await self.mcp_client.__aexit__(None, None, None)
-            self.mcp_client = None
+        self._closed = True
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        for task in list(self._tasks):
+            task.cancel()
+        await self._drop_client()
+        for client in list(self._retired):
+            await self._close_client(client)
+        self._retired.clear()
+        self.state = "disconnected"
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "inflight": self._inflight,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+            "tools": {
+                name: {
+                    "calls": latency.calls,
+                    "errors": latency.errors,
+                    "avg": latency.avg,
+                    "max": latency.max,
+                }
+                for name, latency in self.latency.items()
+            },
+        }
 
 
 class ClientManager:
@@ -114,6 +371,7 @@ class ClientManager:
         str, str
     ]  # 针对于SuggarChat重复工具的重映射(原始名称->重映射名称)
     reversed_remappings: dict[str, str]  # 逆向映射(重映射名称->原始名称)
+    init_results: list[MCPInitResult]  # 最近一次批量初始化的结果
     _instance = None
     _lock: Lock
     _is_initialized = False  # ToolsMapping是否已经就绪
@@ -126,6 +384,7 @@ class ClientManager:
             cls.tools_remapping = {}
             cls.reversed_remappings = {}
             cls.script_to_clients = {}
+            cls.init_results = []
             cls._lock = Lock()
         return cls._instance
 
@@ -142,7 +401,7 @@ class ClientManager:
             tool_name (str): 工具名称
         """
         async with self._lock:
-            name = self.tools_remapping.get(tool_name) or tool_name
+            name = self.reversed_remappings.get(tool_name) or tool_name
             if name in self.name_to_clients:
                 return self.name_to_clients[name]
             raise RuntimeError(
@@ -150,10 +409,18 @@ class ClientManager:
             )
 
     @staticmethod
-    def _tools_wrapper(tool_name: str):
+    def _tools_wrapper(client: MCPClient, tool_name: str):
         async def tools_runner(data: dict[str, Any]) -> str:
-            client = await ClientManager().get_client_by_tool_name(tool_name)
-            return (await client.simple_call(tool_name, data)).data
+            result = await client.simple_call(tool_name, data)
+            if isinstance(result.data, str):
+                return result.data
+            if texts := [
+                content.text
+                for content in result.content
+                if isinstance(content, mcp.types.TextContent)
+            ]:
+                return "\n".join(texts)
+            return json.dumps(result.data, ensure_ascii=False, default=str)
 
         return tools_runner
 
@@ -183,70 +450,123 @@ class ClientManager:
             raise ValueError("请提供MCP Server脚本或MCP Client")
         return self
 
+    @staticmethod
+    def _unload_tools(client: MCPClient):
+        """移除该 MCP Client 注册的所有工具（调用方需持有锁）"""
+        for name in client.registered_tools:
+            ToolsManager().remove_tool(name)
+            original = ClientManager.reversed_remappings.pop(name, name)
+            ClientManager.tools_remapping.pop(original, None)
+            if ClientManager.name_to_clients.get(original) is client:
+                ClientManager.name_to_clients.pop(original, None)
+        client.registered_tools = []
+
     @staticmethod
     async def update_tools(client: MCPClient):
-        tools = client.get_tools()
         async with ClientManager._lock:
-            for tool in tools:
-                name = tool.function.name
-                ToolsManager().remove_tool(name)
-                ClientManager.name_to_clients.pop(name, None)
-                if remap := ClientManager.tools_remapping.pop(name, None):
-                    ClientManager.reversed_remappings.pop(remap, None)
-        await ClientManager()._load_this(client)
+            ClientManager._unload_tools(client)
+            await ClientManager()._load_this(client, update_tools=True)
 
-    async def initialize_this(self, server_script: MCP_SERVER_SCRIPT_TYPE) -> Self:
-        """注册并初始化单个MCP Server"""
+    async def initialize_this(
+        self, server_script: MCP_SERVER_SCRIPT_TYPE, timeout: float | None = None
+    ) -> Self:
+        """注册并初始化单个MCP Server
+
+        Args:
+            server_script (MCP_SERVER_SCRIPT_TYPE): MCP Server 脚本路径（或URI）
+            timeout (float | None, optional): 连接并获取工具列表的超时时间（秒）. Defaults to None.
+        """
         client = self.get_client_by_script(server_script)
-        async with self._lock:
-            try:
+        try:
+            # 连接与获取工具列表不持有锁，多个MCP Server可以并发初始化
+            await asyncio.wait_for(client._connect(update_tools=True), timeout)
+            async with self._lock:
                 await self._load_this(client)
-            except Exception as e:
-                logger.error(f"❌ 初始化 MCP Server@{server_script} 失败：{e}")
-                raise
-            else:
                 self.clients.append(client)
+        except asyncio.CancelledError:
+            await client._close()
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                e = TimeoutError(f"初始化超时（{timeout}s）")
+            logger.error(f"❌ 初始化 MCP Server@{server_script} 失败：{e}")
+            await client._close()
+            raise e
         return self
 
-    async def _load_this(self, client: MCPClient, fail_then_raise=True):
+    async def initialize_servers(
+        self, server_scripts: list[str], timeout: float | None = None
+    ) -> list[MCPInitResult]:
+        """并发初始化多个MCP Server，单个Server失败或超时不影响其他Server
+
+        Args:
+            server_scripts (list[str]): MCP Server 脚本路径（或URI）列表
+            timeout (float | None, optional): 每个Server的超时时间（秒）. Defaults to None.
+
+        Returns:
+            list[MCPInitResult]: 每个Server的初始化结果
+        """
+
+        async def init(script: str) -> MCPInitResult:
+            start = time.perf_counter()
+            try:
+                await self.initialize_this(script, timeout)
+            except Exception as e:
+                return MCPInitResult(script, False, time.perf_counter() - start, str(e))
+            tools = len(self.script_to_clients[script].registered_tools)
+            return MCPInitResult(script, True, time.perf_counter() - start, tools=tools)
+
+        self.init_results = list(
+            await asyncio.gather(*(init(script) for script in server_scripts))
+        )
+        self._is_initialized = True
+        return self.init_results
+
+    async def _load_this(
+        self, client: MCPClient, fail_then_raise=True, update_tools: bool = False
+    ):
+        registered: list[str] = []
         try:
             tools_remapping_tmp = {}
             reversed_remappings_tmp = {}
             name_to_clients_tmp = {}
-            async with client as c:
-                tools = deepcopy(c.get_tools())
-                for tool in tools:
-                    if (
-                        tool.function.name in self.tools_remapping
-                        or tool.function.name in self.name_to_clients
-                    ):
-                        logger.warning(
-                            f"{client}@{client.server_script} has a tool named {tool.function.name}, which is already registered"
-                        )
-                    name_to_clients_tmp[tool.function.name] = client
-                    if ToolsManager().has_tool(tool.function.name):
-                        remapped_name = (
-                            f"referred_{random.randint(1, 100)}_{tool.function.name}"
-                        )
-                        logger.warning(
-                            f"⚠️  工具已存在：{tool.function.name}，它将被重映射到：{remapped_name}"
-                        )
-                        tools_remapping_tmp[tool.function.name] = remapped_name
-                        reversed_remappings_tmp[remapped_name] = tool.function.name
-                        tool.function.name = remapped_name
-
-                        ToolsManager().register_tool(
-                            ToolData(
-                                data=tool, func=self._tools_wrapper(tool.function.name)
-                            )
-                        )
+            await client._connect(update_tools=update_tools)
+            tools = deepcopy(client.openai_tools)
+            for tool in tools:
+                original_name = tool.function.name
+                if (
+                    original_name in self.tools_remapping
+                    or original_name in self.name_to_clients
+                ):
+                    logger.warning(
+                        f"{client}@{client.server_script} has a tool named {original_name}, which is already registered"
+                    )
+                name_to_clients_tmp[original_name] = client
+                if ToolsManager().has_tool(original_name):
+                    remapped_name = f"referred_{random.randint(1, 100)}_{original_name}"
+                    logger.warning(
+                        f"⚠️  工具已存在：{original_name}，它将被重映射到：{remapped_name}"
+                    )
+                    tools_remapping_tmp[original_name] = remapped_name
+                    reversed_remappings_tmp[remapped_name] = original_name
+                    tool.function.name = remapped_name
+
+                ToolsManager().register_tool(
+                    ToolData(
+                        data=tool, func=self._tools_wrapper(client, original_name)
+                    )
+                )
+                registered.append(tool.function.name)
 
         except Exception as e:
+            for name in registered:
+                ToolsManager().remove_tool(name)
             if fail_then_raise:
                 raise
             logger.error(f"❌ 连接到 MCP Server@{client.server_script} 失败：{e}")
         else:
             logger.info(f"✅ 加载到 MCP Server@{client.server_script} 成功")
+            client.registered_tools = registered
             self.tools_remapping.update(tools_remapping_tmp)
             self.reversed_remappings.update(reversed_remappings_tmp)
             self.name_to_clients.update(name_to_clients_tmp)
@@ -258,7 +578,8 @@ class ClientManager:
         """连接所有 MCP Server"""
         async with self._lock:
             for client in self.clients:
-                await self._load_this(client, False)
+                self._unload_tools(client)
+                await self._load_this(client, False, update_tools=True)
             self._is_initialized = True
 
     async def unregister_client(self, script_name: str | Path):
@@ -267,13 +588,13 @@ class ClientManager:
             script_name = str(script_name)
             if script_name in self.script_to_clients:
                 client = self.script_to_clients.pop(script_name)
-                for tool in client.openai_tools:
-                    name = tool.function.name
-                    ToolsManager().remove_tool(name)
-                    ClientManager.name_to_clients.pop(name, None)
-                    if remap := ClientManager.tools_remapping.pop(name, None):
-                        ClientManager.reversed_remappings.pop(remap, None)
+                self._unload_tools(client)
+                await client._close()
                 for client in self.clients:
                     if client.server_script == script_name:
                         self.clients.remove(client)
                         break
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """获取各 MCP Server 的连接状态与工具调用耗时"""
+        return {str(client.server_script): client.get_stats() for client in self.clients}
@@ -8,6 +8,7 @@ from nonebot.adapters.onebot.v11 import Bot
 from pydantic import BaseModel, Field, model_validator
 from typing_extensions import Self
 
+from ...config import ToolCachePolicy
 from ...event import SuggarEvent
 from ...matcher import Matcher
 
@@ -44,6 +45,10 @@ class FunctionPropertySchema(BaseModel, Generic[T]):
     required: list[str] | None = Field(
         default=None, description="参数属性定义,仅当参数类型为object时有效"
     )
+    additionalProperties: bool | None = Field(
+        default=None,
+        description="是否允许未声明的属性,仅当参数类型为object时有效，严格模式下须为False",
+    )
 
     @model_validator(mode="after")
     def validator(self) -> Self:
@@ -87,6 +92,9 @@ class FunctionParametersSchema(BaseModel):
     )
 
     required: list[str] = Field([], description="必需参数列表")
+    additionalProperties: bool | None = Field(
+        default=None, description="是否允许未声明的参数，严格模式下须为False"
+    )
 
 
 class FunctionDefinitionSchema(BaseModel):
@@ -128,3 +136,18 @@ class ToolData(BaseModel):
         default=False,
         description="是否自定义运行，如果启用则会传入Context类而不是dict，并且不会强制要求返回值。",
     )
+    concurrent: bool = Field(
+        default=True,
+        description="是否允许与同一轮中的其他工具并发执行，禁用后该工具会在其他工具完成后依次执行。",
+    )
+    timeout: float | None = Field(
+        default=None,
+        description="单次调用的超时时间（秒），为空则使用全局配置。",
+    )
+    max_concurrency: int = Field(
+        default=0, description="该工具同时执行的最大调用数（0为不限制）。"
+    )
+    cache: ToolCachePolicy | None = Field(
+        default=None,
+        description="结果缓存策略，为空则不缓存。仅适用于相同参数总是返回相同结果的工具。",
+    )
@@ -0,0 +1,174 @@
+"""过载降级模块
+
+根据LLM请求的排队深度与近期P95延迟判断负载，逐级减少每条消息的处理工作：跳过可选的推理调用、裁剪上下文、
+切换到低成本预设、停止自动回复触发，最终直接回复繁忙提示。负载下降后带迟滞地逐级恢复。
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+
+from nonebot import logger
+from typing_extensions import Self
+
+from ..config import config_manager
+from .functions import percentile
+from .scheduler import LLMScheduler
+from .session_actor import SessionActors
+
+
+class ShedStage(IntEnum):
+    NORMAL = 0  # 正常处理
+    SKIP_REASONING = 1  # 跳过可选的推理调用
+    TRIM_CONTEXT = 2  # 裁剪上下文
+    CHEAP_PRESET = 3  # 切换到低成本预设
+    DROP_AUTOREPLY = 4  # 停止自动回复触发
+    BUSY = 5  # 直接回复繁忙提示
+
+
+STAGE_NAMES = {
+    ShedStage.NORMAL: "正常",
+    ShedStage.SKIP_REASONING: "跳过推理调用",
+    ShedStage.TRIM_CONTEXT: "裁剪上下文",
+    ShedStage.CHEAP_PRESET: "切换低成本预设",
+    ShedStage.DROP_AUTOREPLY: "停止自动回复",
+    ShedStage.BUSY: "繁忙",
+}
+
+
+@dataclass
+class ShedderStats:
+    transitions: int = 0  # 阶段切换次数
+    shed_busy: int = 0  # 直接回复繁忙提示的消息数
+    shed_autoreply: int = 0  # 被丢弃的自动回复触发数
+
+
+class LoadShedder:
+    """过载降级控制器"""
+
+    _instance = None
+    _latencies: deque[tuple[float, float]]
+    _stage: ShedStage
+    _changed_at: float
+    stats: ShedderStats
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._latencies = deque()
+            cls._stage = ShedStage.NORMAL
+            cls._changed_at = time.monotonic()
+            cls.stats = ShedderStats()
+        return cls._instance
+
+    def record_latency(self, seconds: float):
+        """记录一次LLM请求的耗时（包含排队时间）"""
+        self._latencies.append((time.monotonic(), seconds))
+        while (
+            len(self._latencies)
+            > config_manager.config.llm_config.load_shedding.latency_window
+        ):
+            self._latencies.popleft()
+
+    @property
+    def queue_depth(self) -> int:
+        return LLMScheduler().queue_depth + SessionActors().queue_depth
+
+    @property
+    def p95_latency(self) -> float:
+        # 过期的样本不再计入，避免降级后没有新请求时无法恢复
+        expire = (
+            time.monotonic()
+            - config_manager.config.llm_config.load_shedding.latency_max_age
+        )
+        while self._latencies and self._latencies[0][0] < expire:
+            self._latencies.popleft()
+        return percentile([latency for _, latency in self._latencies], 0.95)
+
+    @property
+    def stage(self) -> ShedStage:
+        """最近一次评估得到的降级阶段"""
+        return self._stage
+
+    def evaluate(self) -> ShedStage:
+        """根据当前负载重新评估降级阶段，在处理每条新消息前调用"""
+        conf = config_manager.config.llm_config.load_shedding
+        if not conf.enable:
+            if self._stage != ShedStage.NORMAL:
+                self._set_stage(ShedStage.NORMAL, 0, 0.0)
+            return self._stage
+        depth = self.queue_depth
+        p95 = self.p95_latency
+        target = ShedStage.NORMAL
+        for stage in ShedStage:
+            if stage == ShedStage.NORMAL:
+                continue
+            index = stage - 1
+            if (
+                index < len(conf.queue_thresholds)
+                and depth >= conf.queue_thresholds[index]
+            ) or (
+                index < len(conf.latency_thresholds)
+                and p95 >= conf.latency_thresholds[index]
+            ):
+                target = stage
+        if target > self._stage:
+            self._set_stage(target, depth, p95)
+        elif (
+            target < self._stage
+            and time.monotonic() - self._changed_at >= conf.hold_time
+            and self._recovered(self._stage, depth, p95)
+        ):
+            # 迟滞恢复：每次只降低一级
+            self._set_stage(ShedStage(self._stage - 1), depth, p95)
+        return self._stage
+
+    @staticmethod
+    def _recovered(stage: ShedStage, depth: int, p95: float) -> bool:
+        conf = config_manager.config.llm_config.load_shedding
+        index = stage - 1
+        if (
+            index < len(conf.queue_thresholds)
+            and depth >= conf.queue_thresholds[index] * conf.recover_ratio
+        ):
+            return False
+        return not (
+            index < len(conf.latency_thresholds)
+            and p95 >= conf.latency_thresholds[index] * conf.recover_ratio
+        )
+
+    def _set_stage(self, stage: ShedStage, depth: int, p95: float):
+        previous = self._stage
+        self._stage = stage
+        self._changed_at = time.monotonic()
+        self.stats.transitions += 1
+        message = (
+            f"过载降级阶段：{STAGE_NAMES[previous]} -> {STAGE_NAMES[stage]}"
+            f"（排队深度 {depth}，P95延迟 {p95:.2f}s）"
+        )
+        if stage > previous:
+            logger.warning(message)
+        else:
+            logger.info(message)
+
+    def trim_limit(self, memory_length_limit: int) -> int:
+        """裁剪上下文阶段返回缩减后的记忆长度限制"""
+        if self.stage < ShedStage.TRIM_CONTEXT:
+            return memory_length_limit
+        ratio = config_manager.config.llm_config.load_shedding.trim_ratio
+        return max(1, int(memory_length_limit * ratio))
+
+    def get_stats(self) -> dict[str, int | float | str]:
+        stage = self._stage
+        return {
+            "stage": int(stage),
+            "stage_name": STAGE_NAMES[stage],
+            "queue_depth": self.queue_depth,
+            "p95_latency": self.p95_latency,
+            "transitions": self.stats.transitions,
+            "shed_busy": self.stats.shed_busy,
+            "shed_autoreply": self.stats.shed_autoreply,
+        }
@@ -0,0 +1,153 @@
+"""群成员信息缓存模块
+
+以 (self_id, group_id, user_id) 为键缓存 `get_group_member_info` 的结果。事件中携带的发送者信息会被直接写入缓存，
+群管理员变动、成员退群与群名片变更通知会使对应的缓存失效。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from nonebot.adapters.onebot.v11 import Bot
+from nonebot.adapters.onebot.v11.event import Sender
+from typing_extensions import Self
+
+from ..config import config_manager
+
+MEMBER_KEY = tuple[int, int, int]
+
+
+@dataclass
+class _MemberEntry:
+    info: dict[str, Any]
+    expires_at: float
+
+
+@dataclass
+class MemberCacheStats:
+    hits: int = 0  # 命中缓存的次数
+    misses: int = 0  # 请求协议端的次数
+    sender_hits: int = 0  # 直接使用事件发送者信息的次数
+    invalidations: int = 0  # 因通知事件失效的条目数
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses + self.sender_hits
+        return (self.hits + self.sender_hits) / total if total else 0.0
+
+
+class MemberInfoCache:
+    """群成员信息缓存"""
+
+    _instance = None
+    _entries: OrderedDict[MEMBER_KEY, _MemberEntry]
+    _inflight: dict[MEMBER_KEY, asyncio.Future[dict[str, Any]]]
+    stats: MemberCacheStats
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._entries = OrderedDict()
+            cls._inflight = {}
+            cls.stats = MemberCacheStats()
+        return cls._instance
+
+    def _put(self, key: MEMBER_KEY, info: dict[str, Any]):
+        conf = config_manager.config.function
+        if conf.member_info_cache_ttl <= 0:
+            return
+        self._entries[key] = _MemberEntry(
+            info=info, expires_at=time.monotonic() + conf.member_info_cache_ttl
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > conf.member_info_cache_size:
+            self._entries.popitem(last=False)
+
+    def _lookup(self, key: MEMBER_KEY) -> dict[str, Any] | None:
+        if (entry := self._entries.get(key)) is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry.info
+
+    async def get(
+        self,
+        bot: Bot,
+        group_id: int,
+        user_id: int,
+        sender: Sender | None = None,
+    ) -> dict[str, Any]:
+        """获取群成员信息
+
+        Args:
+            bot (Bot): Bot实例
+            group_id (int): 群号
+            user_id (int): 用户ID
+            sender (Sender | None, optional): 事件中携带的发送者信息，包含昵称与身份时直接使用. Defaults to None.
+
+        Returns:
+            dict[str, Any]: 群成员信息，至少包含 `nickname` 与 `role`
+        """
+        key: MEMBER_KEY = (int(bot.self_id), group_id, user_id)
+        if sender is not None and sender.role and sender.nickname is not None:
+            cached = self._lookup(key) or {}
+            info = {**cached, **sender.model_dump(exclude_none=True)}
+            self._put(key, info)
+            self.stats.sender_hits += 1
+            return info
+        if (info := self._lookup(key)) is not None:
+            self.stats.hits += 1
+            return info
+        # 同一成员的并发请求只向协议端请求一次
+        if (future := self._inflight.get(key)) is not None:
+            self.stats.hits += 1
+            return await asyncio.shield(future)
+        self.stats.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            info = await bot.get_group_member_info(group_id=group_id, user_id=user_id)
+        except Exception as e:
+            future.set_exception(e)
+            # 避免没有其他等待者时产生未获取异常的警告
+            future.exception()
+            raise
+        else:
+            self._put(key, info)
+            future.set_result(info)
+            return info
+        finally:
+            self._inflight.pop(key, None)
+            # 发起请求的任务被取消时，等待同一结果的其他请求也需要结束
+            if not future.done():
+                future.set_exception(RuntimeError("获取群成员信息的请求已被取消"))
+                future.exception()
+
+    def invalidate(self, self_id: int, group_id: int, user_id: int | None = None):
+        """使缓存失效，不指定用户时使整个群的缓存失效"""
+        if user_id is not None:
+            keys = [(self_id, group_id, user_id)]
+        else:
+            keys = [k for k in self._entries if k[0] == self_id and k[1] == group_id]
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.stats.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> dict[str, int | float]:
+        return {
+            "size": len(self._entries),
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "sender_hits": self.stats.sender_hits,
+            "invalidations": self.stats.invalidations,
+            "hit_rate": self.stats.hit_rate,
+        }
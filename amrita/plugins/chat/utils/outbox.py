@@ -0,0 +1,197 @@
+"""消息发送队列模块
+
+按 (Bot, 发送目标) 为回复消息排队，由独立的发送协程按顺序发送，并控制同一目标与同一Bot的发送间隔。
+自然对话风格的分句停顿也在发送协程中完成，生成回复的处理流程无需等待发送结束即可释放会话锁。
+同一目标积压的消息过多时，相邻的纯文本消息会被合并发送。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from nonebot import logger
+from nonebot.adapters.onebot.v11 import Bot, Message, MessageSegment
+from nonebot.adapters.onebot.v11.event import GroupMessageEvent, MessageEvent
+from typing_extensions import Self
+
+from ..config import config_manager
+
+TARGET_KEY = tuple[str, str, int]
+IDLE_TIMEOUT = 60.0
+
+
+@dataclass
+class _Outgoing:
+    message: Message
+    delay_after: float = 0.0  # 发送后的停顿（秒），用于模拟自然对话节奏
+    coalesce: bool = True  # 是否允许与相邻消息合并发送
+    # 发送结果，合并发送的消息共享同一结果
+    results: list[asyncio.Future[Any]] = field(default_factory=list)
+
+
+@dataclass
+class OutboxStats:
+    queued: int = 0  # 入队的消息数
+    sent: int = 0  # 实际发送的消息数
+    coalesced: int = 0  # 被合并发送的消息数
+    failed: int = 0  # 发送失败的消息数
+
+
+class _TargetQueue:
+    def __init__(self, key: TARGET_KEY, bot: Bot, event: MessageEvent):
+        self.key = key
+        self.bot = bot
+        self.event = event
+        self.items: deque[_Outgoing] = deque()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+
+class Outbox:
+    """回复消息发送队列"""
+
+    _instance = None
+    _targets: dict[TARGET_KEY, _TargetQueue]
+    _bot_last_sent: dict[str, float]
+    stats: OutboxStats
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._targets = {}
+            cls._bot_last_sent = {}
+            cls.stats = OutboxStats()
+        return cls._instance
+
+    @staticmethod
+    def target_of(bot: Bot, event: MessageEvent) -> TARGET_KEY:
+        if isinstance(event, GroupMessageEvent):
+            return bot.self_id, "group", event.group_id
+        return bot.self_id, "private", event.user_id
+
+    def enqueue(
+        self,
+        bot: Bot,
+        event: MessageEvent,
+        message: Message | MessageSegment | str,
+        delay_after: float = 0.0,
+        coalesce: bool = True,
+    ) -> asyncio.Future[Any]:
+        """将消息加入发送队列，立即返回
+
+        Args:
+            bot (Bot): 发送消息的Bot
+            event (MessageEvent): 回复的消息事件，用于确定发送目标
+            message (Message | MessageSegment | str): 消息内容
+            delay_after (float, optional): 发送后的停顿（秒）. Defaults to 0.0.
+            coalesce (bool, optional): 积压时是否允许与相邻消息合并. Defaults to True.
+
+        Returns:
+            asyncio.Future[Any]: 发送结果（如消息ID），发送失败时为None，不需要时可以不等待
+        """
+        key = self.target_of(bot, event)
+        if (target := self._targets.get(key)) is None:
+            target = _TargetQueue(key, bot, event)
+            self._targets[key] = target
+            target.task = asyncio.create_task(self._worker(target))
+            target.task.add_done_callback(lambda _: self._drop(target))
+        target.bot = bot
+        target.event = event
+        result: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        target.items.append(
+            _Outgoing(
+                message=Message(message),
+                delay_after=delay_after,
+                coalesce=coalesce,
+                results=[result],
+            )
+        )
+        self.stats.queued += 1
+        target.wakeup.set()
+        return result
+
+    def _drop(self, target: _TargetQueue):
+        if self._targets.get(target.key) is target:
+            del self._targets[target.key]
+
+    def _take(self, target: _TargetQueue) -> _Outgoing:
+        """取出下一条消息，积压过多时合并相邻的纯文本消息"""
+        item = target.items.popleft()
+        threshold = config_manager.config.function.send_coalesce_threshold
+        if threshold <= 0 or len(target.items) + 1 < threshold or not item.coalesce:
+            return item
+        message = Message(item.message)
+        delay_after = item.delay_after
+        results = list(item.results)
+        while (
+            target.items
+            and target.items[0].coalesce
+            and all(seg.type == "text" for seg in target.items[0].message)
+        ):
+            merged = target.items.popleft()
+            message += MessageSegment.text("\n") + merged.message
+            delay_after = merged.delay_after
+            results.extend(merged.results)
+            self.stats.coalesced += 1
+        return _Outgoing(message=message, delay_after=delay_after, results=results)
+
+    async def _pace(self, bot_id: str, ready_at: float):
+        """等待同一目标的停顿结束，并保证同一Bot的发送间隔"""
+        interval = config_manager.config.function.send_bot_interval
+        while True:
+            now = time.monotonic()
+            wait = max(
+                ready_at - now,
+                self._bot_last_sent.get(bot_id, 0.0) + interval - now,
+            )
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        self._bot_last_sent[bot_id] = time.monotonic()
+
+    async def _worker(self, target: _TargetQueue):
+        ready_at = 0.0
+        while True:
+            if not target.items:
+                target.wakeup.clear()
+                try:
+                    await asyncio.wait_for(target.wakeup.wait(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    if not target.items:
+                        self._drop(target)
+                        return
+                continue
+            item = self._take(target)
+            await self._pace(target.bot.self_id, ready_at)
+            response = None
+            try:
+                response = await target.bot.send(target.event, item.message)
+                self.stats.sent += 1
+            except Exception as e:
+                self.stats.failed += 1
+                logger.opt(exception=e, colors=True).warning(
+                    f"向 {target.key[1]}:{target.key[2]} 发送消息失败：{e}"
+                )
+            for result in item.results:
+                if not result.done():
+                    result.set_result(response)
+            ready_at = time.monotonic() + max(
+                item.delay_after,
+                config_manager.config.function.send_target_interval,
+            )
+
+    def get_stats(self) -> dict[str, object]:
+        return {
+            "queued": self.stats.queued,
+            "sent": self.stats.sent,
+            "coalesced": self.stats.coalesced,
+            "failed": self.stats.failed,
+            "targets": {
+                f"{key[0]}:{key[1]}:{key[2]}": len(target.items)
+                for key, target in self._targets.items()
+            },
+        }
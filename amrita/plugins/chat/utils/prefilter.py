@@ -0,0 +1,205 @@
+"""内容审查本地预过滤模块
+
+在调用LLM内容审查之前，先使用本地的关键词自动机（Aho-Corasick）与正则规则对消息进行初筛，
+只有命中规则或无法确定的消息才会被提交给LLM审查。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Literal
+
+from nonebot import logger
+from typing_extensions import Self
+
+from ..config import config_manager
+
+Verdict = Literal["flagged", "uncertain", "clean"]
+
+
+class AhoCorasick:
+    """多模式字符串匹配自动机（大小写不敏感）"""
+
+    def __init__(self, keywords: list[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[tuple[str, ...]] = [()]
+        for keyword in keywords:
+            if keyword := keyword.casefold():
+                self._add(keyword)
+        self._build()
+
+    def _add(self, keyword: str):
+        state = 0
+        for char in keyword:
+            if (next_state := self._goto[state].get(char)) is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = (*self._output[state], keyword)
+
+    def _build(self):
+        queue: deque[int] = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = (
+                    *self._output[next_state],
+                    *self._output[self._fail[next_state]],
+                )
+
+    def search(self, text: str) -> list[str]:
+        """返回文本中命中的所有关键词"""
+        state = 0
+        found: list[str] = []
+        for char in text.casefold():
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state]:
+                found.extend(self._output[state])
+        return found
+
+
+@dataclass
+class PrefilterStats:
+    checked: int = 0  # 经过预过滤的消息数
+    escalated: int = 0  # 提交给LLM审查的消息数
+    flagged: int = 0  # 命中规则的消息数
+    uncertain: int = 0  # 无法确定的消息数
+    cache_hits: int = 0  # 命中缓存的次数
+
+    @property
+    def saved(self) -> int:
+        """节省的LLM审查调用次数"""
+        return self.checked - self.escalated
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.escalated / self.checked if self.checked else 0.0
+
+
+def _compile_rule(rule: str) -> re.Pattern[str] | None:
+    try:
+        return re.compile(rule, re.IGNORECASE)
+    except re.error as e:
+        logger.warning(f"内容审查预过滤规则 `{rule}` 无效：{e}")
+        return None
+
+
+class ModerationPrefilter:
+    """内容审查预过滤器"""
+
+    _instance = None
+    _automaton: AhoCorasick
+    _patterns: list[re.Pattern[str]]
+    _signature: tuple | None
+    _cache: OrderedDict[bytes, Verdict]
+    stats: PrefilterStats
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._automaton = AhoCorasick([])
+            cls._patterns = []
+            cls._signature = None
+            cls._cache = OrderedDict()
+            cls.stats = PrefilterStats()
+        return cls._instance
+
+    def _ensure_rules(self):
+        """配置变化时重建自动机与正则规则"""
+        conf = config_manager.config.llm_config.tools.report_prefilter
+        signature = (
+            tuple(conf.keywords),
+            tuple(conf.regex_rules),
+            conf.uncertain_length,
+        )
+        if signature == self._signature:
+            return
+        patterns = [
+            pattern
+            for rule in conf.regex_rules
+            if (pattern := _compile_rule(rule)) is not None
+        ]
+        self._automaton = AhoCorasick(conf.keywords)
+        self._patterns = patterns
+        self._cache.clear()
+        self._signature = signature
+
+    def classify(self, text: str) -> Verdict:
+        """对文本进行本地分类，结果按内容哈希缓存"""
+        self._ensure_rules()
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        if (verdict := self._cache.get(key)) is not None:
+            self._cache.move_to_end(key)
+            self.stats.cache_hits += 1
+            return verdict
+        if self._automaton.search(text) or any(
+            pattern.search(text) for pattern in self._patterns
+        ):
+            verdict = "flagged"
+        elif (
+            len(text)
+            >= config_manager.config.llm_config.tools.report_prefilter.uncertain_length
+        ):
+            verdict = "uncertain"
+        else:
+            verdict = "clean"
+        self._cache[key] = verdict
+        if (
+            len(self._cache)
+            > config_manager.config.llm_config.tools.report_prefilter.cache_size
+        ):
+            self._cache.popitem(last=False)
+        return verdict
+
+    def should_escalate(self, text: str, has_media: bool = False) -> bool:
+        """判断消息是否需要提交给LLM审查
+
+        Args:
+            text (str): 消息文本
+            has_media (bool, optional): 消息是否包含无法在本地检查的内容（如图片）. Defaults to False.
+        """
+        verdict: Verdict = "uncertain" if has_media else self.classify(text)
+        self.stats.checked += 1
+        if verdict == "flagged":
+            self.stats.flagged += 1
+        elif verdict == "uncertain":
+            self.stats.uncertain += 1
+        match config_manager.config.llm_config.tools.report_prefilter.escalate_on:
+            case "flagged":
+                escalate = verdict == "flagged"
+            case "uncertain":
+                escalate = verdict != "clean"
+            case _:
+                escalate = True
+        if escalate:
+            self.stats.escalated += 1
+        logger.debug(
+            f"内容审查预过滤：{verdict}，{'提交LLM审查' if escalate else '跳过LLM审查'}"
+            f"（升级率 {self.stats.escalation_rate:.2%}，已节省 {self.stats.saved} 次调用）"
+        )
+        return escalate
+
+    def get_stats(self) -> dict[str, int | float]:
+        return {
+            "checked": self.stats.checked,
+            "escalated": self.stats.escalated,
+            "flagged": self.stats.flagged,
+            "uncertain": self.stats.uncertain,
+            "cache_hits": self.stats.cache_hits,
+            "llm_calls_saved": self.stats.saved,
+            "escalation_rate": self.stats.escalation_rate,
+        }
@@ -0,0 +1,156 @@
+"""模型预设速率限制模块
+
+按预设限制每分钟请求数（RPM）与每分钟Token数（TPM）。请求前使用估算的提示词Token数占用额度，
+请求完成后使用接口返回的用量进行校正。超出限制的请求在队列中按顺序等待，直到获得额度或超时。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from typing_extensions import Self
+
+from ..config import ModelPreset
+
+WINDOW = 60.0
+
+
+@dataclass
+class Reservation:
+    """一次请求占用的额度"""
+
+    timestamp: float
+    tokens: int
+
+
+@dataclass
+class LimiterStats:
+    acquired: int = 0  # 获得额度的请求数
+    switched: int = 0  # 因限流而切换到其他预设的次数
+    queued: int = 0  # 进入等待队列的请求数
+    timeouts: int = 0  # 等待超时的请求数
+    wait_total: float = 0.0  # 累计等待时间（秒）
+    wait_max: float = 0.0  # 最长等待时间（秒）
+
+
+@dataclass
+class PresetLimiter:
+    rpm: int = 0
+    tpm: int = 0
+    _window: deque[Reservation] = field(default_factory=deque)
+    _waiters: deque[object] = field(default_factory=deque)
+    stats: LimiterStats = field(default_factory=LimiterStats)
+
+    def _purge(self, now: float):
+        while self._window and now - self._window[0].timestamp >= WINDOW:
+            self._window.popleft()
+
+    def _has_capacity(self, tokens: int) -> bool:
+        if not self._window:
+            # 窗口为空时总是放行，避免单个超大请求永远无法执行
+            return True
+        if self.rpm > 0 and len(self._window) >= self.rpm:
+            return False
+        return not (
+            self.tpm > 0 and sum(r.tokens for r in self._window) + tokens > self.tpm
+        )
+
+    def next_release(self) -> float:
+        """距离窗口内最早的请求过期还有多久（秒）"""
+        if not self._window:
+            return 0.0
+        return max(0.0, self._window[0].timestamp + WINDOW - time.monotonic())
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def try_acquire(self, tokens: int) -> Reservation | None:
+        """尝试立即占用额度，队列中有等待者时不会插队"""
+        if self.rpm <= 0 and self.tpm <= 0:
+            return Reservation(time.monotonic(), tokens)
+        now = time.monotonic()
+        self._purge(now)
+        if self._waiters or not self._has_capacity(tokens):
+            return None
+        reservation = Reservation(now, tokens)
+        self._window.append(reservation)
+        self.stats.acquired += 1
+        return reservation
+
+    async def acquire(self, tokens: int, timeout: float) -> Reservation:
+        """在队列中等待额度
+
+        Raises:
+            TimeoutError: 超过等待时间仍未获得额度
+        """
+        waiter = object()
+        self._waiters.append(waiter)
+        self.stats.queued += 1
+        start = time.monotonic()
+        deadline = start + timeout
+        try:
+            while True:
+                now = time.monotonic()
+                self._purge(now)
+                if self._waiters[0] is waiter and self._has_capacity(tokens):
+                    reservation = Reservation(now, tokens)
+                    self._window.append(reservation)
+                    self.stats.acquired += 1
+                    return reservation
+                if now >= deadline:
+                    self.stats.timeouts += 1
+                    raise TimeoutError("等待速率限制额度超时")
+                await asyncio.sleep(
+                    min(max(self.next_release(), 0.05), deadline - now)
+                )
+        finally:
+            self._waiters.remove(waiter)
+            waited = time.monotonic() - start
+            self.stats.wait_total += waited
+            self.stats.wait_max = max(self.stats.wait_max, waited)
+
+    @staticmethod
+    def reconcile(reservation: Reservation, tokens: int):
+        """使用实际用量校正已占用的Token额度"""
+        reservation.tokens = tokens
+
+
+class RateLimiter:
+    """模型预设速率限制器"""
+
+    _instance = None
+    _limiters: dict[str, PresetLimiter]
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._limiters = {}
+        return cls._instance
+
+    def get_limiter(self, preset: ModelPreset) -> PresetLimiter:
+        limiter = self._limiters.setdefault(preset.name, PresetLimiter())
+        limiter.rpm = preset.rpm_limit
+        limiter.tpm = preset.tpm_limit
+        return limiter
+
+    def get_stats(self) -> dict[str, dict[str, int | float]]:
+        return {
+            name: {
+                "rpm": limiter.rpm,
+                "tpm": limiter.tpm,
+                "queue_depth": limiter.queue_depth,
+                "acquired": limiter.stats.acquired,
+                "switched": limiter.stats.switched,
+                "queued": limiter.stats.queued,
+                "timeouts": limiter.stats.timeouts,
+                "wait_avg": limiter.stats.wait_total / limiter.stats.queued
+                if limiter.stats.queued
+                else 0.0,
+                "wait_max": limiter.stats.wait_max,
+            }
+            for name, limiter in self._limiters.items()
+        }
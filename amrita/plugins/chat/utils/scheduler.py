@@ -0,0 +1,229 @@
+"""LLM请求调度模块
+
+在 `get_chat` 与 `tools_caller` 之前对所有会话的LLM请求进行加权公平排队（WFQ）。每个请求按估算的提示词Token数
+计算开销，按会话权重换算为虚拟完成时间，全局并发达到上限时按虚拟完成时间从小到大放行，
+避免单个高频会话挤占其他会话的模型调用额度。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from nonebot import logger
+from nonebot.adapters.onebot.v11.event import GroupMessageEvent, MessageEvent
+from typing_extensions import Self
+
+from amrita.plugins.perm.API.rules import (
+    GroupPermissionChecker,
+    UserPermissionChecker,
+)
+
+from ..config import config_manager
+
+DEFAULT_SESSION = "global"
+
+# 当前LLM请求所属的会话与权重，由聊天处理流程设置
+_current_session: ContextVar[tuple[str, float] | None] = ContextVar(
+    "llm_scheduler_session", default=None
+)
+
+
+@dataclass
+class _Waiter:
+    session: str
+    start: float  # 虚拟开始时间
+    future: asyncio.Future[None]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class SessionShare:
+    weight: float = 1.0
+    requests: int = 0  # 请求数
+    cost: int = 0  # 累计开销（估算Token数）
+    waiting: int = 0  # 正在排队的请求数
+    wait_total: float = 0.0  # 累计排队时间（秒）
+
+
+async def resolve_session_weight(
+    event: MessageEvent, autoreply: bool = False
+) -> tuple[str, float]:
+    """根据配置与权限节点确定会话标识与调度权重
+
+    Args:
+        event (MessageEvent): 消息事件
+        autoreply (bool, optional): 对话是否由自动回复随机触发. Defaults to False.
+    """
+    conf = config_manager.config.llm_config.scheduler
+    if isinstance(event, GroupMessageEvent):
+        session = f"group:{event.group_id}"
+    else:
+        session = f"private:{event.user_id}"
+    if (weight := conf.session_weights.get(session)) is not None:
+        return session, weight
+    if config_manager.snapshot.is_admin(event.user_id):
+        return session, conf.admin_weight
+    if isinstance(event, GroupMessageEvent):
+        weight = conf.autoreply_weight if autoreply else conf.group_weight
+    else:
+        weight = conf.private_weight
+    if conf.priority_permission:
+        try:
+            if await UserPermissionChecker(conf.priority_permission).checker()(
+                event
+            ) or await GroupPermissionChecker(conf.priority_permission).checker()(
+                event
+            ):
+                weight = max(weight, conf.priority_weight)
+        except Exception as e:
+            logger.warning(f"检查调度优先权限时出错：{e}")
+    return session, weight
+
+
+class LLMScheduler:
+    """LLM请求的全局加权公平调度器"""
+
+    _instance = None
+    _heap: list[tuple[float, int, _Waiter]]
+    _running: int
+    _virtual_time: float
+    _last_finish: dict[str, float]
+    _sessions: dict[str, SessionShare]
+    _seq: itertools.count
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._heap = []
+            cls._running = 0
+            cls._virtual_time = 0.0
+            cls._last_finish = {}
+            cls._sessions = {}
+            cls._seq = itertools.count()
+        return cls._instance
+
+    @staticmethod
+    @contextmanager
+    def session(name: str, weight: float) -> Iterator[None]:
+        """设置当前上下文中LLM请求所属的会话与权重"""
+        token = _current_session.set((name, weight))
+        try:
+            yield
+        finally:
+            _current_session.reset(token)
+
+    @asynccontextmanager
+    async def slot(self, cost: int = 1) -> AsyncIterator[None]:
+        """占用一个LLM请求名额，名额不足时按加权公平顺序排队
+
+        Args:
+            cost (int, optional): 请求开销（估算的提示词Token数）. Defaults to 1.
+        """
+        if not config_manager.config.llm_config.scheduler.enable:
+            yield
+            return
+        name, weight = _current_session.get() or (DEFAULT_SESSION, 1.0)
+        await self._acquire(name, max(weight, 1e-3), max(cost, 1))
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _has_capacity(self) -> bool:
+        limit = config_manager.config.llm_config.scheduler.max_concurrency
+        return limit <= 0 or self._running < limit
+
+    async def _acquire(self, name: str, weight: float, cost: int):
+        previous = self._last_finish.get(name)
+        start = max(self._virtual_time, previous or 0.0)
+        finish = self._last_finish[name] = start + cost / weight
+        share = self._sessions.setdefault(name, SessionShare())
+        share.weight = weight
+        share.requests += 1
+        share.cost += cost
+        if len(self._last_finish) > 1024:
+            # 完成时间已落后于虚拟时间的会话与新会话等价，可以清理
+            self._last_finish = {
+                k: v for k, v in self._last_finish.items() if v > self._virtual_time
+            }
+        while self._heap and self._heap[0][2].future.done():
+            heapq.heappop(self._heap)
+        if not self._heap and self._has_capacity():
+            self._grant(start)
+            return
+        waiter = _Waiter(
+            session=name,
+            start=start,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._heap, (finish, next(self._seq), waiter))
+        share.waiting += 1
+        # 并发上限可能已被调高，先尝试放行
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已获得名额后被取消，归还名额
+                self._release()
+            else:
+                waiter.future.cancel()
+                share.waiting -= 1
+                # 未获得名额的请求不应推迟该会话之后的请求，其后没有新请求排队时回退完成时间
+                if self._last_finish.get(name) == finish:
+                    if previous is None:
+                        self._last_finish.pop(name, None)
+                    else:
+                        self._last_finish[name] = previous
+            raise
+
+    def _grant(self, start: float):
+        self._running += 1
+        self._virtual_time = max(self._virtual_time, start)
+
+    def _release(self):
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._heap and self._has_capacity():
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue
+            share = self._sessions[waiter.session]
+            share.waiting -= 1
+            share.wait_total += time.monotonic() - waiter.enqueued_at
+            self._grant(waiter.start)
+            waiter.future.set_result(None)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, w in self._heap if not w.future.done())
+
+    def get_stats(self) -> dict[str, object]:
+        total_cost = sum(share.cost for share in self._sessions.values())
+        return {
+            "running": self._running,
+            "queued": self.queue_depth,
+            "max_concurrency": config_manager.config.llm_config.scheduler.max_concurrency,
+            "sessions": {
+                name: {
+                    "weight": share.weight,
+                    "requests": share.requests,
+                    "cost": share.cost,
+                    "share": share.cost / total_cost if total_cost else 0.0,
+                    "waiting": share.waiting,
+                    "wait_avg": share.wait_total / share.requests
+                    if share.requests
+                    else 0.0,
+                }
+                for name, share in self._sessions.items()
+            },
+        }
@@ -0,0 +1,244 @@
+"""会话执行器模块
+
+每个活跃的群聊或私聊会话拥有一个工作协程与一个有界的消息队列，聊天处理在工作协程中按顺序执行，
+NoneBot的事件处理器在消息入队后即可返回。队列已满时按配置的策略处理：丢弃最早的消息、
+合并到下一轮对话或拒绝并提示用户。空闲的执行器会被自动回收。
+
+启用消息合并窗口后，执行器会在开始一轮对话前等待窗口内的后续消息，并将排队中的消息合并为同一轮对话。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Literal
+
+from nonebot import logger
+from nonebot.adapters.onebot.v11 import MessageSegment
+from nonebot.adapters.onebot.v11.event import MessageEvent
+from typing_extensions import Self
+
+from ..config import config_manager
+
+SESSION_KEY = tuple[Literal["group", "private"], int]
+SubmitResult = Literal["queued", "merged", "rejected"]
+
+
+@dataclass
+class _ChatJob:
+    event: MessageEvent
+    # 参数为合并到本轮对话中的其他消息
+    func: Callable[[list[MessageEvent]], Awaitable[None]]
+    # 入队时的上下文，NoneBot通过上下文变量获取当前的Bot与事件
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class ActorStats:
+    submitted: int = 0  # 入队的消息数
+    started: int = 0  # 开始处理的消息数
+    completed: int = 0  # 处理完成的消息数
+    merged: int = 0  # 合并到下一轮对话的消息数
+    dropped: int = 0  # 被丢弃的最早消息数
+    rejected: int = 0  # 被拒绝的消息数
+    reaped: int = 0  # 回收的空闲执行器数
+    turns: int = 0  # 实际进行的对话轮数
+    coalesced: int = 0  # 被合并进其他对话轮次的消息数
+    wait_total: float = 0.0  # 累计排队时间（秒）
+    wait_max: float = 0.0  # 最长排队时间（秒）
+
+    @property
+    def wait_avg(self) -> float:
+        return self.wait_total / self.started if self.started else 0.0
+
+
+class SessionActor:
+    """单个会话的执行器"""
+
+    def __init__(self, key: SESSION_KEY, lock: asyncio.Lock, stats: ActorStats):
+        self.key = key
+        self.lock = lock
+        self.mailbox: deque[_ChatJob] = deque()
+        self.running: _ChatJob | None = None
+        self._stats = stats
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._on_exit: Callable[[SessionActor], None] = lambda _: None
+
+    @property
+    def busy(self) -> bool:
+        return self.running is not None or bool(self.mailbox)
+
+    def start(self, on_exit: Callable[[SessionActor], None]):
+        self._on_exit = on_exit
+        self._task = asyncio.create_task(self._loop())
+        self._task.add_done_callback(lambda _: on_exit(self))
+
+    def put(self, job: _ChatJob) -> SubmitResult:
+        conf = config_manager.config.function
+        if len(self.mailbox) >= max(conf.chat_queue_size, 1):
+            match conf.chat_queue_overflow:
+                case "reject":
+                    self._stats.rejected += 1
+                    return "rejected"
+                case "merge" if self._merge(job):
+                    self._stats.merged += 1
+                    return "merged"
+                case _:
+                    dropped = self.mailbox.popleft()
+                    self._stats.dropped += 1
+                    logger.warning(
+                        f"会话 {self.key[0]}:{self.key[1]} 的消息队列已满，丢弃了最早的消息 {dropped.event.message_id}"
+                    )
+        self.mailbox.append(job)
+        self._stats.submitted += 1
+        self._wakeup.set()
+        return "queued"
+
+    def _merge(self, job: _ChatJob) -> bool:
+        """将消息合并到同一用户最近一条排队中的消息，没有可合并的消息时返回False"""
+        for queued in reversed(self.mailbox):
+            if queued.event.user_id == job.event.user_id:
+                queued.event.message.append(MessageSegment.text("\n"))
+                queued.event.message.extend(job.event.message)
+                return True
+        return False
+
+    async def _loop(self):
+        while True:
+            if not self.mailbox:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        config_manager.config.function.chat_actor_idle_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    if not self.mailbox:
+                        # 先从管理器中移除，避免之后的消息进入已退出的执行器
+                        self._on_exit(self)
+                        self._stats.reaped += 1
+                        return
+                continue
+            conf = config_manager.config.function
+            if conf.chat_coalesce_window_ms > 0:
+                await self._debounce(conf.chat_coalesce_window_ms / 1000)
+            job = self.mailbox.popleft()
+            followers: list[_ChatJob] = []
+            if conf.chat_coalesce_window_ms > 0:
+                while self.mailbox and len(followers) < conf.chat_coalesce_max - 1:
+                    followers.append(self.mailbox.popleft())
+            self.running = job
+            now = time.monotonic()
+            for started in (job, *followers):
+                waited = now - started.enqueued_at
+                self._stats.started += 1
+                self._stats.wait_total += waited
+                self._stats.wait_max = max(self._stats.wait_max, waited)
+            self._stats.turns += 1
+            self._stats.coalesced += len(followers)
+            try:
+                async with self.lock:
+                    # 在入队时的上下文中运行，使matcher.send等操作指向正确的事件
+                    await job.context.run(
+                        asyncio.ensure_future,
+                        job.func([follower.event for follower in followers]),
+                    )
+            except Exception as e:
+                logger.opt(exception=e, colors=True).exception(
+                    f"会话 {self.key[0]}:{self.key[1]} 处理消息时发生了未捕获的异常"
+                )
+            finally:
+                self.running = None
+                self._stats.completed += 1 + len(followers)
+
+    async def _debounce(self, window: float):
+        """等待直到窗口内没有新消息到达，最长等待四个窗口"""
+        deadline = self.mailbox[0].enqueued_at + window * 4
+        while self.mailbox:
+            remaining = (
+                min(self.mailbox[-1].enqueued_at + window, deadline)
+                - time.monotonic()
+            )
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+
+class SessionActors:
+    """会话执行器管理器"""
+
+    _instance = None
+    _actors: dict[SESSION_KEY, SessionActor]
+    stats: ActorStats
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._actors = {}
+            cls.stats = ActorStats()
+        return cls._instance
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(a.mailbox) for a in self._actors.values())
+
+    def is_busy(self, key: SESSION_KEY) -> bool:
+        return (actor := self._actors.get(key)) is not None and actor.busy
+
+    def submit(
+        self,
+        key: SESSION_KEY,
+        lock: asyncio.Lock,
+        event: MessageEvent,
+        func: Callable[[list[MessageEvent]], Awaitable[None]],
+    ) -> SubmitResult:
+        """将一次聊天处理提交到会话执行器
+
+        Args:
+            key (SESSION_KEY): 会话标识
+            lock (asyncio.Lock): 会话锁，执行期间持有以与其他处理（如戳一戳）互斥
+            event (MessageEvent): 消息事件，用于合并策略
+            func (Callable[[list[MessageEvent]], Awaitable[None]]): 聊天处理函数，参数为合并到本轮对话中的其他消息
+
+        Returns:
+            SubmitResult: 入队结果
+        """
+        if (actor := self._actors.get(key)) is None:
+            actor = SessionActor(key, lock, self.stats)
+            self._actors[key] = actor
+            actor.start(self._on_exit)
+        return actor.put(_ChatJob(event=event, func=func))
+
+    def _on_exit(self, actor: SessionActor):
+        if self._actors.get(actor.key) is actor:
+            del self._actors[actor.key]
+
+    def get_stats(self) -> dict[str, object]:
+        return {
+            "actors": len(self._actors),
+            "queued": self.queue_depth,
+            "submitted": self.stats.submitted,
+            "started": self.stats.started,
+            "completed": self.stats.completed,
+            "merged": self.stats.merged,
+            "dropped": self.stats.dropped,
+            "rejected": self.stats.rejected,
+            "reaped": self.stats.reaped,
+            "turns": self.stats.turns,
+            "coalesced": self.stats.coalesced,
+            "wait_avg": self.stats.wait_avg,
+            "wait_max": self.stats.wait_max,
+            "sessions": {
+                f"{key[0]}:{key[1]}": {
+                    "queue_depth": len(actor.mailbox),
+                    "running": actor.running is not None,
+                }
+                for key, actor in self._actors.items()
+            },
+        }
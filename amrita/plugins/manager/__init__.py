@@ -11,6 +11,8 @@ from . import (
     ban,
     black,
     checker,
+    context,
+    dedup,
     leave,
     list_black,
     pardon,
@@ -35,6 +37,8 @@ __all__ = [
     "ban",
     "black",
     "checker",
+    "context",
+    "dedup",
     "leave",
     "list_black",
     "pardon",
@@ -1,20 +1,36 @@
 from nonebot.adapters.onebot.v11 import Bot
 from nonebot.matcher import Matcher
 from nonebot.message import run_preprocessor
+from nonebot.typing import T_State
 
 from amrita.utils.admin import send_to_admin
 
 from .blacklist.black import bl_manager
+from .context import get_preprocess_context
 from .event import GroupEvent, UserIDEvent
 
 
+async def _leave_black_group(bot: Bot, group_id: int):
+    await send_to_admin(f"尝试退出黑名单群组{group_id}.......")
+    await bot.set_group_leave(group_id=group_id)
+
+
 @run_preprocessor
-async def message_preprocessor(matcher: Matcher, bot: Bot, event: UserIDEvent):
-    if isinstance(event, GroupEvent) and await bl_manager.is_group_black(
-        str(event.group_id)
+async def message_preprocessor(
+    matcher: Matcher, bot: Bot, event: UserIDEvent, state: T_State
+):
+    # 黑名单判断与退群操作对同一事件只执行一次
+    context = get_preprocess_context(event, state)
+    if isinstance(event, GroupEvent):
+        group_id = event.group_id
+        if await context.memo(
+            "group_black", lambda: bl_manager.is_group_black(str(group_id))
+        ):
+            await context.memo(
+                "leave_black_group", lambda: _leave_black_group(bot, group_id)
+            )
+            matcher.stop_propagation()
+    if await context.memo(
+        "private_black", lambda: bl_manager.is_private_black(str(event.user_id))
     ):
-        await send_to_admin(f"尝试退出黑名单群组{event.group_id}.......")
-        await bot.set_group_leave(group_id=event.group_id)
-        matcher.stop_propagation()
-    if await bl_manager.is_private_black(str(event.user_id)):
         matcher.stop_propagation()
@@ -25,6 +25,7 @@ from nonebot.rule import (
     StartswithRule,
     ToMeRule,
 )
+from nonebot.typing import T_State
 from pydantic import BaseModel
 from typing_extensions import Self
 
@@ -33,6 +34,7 @@ from amrita.plugins.menu.models import MatcherData
 from amrita.plugins.perm.API.admin import is_lp_admin
 from amrita.utils.admin import send_to_admin
 
+from .context import PreprocessContext, get_preprocess_context
 from .models import add_usage
 from .status_manager import StatusManager
 from .utils import TokenBucket
@@ -124,11 +126,10 @@ async def _(bot: Bot):
     asyncio.create_task(_add())  # noqa: RUF006
 
 
-@run_preprocessor
-async def run(matcher: Matcher, event: MessageEvent):
-    if (not StatusManager().ready) and (not await is_lp_admin(event)):
-        raise IgnoredException("Maintenance in progress, operation not supported.")
-    has_text_rule = any(
+@lru_cache(maxsize=1024)
+def has_text_rule(matcher_type: type[Matcher]) -> bool:
+    """检查该匹配器是否有文字类匹配类规则，结果按匹配器类缓存"""
+    return any(
         isinstance(
             checker.call,
             FullmatchRule
@@ -140,16 +141,28 @@ async def run(matcher: Matcher, event: MessageEvent):
             | RegexRule
             | ToMeRule,
         )
-        for checker in matcher.rule.checkers
-    )  # 检查该匹配器是否有文字类匹配类规则
-    if not has_text_rule:
-        return
+        for checker in matcher_type.rule.checkers
+    )
+
+
+async def _rate_limited(event: MessageEvent, context: PreprocessContext) -> bool:
     ins_id = str(
         event.group_id if isinstance(event, GroupMessageEvent) else event.user_id
     )
     data = watch_group if isinstance(event, GroupMessageEvent) else watch_user
     bucket = data[ins_id]
-    if not bucket.consume() and (not await is_lp_admin(event)):
+    return not bucket.consume() and (not await context.is_admin())
+
+
+@run_preprocessor
+async def run(matcher: Matcher, event: MessageEvent, state: T_State):
+    context = get_preprocess_context(event, state)
+    if (not StatusManager().ready) and (not await context.is_admin()):
+        raise IgnoredException("Maintenance in progress, operation not supported.")
+    if not has_text_rule(type(matcher)):
+        return
+    # 同一事件只消耗一次令牌，到达的其他匹配器沿用同一判定
+    if await context.memo("rate_limited", lambda: _rate_limited(event, context)):
         raise IgnoredException("Rate limit exceeded, operation ignored.")
 
 
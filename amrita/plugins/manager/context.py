@@ -0,0 +1,55 @@
+"""事件预处理上下文模块
+
+NoneBot会对事件到达的每个匹配器分别运行 `run_preprocessor`，黑名单查询、管理员判断与频率限制等检查
+因此会对同一事件重复执行多次。事件预处理阶段为每个事件创建一个预处理上下文并存入事件状态，
+各匹配器的状态均复制自事件状态，共享同一个上下文，检查结果只需计算一次。
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from nonebot.adapters.onebot.v11 import Event
+from nonebot.message import event_preprocessor
+from nonebot.typing import T_State
+
+from amrita.plugins.perm.API.admin import is_lp_admin
+
+PREPROCESS_CONTEXT_KEY = "_amrita_preprocess_context"
+
+T = TypeVar("T")
+
+
+class PreprocessContext:
+    """单个事件的预处理结果"""
+
+    def __init__(self, event: Event):
+        self.event = event
+        self._results: dict[str, asyncio.Future[Any]] = {}
+
+    async def memo(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """对同一事件只执行一次factory，之后（包括并发的）调用直接返回其结果"""
+        if (future := self._results.get(key)) is None:
+            future = asyncio.ensure_future(factory())
+            self._results[key] = future
+        # 避免某个匹配器被取消时连带取消共享的检查
+        return await asyncio.shield(future)
+
+    async def is_admin(self) -> bool:
+        return await self.memo("is_admin", lambda: is_lp_admin(self.event))
+
+
+def get_preprocess_context(event: Event, state: T_State) -> PreprocessContext:
+    """获取事件的预处理上下文，事件状态中没有时创建"""
+    context = state.get(PREPROCESS_CONTEXT_KEY)
+    if not isinstance(context, PreprocessContext) or context.event is not event:
+        context = PreprocessContext(event)
+        state[PREPROCESS_CONTEXT_KEY] = context
+    return context
+
+
+@event_preprocessor
+async def create_preprocess_context(event: Event, state: T_State):
+    state[PREPROCESS_CONTEXT_KEY] = PreprocessContext(event)
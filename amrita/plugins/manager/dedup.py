@@ -0,0 +1,104 @@
+"""重复事件去重模块
+
+部分OneBot实现在反向WebSocket重连后会重新投递近期的事件。在所有匹配器运行之前，
+按 (self_id, 消息ID或通知与请求自带的唯一字段) 在时间窗口内对事件去重，避免重复调用LLM与重复计入用量。
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from nonebot import logger
+from nonebot.adapters import Event
+from nonebot.adapters.onebot.v11 import (
+    FriendRecallNoticeEvent,
+    FriendRequestEvent,
+    GroupRecallNoticeEvent,
+    GroupRequestEvent,
+    GroupUploadNoticeEvent,
+    MessageEvent,
+)
+from nonebot.exception import IgnoredException
+from nonebot.message import event_preprocessor
+from typing_extensions import Self
+
+from amrita import get_amrita_config
+
+DEDUP_KEY = tuple[str, str]
+
+
+@dataclass
+class DedupStats:
+    checked: int = 0  # 检查的事件数
+    hits: int = 0  # 命中的重复事件数
+
+
+def event_fingerprint(event: Event) -> DEDUP_KEY | None:
+    """计算事件的去重键，不需要去重的事件返回None"""
+    self_id = str(getattr(event, "self_id", ""))
+    if isinstance(event, MessageEvent):
+        peer = getattr(event, "group_id", None) or event.user_id
+        return self_id, f"message:{peer}:{event.message_id}"
+    # 通知与请求只按OneBot实现提供的唯一字段去重。其余通知（如戳一戳）只带有秒级时间，
+    # 无法与同一秒内正常的重复通知区分，不做去重
+    if isinstance(event, GroupRecallNoticeEvent | FriendRecallNoticeEvent):
+        return self_id, f"notice:{event.notice_type}:{event.message_id}"
+    if isinstance(event, GroupUploadNoticeEvent):
+        return self_id, f"notice:{event.notice_type}:{event.file.id}"
+    if isinstance(event, FriendRequestEvent | GroupRequestEvent):
+        return self_id, f"request:{event.flag}"
+    return None
+
+
+class EventDeduplicator:
+    """有界、带时间窗口的事件去重索引"""
+
+    _instance = None
+    _seen: OrderedDict[DEDUP_KEY, float]
+    stats: DedupStats
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._seen = OrderedDict()
+            cls.stats = DedupStats()
+        return cls._instance
+
+    def check(self, event: Event) -> bool:
+        """记录事件，事件在时间窗口内已出现过时返回True"""
+        config = get_amrita_config()
+        if config.event_dedup_window <= 0:
+            return False
+        if (key := event_fingerprint(event)) is None:
+            return False
+        self.stats.checked += 1
+        now = time.monotonic()
+        # 索引按首次出现时间排序，从头部清理过期条目
+        while self._seen:
+            oldest_key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < config.event_dedup_window:
+                break
+            del self._seen[oldest_key]
+        if key in self._seen:
+            self.stats.hits += 1
+            return True
+        self._seen[key] = now
+        while len(self._seen) > config.event_dedup_size:
+            self._seen.popitem(last=False)
+        return False
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._seen),
+            "checked": self.stats.checked,
+            "hits": self.stats.hits,
+        }
+
+
+@event_preprocessor
+async def dedup_preprocessor(event: Event):
+    if EventDeduplicator().check(event):
+        logger.info(f"忽略重复投递的事件：{event.get_event_name()}")
+        raise IgnoredException("Duplicate event ignored.")
@@ -16,6 +16,7 @@ from nonebot import get_bot
 from pydantic import BaseModel
 
 from amrita.plugins.manager.blacklist.black import BL_Manager
+from amrita.plugins.manager.dedup import EventDeduplicator
 from amrita.plugins.manager.models import get_usage
 from amrita.plugins.webui.service.authlib import TOKEN_KEY, TokenManager
 from amrita.utils.system_health import calculate_system_usage
@@ -211,6 +212,7 @@ async def get_bot_status(request: Request):
         {
             "status": "online" if try_get_bot() else "offline",
             **calculate_system_usage(),
+            "event_dedup": EventDeduplicator().get_stats(),
             "sidebar_items": side_bar,
         }
     )
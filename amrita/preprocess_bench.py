@@ -0,0 +1,116 @@
+import os
+import time
+
+import nonebot
+
+import amrita
+
+logger = nonebot.logger
+
+SIZES = (1, 10, 50, 200)
+
+
+def main(iterations: int = 100):
+    """加载项目并测试每个事件的预处理开销随匹配器数量的变化，完成后退出。
+
+    测试期间只保留测试用的匹配器，事件预处理器与运行预处理器保持项目加载后的状态。
+    每个匹配器在每个事件中应恰好运行一次，且同一事件的所有匹配器共享同一个预处理上下文，
+    结果不符合预期时以非零状态退出。
+    """
+    os.environ["ALEMBIC_STARTUP_CHECK"] = "false"
+    amrita.init()
+    driver = nonebot.get_driver()
+    amrita.load_plugins()
+
+    async def bench():
+        from nonebot.adapters.onebot.v11 import Adapter, Bot, GroupMessageEvent
+        from nonebot.matcher import matchers
+        from nonebot.message import handle_event
+        from nonebot.typing import T_State
+
+        from amrita.plugins.manager.context import PREPROCESS_CONTEXT_KEY
+
+        bot = Bot(nonebot.get_adapter(Adapter), "10000")
+        # 事件序号 -> 该事件中各匹配器看到的预处理上下文
+        contexts: dict[int, set[int]] = {}
+        calls = 0
+
+        async def handler(event: GroupMessageEvent, state: T_State):
+            nonlocal calls
+            calls += 1
+            context = state.get(PREPROCESS_CONTEXT_KEY)
+            contexts.setdefault(event.message_id, set()).add(
+                0 if context is None else id(context)
+            )
+
+        message_id = 0
+
+        def make_event() -> GroupMessageEvent:
+            # 每个事件使用不同的消息ID，避免被去重
+            nonlocal message_id
+            message_id += 1
+            return GroupMessageEvent.model_validate(
+                {
+                    "time": int(time.time()),
+                    "self_id": 10000,
+                    "post_type": "message",
+                    "sub_type": "normal",
+                    "message_type": "group",
+                    "message_id": message_id,
+                    "user_id": 20000,
+                    "group_id": 30000,
+                    "message": [{"type": "text", "data": {"text": "bench"}}],
+                    "original_message": [{"type": "text", "data": {"text": "bench"}}],
+                    "raw_message": "bench",
+                    "font": 0,
+                    "sender": {"user_id": 20000, "nickname": "bench", "role": "member"},
+                    "to_me": False,
+                }
+            )
+
+        saved = {priority: list(items) for priority, items in matchers.items()}
+        matchers.clear()
+        # 调度日志会淹没测试结果，测试期间关闭
+        logger.disable("nonebot")
+        try:
+            for size in SIZES:
+                registered = [
+                    nonebot.on_message(
+                        priority=i % 5 + 1, block=False, handlers=[handler]
+                    )
+                    for i in range(size)
+                ]
+                await handle_event(bot, make_event())  # 预热
+                calls = 0
+                contexts.clear()
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    await handle_event(bot, make_event())
+                elapsed = time.perf_counter() - start
+                for matcher in registered:
+                    matcher.destroy()
+                print(
+                    f"匹配器数 {size:>4}：每事件 {elapsed / iterations * 1e6:.1f}μs，"
+                    + f"每匹配器 {elapsed / iterations / size * 1e6:.1f}μs"
+                    + f"（{iterations} 次）"
+                )
+                if calls != size * iterations:
+                    raise RuntimeError(
+                        f"匹配器数 {size}：运行了 {calls} 次，应为 {size * iterations} 次"
+                    )
+                if any(len(ids) != 1 or 0 in ids for ids in contexts.values()):
+                    raise RuntimeError(
+                        f"匹配器数 {size}：同一事件的匹配器未共享预处理上下文"
+                    )
+        except Exception as e:
+            logger.enable("nonebot")
+            logger.opt(exception=e).error(f"预处理基准测试失败：{e}")
+            os._exit(1)
+        finally:
+            logger.enable("nonebot")
+            matchers.clear()
+            matchers.update(saved)
+        os._exit(0)
+
+    driver.on_startup(bench)
+    amrita.run()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+import time
+
+import nonebot
+from aiohttp import web
+
+import amrita
+
+logger = nonebot.logger
+
+MOCK_REPLY = "pong"
+
+
+async def _mock_completions(request: web.Request) -> web.StreamResponse:
+    """模拟 OpenAI 兼容的 /chat/completions 接口"""
+    body = await request.json()
+    await asyncio.sleep(0.01)
+    usage = {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11}
+    base = {
+        "id": "mock",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+    }
+    if not body.get("stream"):
+        return web.json_response(
+            {
+                **base,
+                "object": "chat.completion",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": MOCK_REPLY},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+        )
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    chunks = [
+        {
+            **base,
+            "object": "chat.completion.chunk",
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": MOCK_REPLY},
+                    "finish_reason": "stop",
+                }
+            ],
+        },
+        {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage},
+    ]
+    for chunk in chunks:
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+    await response.write(b"data: [DONE]\n\n")
+    return response
+
+
+async def _start_mock_server() -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", _mock_completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}/v1"
+
+
+def main(
+    rounds: int = 3, concurrency: int = 4, warmup: bool = False, mock: bool = False
+):
+    """加载项目并对所有模型预设进行基准测试，完成后退出。
+
+    mock为True时改为对本地模拟服务进行测试，并在存在失败的请求时以非零状态退出，用于检查基准测试本身。
+    """
+    os.environ["ALEMBIC_STARTUP_CHECK"] = "false"
+    amrita.init()
+    driver = nonebot.get_driver()
+    amrita.load_plugins()
+
+    async def bench():
+        from amrita.plugins.chat.config import ModelPreset
+        from amrita.plugins.chat.handlers.preset_test import format_benchmark
+        from amrita.plugins.chat.utils.libchat import benchmark_presets
+
+        runner: web.AppRunner | None = None
+        try:
+            presets = None
+            if mock:
+                runner, base_url = await _start_mock_server()
+                presets = [
+                    ModelPreset(
+                        name="mock", model="mock", base_url=base_url, api_key="mock"
+                    )
+                ]
+            results = await benchmark_presets(
+                rounds=rounds, concurrency=concurrency, warmup=warmup, presets=presets
+            )
+            print(format_benchmark(results) or "没有可测试的预设。")
+            if mock and not (
+                results
+                and all(
+                    r.errors == 0 and r.success == r.rounds and r.latency_max > 0
+                    for r in results
+                )
+            ):
+                logger.error("模拟服务的基准测试结果不符合预期！")
+                os._exit(1)
+        except Exception as e:
+            logger.opt(exception=e).error(f"基准测试失败：{e}")
+            os._exit(1)
+        finally:
+            if runner is not None:
+                await runner.cleanup()
+        os._exit(0)
+
+    driver.on_startup(bench)
+    amrita.run()